@@ -45,7 +45,11 @@ const Dashboard = () => {
       setRecentTickets(response.tickets);
       
       // Calculate stats from all tickets
-      const allTicketsResponse = await ticketsApi.getTickets({ per_page: 1000 });
+      const allTicketsResponse = await ticketsApi.getTickets({
+        per_page: 1000,
+        fields: 'id,status',
+        expand: ''
+      });
       const allTickets = allTicketsResponse.tickets;
       
       const newStats = {
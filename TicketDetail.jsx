@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
-import { ticketsApi, usersApi } from '../../lib/api';
+import { ticketsApi, usersApi, syncStore } from '../../lib/api';
 import { 
   ArrowLeft, 
   MessageSquare, 
@@ -27,6 +27,8 @@ const TicketDetail = () => {
   const [error, setError] = useState('');
   const [newComment, setNewComment] = useState('');
   const [commentLoading, setCommentLoading] = useState(false);
+  const [editingComment, setEditingComment] = useState(null);
+  const [editContent, setEditContent] = useState('');
   const [updating, setUpdating] = useState(false);
 
   useEffect(() => {
@@ -37,12 +39,23 @@ const TicketDetail = () => {
   }, [id]);
 
   const fetchTicket = async () => {
+    // Show the locally synced copy straight away; the fetch below refreshes it
+    const cached = syncStore.getTicket(Number(id));
     try {
-      setLoading(true);
+      if (cached) {
+        setTicket(cached);
+      } else {
+        setLoading(true);
+      }
       const response = await ticketsApi.getTicket(id);
       setTicket(response.ticket);
+      syncStore.pull().catch(() => {});
     } catch (error) {
-      setError('Failed to fetch ticket details');
+      if (cached && error.status === 0) {
+        setError('Offline: showing the last synced copy');
+      } else {
+        setError('Failed to fetch ticket details');
+      }
       console.error('Fetch ticket error:', error);
     } finally {
       setLoading(false);
@@ -51,7 +64,7 @@ const TicketDetail = () => {
 
   const fetchAgents = async () => {
     try {
-      const response = await usersApi.getAgents();
+      const response = await usersApi.getAgentWorkload();
       setAgents(response.agents);
     } catch (error) {
       console.error('Failed to fetch agents:', error);
@@ -98,6 +111,37 @@ const TicketDetail = () => {
     }
   };
 
+  const startEditComment = (comment) => {
+    setEditingComment(comment.id);
+    setEditContent(comment.content);
+  };
+
+  const handleEditComment = async (commentId) => {
+    if (!editContent.trim()) return;
+
+    try {
+      setCommentLoading(true);
+      await ticketsApi.editComment(id, commentId, editContent.trim());
+      setEditingComment(null);
+      await fetchTicket();
+    } catch (error) {
+      setError(error.message || 'Failed to update comment');
+    } finally {
+      setCommentLoading(false);
+    }
+  };
+
+  const handleDeleteComment = async (commentId) => {
+    if (!window.confirm('Delete this comment?')) return;
+
+    try {
+      await ticketsApi.deleteComment(id, commentId);
+      await fetchTicket();
+    } catch (error) {
+      setError('Failed to delete comment');
+    }
+  };
+
   const handleVote = async (isUpvote) => {
     try {
       await ticketsApi.voteTicket(id, isUpvote);
@@ -287,7 +331,7 @@ const TicketDetail = () => {
                   <option value="">Unassigned</option>
                   {agents.map((agent) => (
                     <option key={agent.id} value={agent.id}>
-                      {agent.username}
+                      {agent.username} ({agent.workload.open} open, {agent.workload.in_progress} in progress)
                     </option>
                   ))}
                 </select>
@@ -324,7 +368,7 @@ const TicketDetail = () => {
       {/* Comments */}
       <div className="bg-white shadow rounded-lg p-6">
         <h3 className="text-lg font-medium text-gray-900 mb-4">
-          Comments ({ticket.comments?.length || 0})
+          Comments ({ticket.comment_count ?? ticket.comments?.length ?? 0})
         </h3>
 
         {/* Comment Form */}
@@ -372,9 +416,48 @@ const TicketDetail = () => {
                   <span className="text-sm text-gray-500">
                     {formatDate(comment.created_at)}
                   </span>
+                  {comment.edit_count > 0 && (
+                    <span className="text-xs text-gray-400">(edited)</span>
+                  )}
                 </div>
+                {(comment.user_id === user?.id || isAdmin) && editingComment !== comment.id && (
+                  <div className="flex items-center space-x-3 text-sm">
+                    <button onClick={() => startEditComment(comment)} className="text-blue-600 hover:text-blue-800">
+                      Edit
+                    </button>
+                    <button onClick={() => handleDeleteComment(comment.id)} className="text-red-600 hover:text-red-800">
+                      Delete
+                    </button>
+                  </div>
+                )}
               </div>
-              <p className="text-gray-700 whitespace-pre-wrap">{comment.content}</p>
+              {editingComment === comment.id ? (
+                <div>
+                  <textarea
+                    rows={3}
+                    value={editContent}
+                    onChange={(e) => setEditContent(e.target.value)}
+                    className="block w-full border-gray-300 rounded-md shadow-sm focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
+                  />
+                  <div className="mt-2 flex justify-end space-x-2">
+                    <button
+                      onClick={() => setEditingComment(null)}
+                      className="px-3 py-1 text-sm text-gray-700 border border-gray-300 rounded-md hover:bg-gray-50"
+                    >
+                      Cancel
+                    </button>
+                    <button
+                      onClick={() => handleEditComment(comment.id)}
+                      disabled={commentLoading || !editContent.trim()}
+                      className="px-3 py-1 text-sm text-white bg-blue-600 rounded-md hover:bg-blue-700 disabled:opacity-50"
+                    >
+                      Save
+                    </button>
+                  </div>
+                </div>
+              ) : (
+                <p className="text-gray-700 whitespace-pre-wrap">{comment.content}</p>
+              )}
             </div>
           ))}
           
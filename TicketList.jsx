@@ -17,6 +17,8 @@ import {
 } from 'lucide-react';
 import LoadingSpinner from '../ui/LoadingSpinner';
 
+const LIST_FIELDS = 'id,subject,status,priority,created_at,comment_count,upvotes,downvotes,stale';
+
 const TicketList = () => {
   const { user, isAdmin, isSupportAgent, isEndUser } = useAuth();
   const [searchParams, setSearchParams] = useSearchParams();
@@ -82,6 +84,10 @@ const TicketList = () => {
         }
       });
 
+      // Only request what the list renders
+      params.fields = LIST_FIELDS;
+      params.expand = 'creator,category';
+
       const response = await ticketsApi.getTickets(params);
       setTickets(response.tickets);
       setPagination(response.pagination);
@@ -267,6 +273,7 @@ const TicketList = () => {
                 <option value="all">All Tickets</option>
                 <option value="my_tickets">My Tickets</option>
                 <option value="unassigned">Unassigned</option>
+                <option value="stale">Stale</option>
               </select>
             </div>
           )}
@@ -303,6 +310,7 @@ const TicketList = () => {
               <option value="created_at">Created Date</option>
               <option value="updated_at">Last Modified</option>
               <option value="most_replied">Most Replied</option>
+              <option value="urgency">Urgency</option>
             </select>
           </div>
 
@@ -367,6 +375,14 @@ const TicketList = () => {
                           <span className={`ml-2 text-xs font-medium ${getPriorityColor(ticket.priority)}`}>
                             {ticket.priority}
                           </span>
+                          {ticket.stale && (
+                            <span
+                              className="ml-2 inline-flex items-center px-2 py-0.5 rounded text-xs font-medium bg-orange-100 text-orange-800"
+                              title="In progress with no activity for a while"
+                            >
+                              stale
+                            </span>
+                          )}
                         </div>
                         <div className="mt-1 flex items-center text-sm text-gray-500 space-x-4">
                           <div className="flex items-center">
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { usersApi } from '../../lib/api';
 import { 
   Users, 
@@ -15,6 +15,10 @@ import LoadingSpinner from '../ui/LoadingSpinner';
 const UserManagement = () => {
   const [users, setUsers] = useState([]);
   const [stats, setStats] = useState({});
+  const [workload, setWorkload] = useState({});
+  const [searchText, setSearchText] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+  const latestSearch = useRef('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [pagination, setPagination] = useState({});
@@ -29,6 +33,7 @@ const UserManagement = () => {
   useEffect(() => {
     fetchUsers();
     fetchStats();
+    fetchWorkload();
   }, [filters]);
 
   const fetchUsers = async () => {
@@ -65,6 +70,54 @@ const UserManagement = () => {
     }
   };
 
+  const fetchWorkload = async () => {
+    try {
+      const response = await usersApi.getAgentWorkload();
+      setWorkload(Object.fromEntries(response.agents.map((agent) => [agent.id, agent.workload])));
+    } catch (error) {
+      console.error('Failed to fetch agent workload:', error);
+    }
+  };
+
+  const formatWorkload = (load) => {
+    if (!load) {
+      return '-';
+    }
+    const days = load.oldest_open_age_seconds === null ? null : Math.floor(load.oldest_open_age_seconds / 86400);
+    return `${load.open} open, ${load.in_progress} in progress, ${load.resolved_this_week} resolved this week` +
+      (days === null ? '' : `, oldest open ${days}d`);
+  };
+
+  // Suggestions come from the in-memory autocomplete index; the paginated
+  // list is only re-fetched once a search is submitted or picked
+  const handleSearchInput = async (value) => {
+    setSearchText(value);
+    latestSearch.current = value;
+    if (!value.trim()) {
+      setSuggestions([]);
+      if (filters.search) {
+        handleFilterChange('search', '');
+      }
+      return;
+    }
+    try {
+      const response = await usersApi.autocompleteUsers(value, { fuzzy: 'true', limit: 8 });
+      // Ignore answers to keystrokes that have since been superseded
+      if (latestSearch.current === value) {
+        setSuggestions(response.users);
+      }
+    } catch (error) {
+      console.error('Autocomplete error:', error);
+    }
+  };
+
+  const applySearch = (value) => {
+    setSearchText(value);
+    latestSearch.current = '';
+    setSuggestions([]);
+    handleFilterChange('search', value.trim());
+  };
+
   const handleFilterChange = (key, value) => {
     setFilters(prev => ({
       ...prev,
@@ -240,11 +293,27 @@ const UserManagement = () => {
               <input
                 type="text"
                 id="search"
-                value={filters.search}
-                onChange={(e) => handleFilterChange('search', e.target.value)}
+                value={searchText}
+                onChange={(e) => handleSearchInput(e.target.value)}
+                onKeyDown={(e) => e.key === 'Enter' && applySearch(searchText)}
+                autoComplete="off"
                 className="block w-full pl-10 pr-3 py-2 border border-gray-300 rounded-md leading-5 bg-white placeholder-gray-500 focus:outline-none focus:placeholder-gray-400 focus:ring-1 focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
                 placeholder="Search by username or email..."
               />
+              {suggestions.length > 0 && (
+                <ul className="absolute z-10 mt-1 w-full bg-white shadow-lg rounded-md border border-gray-200 max-h-60 overflow-auto">
+                  {suggestions.map((suggestion) => (
+                    <li
+                      key={suggestion.id}
+                      onMouseDown={() => applySearch(suggestion.username)}
+                      className="px-3 py-2 cursor-pointer hover:bg-gray-100 text-sm"
+                    >
+                      <span className="font-medium text-gray-900">{suggestion.username}</span>
+                      <span className="ml-2 text-gray-500">{suggestion.email}</span>
+                    </li>
+                  ))}
+                </ul>
+              )}
             </div>
           </div>
 
@@ -302,6 +371,9 @@ const UserManagement = () => {
                   <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                     Status
                   </th>
+                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                    Workload
+                  </th>
                   <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                     Joined
                   </th>
@@ -337,6 +409,9 @@ const UserManagement = () => {
                         {user.is_active ? 'Active' : 'Inactive'}
                       </span>
                     </td>
+                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                      {formatWorkload(workload[user.id])}
+                    </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
                       {formatDate(user.created_at)}
                     </td>
@@ -41,6 +41,28 @@ async function apiRequest(endpoint, options = {}) {
   }
 }
 
+// Retry a create with one Idempotency-Key, so a retry after a lost response
+// gets the original result instead of posting a duplicate
+async function idempotentRequest(endpoint, options, attempts = 3) {
+  const headers = {
+    ...(options.body instanceof FormData ? {} : { 'Content-Type': 'application/json' }),
+    'Idempotency-Key': crypto.randomUUID(),
+  };
+
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await apiRequest(endpoint, { ...options, headers });
+    } catch (error) {
+      // 0: the response was lost; 409: the first attempt is still running
+      const retryable = error.status === 0 || error.status === 409;
+      if (!retryable || attempt >= attempts) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    }
+  }
+}
+
 // Authentication API
 export const authApi = {
   register: (userData) => apiRequest('/auth/register', {
@@ -55,7 +77,7 @@ export const authApi = {
 
   logout: () => apiRequest('/auth/logout', {
     method: 'POST',
-  }),
+  }).finally(() => syncStore.clear()),
 
   getCurrentUser: () => apiRequest('/auth/me'),
 
@@ -74,7 +96,7 @@ export const ticketsApi = {
 
   getTicket: (id) => apiRequest(`/tickets/${id}`),
 
-  createTicket: (formData) => apiRequest('/tickets', {
+  createTicket: (formData) => idempotentRequest('/tickets', {
     method: 'POST',
     body: formData, // FormData for file upload
   }),
@@ -84,11 +106,22 @@ export const ticketsApi = {
     body: JSON.stringify(data),
   }),
 
-  addComment: (id, comment) => apiRequest(`/tickets/${id}/comments`, {
+  addComment: (id, comment) => idempotentRequest(`/tickets/${id}/comments`, {
     method: 'POST',
     body: JSON.stringify(comment),
   }),
 
+  editComment: (id, commentId, content) => apiRequest(`/tickets/${id}/comments/${commentId}`, {
+    method: 'PUT',
+    body: JSON.stringify({ content }),
+  }),
+
+  deleteComment: (id, commentId) => apiRequest(`/tickets/${id}/comments/${commentId}`, {
+    method: 'DELETE',
+  }),
+
+  getCommentRevisions: (id, commentId) => apiRequest(`/tickets/${id}/comments/${commentId}/revisions`),
+
   voteTicket: (id, isUpvote) => apiRequest(`/tickets/${id}/vote`, {
     method: 'POST',
     body: JSON.stringify({ is_upvote: isUpvote }),
@@ -97,6 +130,28 @@ export const ticketsApi = {
   removeVote: (id) => apiRequest(`/tickets/${id}/vote`, {
     method: 'DELETE',
   }),
+
+  checkDuplicates: (data) => apiRequest('/tickets/duplicates', {
+    method: 'POST',
+    body: JSON.stringify(data),
+  }),
+
+  mergeTicket: (id, canonicalId) => apiRequest(`/tickets/${id}/merge`, {
+    method: 'POST',
+    body: JSON.stringify({ into: canonicalId }),
+  }),
+
+  getTicketEvents: (id, params = {}) => {
+    const searchParams = new URLSearchParams(params);
+    return apiRequest(`/tickets/${id}/events?${searchParams}`);
+  },
+
+  getPerformance: () => apiRequest('/tickets/performance'),
+
+  rebalanceTickets: (options = {}) => apiRequest('/tickets/rebalance', {
+    method: 'POST',
+    body: JSON.stringify(options),
+  }),
 };
 
 // Categories API
@@ -127,6 +182,11 @@ export const usersApi = {
     return apiRequest(`/users?${searchParams}`);
   },
 
+  autocompleteUsers: (q, params = {}) => {
+    const searchParams = new URLSearchParams({ q, ...params });
+    return apiRequest(`/users/autocomplete?${searchParams}`);
+  },
+
   getUser: (id) => apiRequest(`/users/${id}`),
 
   updateUser: (id, data) => apiRequest(`/users/${id}`, {
@@ -136,6 +196,8 @@ export const usersApi = {
 
   getAgents: () => apiRequest('/users/agents'),
 
+  getAgentWorkload: () => apiRequest('/users/agents/workload'),
+
   deactivateUser: (id) => apiRequest(`/users/${id}/deactivate`, {
     method: 'POST',
   }),
@@ -147,5 +209,134 @@ export const usersApi = {
   getUserStats: () => apiRequest('/users/stats'),
 };
 
+// Saved filters API
+export const savedFiltersApi = {
+  getFilters: () => apiRequest('/saved-filters'),
+
+  createFilter: (data) => apiRequest('/saved-filters', {
+    method: 'POST',
+    body: JSON.stringify(data),
+  }),
+
+  updateFilter: (id, data) => apiRequest(`/saved-filters/${id}`, {
+    method: 'PUT',
+    body: JSON.stringify(data),
+  }),
+
+  deleteFilter: (id) => apiRequest(`/saved-filters/${id}`, {
+    method: 'DELETE',
+  }),
+
+  getFilterTickets: (id, params = {}) => {
+    const searchParams = new URLSearchParams(params);
+    return apiRequest(`/saved-filters/${id}/tickets?${searchParams}`);
+  },
+};
+
+// Reports API
+export const reportsApi = {
+  getTicketReport: (params = {}) => {
+    const searchParams = new URLSearchParams(params);
+    return apiRequest(`/reports/tickets?${searchParams}`);
+  },
+
+  refreshReports: () => apiRequest('/reports/refresh', {
+    method: 'POST',
+  }),
+};
+
+// Notifications API
+export const notificationsApi = {
+  // Live ticket events; EventSource reconnects and resumes from the last event id by itself
+  subscribe: (onEvent) => {
+    const source = new EventSource(`${API_BASE_URL}/notifications/stream`, { withCredentials: true });
+    source.addEventListener('ticket', (event) => onEvent(JSON.parse(event.data)));
+    return () => source.close();
+  },
+};
+
+// Local copy of tickets, comments and categories, kept current with /sync deltas
+// and persisted so views can render (and work offline) before the network answers
+const SYNC_STORAGE_KEY = 'quickdesk.sync';
+
+const emptySyncState = () => ({ token: null, tickets: {}, comments: {}, categories: {} });
+
+function loadSyncState() {
+  try {
+    return JSON.parse(localStorage.getItem(SYNC_STORAGE_KEY)) || emptySyncState();
+  } catch {
+    return emptySyncState();
+  }
+}
+
+export const syncStore = {
+  state: loadSyncState(),
+  pending: null,
+
+  // Fetch and apply every delta since the last pull; concurrent callers share one pull
+  pull() {
+    if (!this.pending) {
+      this.pending = this.pullAll().finally(() => {
+        this.pending = null;
+      });
+    }
+    return this.pending;
+  },
+
+  async pullAll() {
+    let state = this.state;
+    for (;;) {
+      const query = state.token ? `?token=${encodeURIComponent(state.token)}` : '';
+      const changes = await apiRequest(`/sync${query}`);
+      if (changes.reset) {
+        state = emptySyncState();
+      }
+      changes.tickets.forEach((ticket) => { state.tickets[ticket.id] = ticket; });
+      changes.archived.forEach((ticketId) => {
+        delete state.tickets[ticketId];
+        Object.values(state.comments)
+          .filter((comment) => comment.ticket_id === ticketId)
+          .forEach((comment) => { delete state.comments[comment.id]; });
+      });
+      changes.comments.forEach((comment) => { state.comments[comment.id] = comment; });
+      changes.deleted.comments.forEach(({ id }) => { delete state.comments[id]; });
+      changes.categories.forEach((category) => { state.categories[category.id] = category; });
+      changes.deleted.categories.forEach((id) => { delete state.categories[id]; });
+      state.token = changes.token;
+      if (!changes.has_more) {
+        break;
+      }
+    }
+    this.state = state;
+    this.save();
+    return state;
+  },
+
+  save() {
+    try {
+      localStorage.setItem(SYNC_STORAGE_KEY, JSON.stringify(this.state));
+    } catch {
+      // Storage full or unavailable: keep the in-memory copy only
+    }
+  },
+
+  clear() {
+    this.state = emptySyncState();
+    localStorage.removeItem(SYNC_STORAGE_KEY);
+  },
+
+  // The ticket with its comments in the detail view's shape, or null if not synced
+  getTicket(id) {
+    const ticket = this.state.tickets[id];
+    if (!ticket) {
+      return null;
+    }
+    const comments = Object.values(this.state.comments)
+      .filter((comment) => comment.ticket_id === ticket.id)
+      .sort((a, b) => (a.created_at < b.created_at ? -1 : 1));
+    return { ...ticket, comments };
+  },
+};
+
 export { ApiError };
 
@@ -0,0 +1,91 @@
+"""Hot/cold split for closed tickets.
+
+Closed tickets that haven't changed for a while are moved, together with their
+comments, the comments' edit history and votes, from the live tables into the
+archived_* tables. Each batch is one transaction of INSERT ... SELECT and
+DELETE statements, so a ticket is always in exactly one place and the live
+tables only hold the working set.
+"""
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus
+from src.models.comment import Comment
+from src.models.comment_revision import CommentRevision
+from src.models.vote import Vote
+from src.models.ticket_signature import TicketSignature, TicketLSHBucket
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment, ArchivedCommentRevision, ArchivedVote
+from sqlalchemy import insert, select, delete, exists
+from datetime import datetime, timedelta
+
+# (live model, archive model, rows of the given tickets), parents before children
+ARCHIVED_TABLES = (
+    (Ticket, ArchivedTicket, lambda ticket_ids: Ticket.id.in_(ticket_ids)),
+    (Comment, ArchivedComment, lambda ticket_ids: Comment.ticket_id.in_(ticket_ids)),
+    (CommentRevision, ArchivedCommentRevision, lambda ticket_ids: CommentRevision.comment_id.in_(
+        select(Comment.id).where(Comment.ticket_id.in_(ticket_ids))
+    )),
+    (Vote, ArchivedVote, lambda ticket_ids: Vote.ticket_id.in_(ticket_ids)),
+)
+
+
+def _copy_statement(live, archived, rows, now):
+    """INSERT ... SELECT of the columns both tables share"""
+    live_table = live.__table__
+    names = [column.name for column in archived.__table__.columns if column.name in live_table.c]
+    columns = [live_table.c[name] for name in names]
+    if 'archived_at' in archived.__table__.c:
+        names.append('archived_at')
+        columns.append(db.literal(now))
+    return insert(archived.__table__).from_select(names, select(*columns).where(rows))
+
+
+def _archive_stranded_revisions():
+    """Move edit history left live by archive runs from before it was archived too"""
+    stranded = CommentRevision.comment_id.in_(select(ArchivedComment.id))
+    db.session.execute(_copy_statement(CommentRevision, ArchivedCommentRevision, stranded, None))
+    db.session.execute(delete(CommentRevision).where(stranded))
+    db.session.commit()
+
+
+def archive_closed_tickets(older_than_days, batch_size=500, now=None):
+    """Move closed tickets last updated before the cutoff; returns the number archived"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+
+    _archive_stranded_revisions()
+
+    archived = 0
+    while True:
+        # SQLite hands out the highest rowid again once it is deleted, so the newest
+        # ticket, comment and vote always stay live to keep ids unique and increasing
+        newest = {model: select(db.func.max(model.id)).scalar_subquery() for model in (Ticket, Comment, Vote)}
+        ticket_ids = [
+            row.id for row in db.session.query(Ticket.id).filter(
+                Ticket.status == TicketStatus.CLOSED,
+                Ticket.updated_at < cutoff,
+                Ticket.id < newest[Ticket],
+                ~exists().where(Comment.ticket_id == Ticket.id, Comment.id == newest[Comment]),
+                ~exists().where(Vote.ticket_id == Ticket.id, Vote.id == newest[Vote])
+            ).order_by(Ticket.id).limit(batch_size)
+        ]
+        if not ticket_ids:
+            break
+
+        try:
+            for live, archived_model, rows in ARCHIVED_TABLES:
+                db.session.execute(_copy_statement(live, archived_model, rows(ticket_ids), now))
+
+            # Children first; closed tickets are never duplicate candidates so their index rows go too
+            for live, archived_model, rows in reversed(ARCHIVED_TABLES[1:]):
+                db.session.execute(delete(live).where(rows(ticket_ids)))
+            db.session.execute(delete(TicketLSHBucket).where(TicketLSHBucket.ticket_id.in_(ticket_ids)))
+            db.session.execute(delete(TicketSignature).where(TicketSignature.ticket_id.in_(ticket_ids)))
+            db.session.execute(delete(Ticket).where(Ticket.id.in_(ticket_ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        archived += len(ticket_ids)
+
+    return archived
+
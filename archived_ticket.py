@@ -0,0 +1,119 @@
+from src.models.user import db
+from src.models.ticket import TicketMixin, TicketStatus, TicketPriority
+from src.models.comment import Comment
+from src.models.comment_revision import CommentRevision
+from src.models.attachment import AttachmentStatus
+from src.tenancy import TenantScoped
+from sqlalchemy.orm import query_expression
+from datetime import datetime
+
+# Cold storage for closed tickets, filled by src/archive.py. Rows keep their
+# original ids so links and references to archived tickets still resolve.
+
+class ArchivedTicket(TicketMixin, TenantScoped, db.Model):
+    __tablename__ = 'archived_tickets'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    subject = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    status = db.Column(db.Enum(TicketStatus), nullable=False)
+    priority = db.Column(db.Enum(TicketPriority), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    attachment_path = db.Column(db.String(500), nullable=True)
+    attachment_status = db.Column(db.Enum(AttachmentStatus), nullable=True)
+    first_response_at = db.Column(db.DateTime, nullable=True)
+    urgency_score = db.Column(db.Integer, nullable=True)
+    sla_due_at = db.Column(db.DateTime, nullable=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    stale_since = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Foreign Keys (duplicate_of may point at a live or an archived ticket)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    duplicate_of = db.Column(db.Integer, nullable=True)
+    
+    # Relationships
+    creator = db.relationship('User', foreign_keys=[user_id])
+    assignee = db.relationship('User', foreign_keys=[assigned_to])
+    category = db.relationship('Category')
+    comments = db.relationship('ArchivedComment', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
+    votes = db.relationship('ArchivedVote', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
+    
+    __table_args__ = (db.Index('ix_archived_tickets_tenant', 'tenant_id', 'archived_at'),)
+    
+    # Truncated description, only populated by load_options(description_length=...)
+    description_preview = query_expression()
+    
+    def to_dict(self, include_comments=False, fields=None, expand=None, description_length=None):
+        """Convert archived ticket to dictionary, same shape as a live ticket plus archived_at"""
+        result = super().to_dict(include_comments, fields, expand, description_length)
+        result['archived_at'] = self.archived_at
+        return result
+    
+    def __repr__(self):
+        return f'<ArchivedTicket {self.id}: {self.subject}>'
+
+class ArchivedComment(db.Model):
+    __tablename__ = 'archived_comments'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    is_internal = db.Column(db.Boolean, default=False)
+    edit_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    deleted_by = db.Column(db.Integer, nullable=True)
+    
+    # Foreign Keys
+    ticket_id = db.Column(db.Integer, db.ForeignKey('archived_tickets.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    author = db.relationship('User')
+    
+    # Same payload and tombstone predicate as a live comment
+    to_dict = Comment.to_dict
+    live = classmethod(Comment.live.__func__)
+    
+    def __repr__(self):
+        return f'<ArchivedComment {self.id} on Ticket {self.ticket_id}>'
+
+class ArchivedCommentRevision(db.Model):
+    """Edit history of an archived comment, moved with it (see CommentRevision)"""
+    __tablename__ = 'archived_comment_revisions'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    revision = db.Column(db.Integer, nullable=False)
+    delta = db.Column(db.Text, nullable=False)
+    edited_at = db.Column(db.DateTime, nullable=False)
+    
+    comment_id = db.Column(db.Integer, db.ForeignKey('archived_comments.id'), nullable=False)
+    edited_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('comment_id', 'revision', name='uq_archived_comment_revisions_comment_revision'),
+    )
+    
+    operations = CommentRevision.operations
+    
+    def __repr__(self):
+        return f'<ArchivedCommentRevision {self.revision} of ArchivedComment {self.comment_id}>'
+
+class ArchivedVote(db.Model):
+    __tablename__ = 'archived_votes'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    is_upvote = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime)
+    
+    # Foreign Keys
+    ticket_id = db.Column(db.Integer, db.ForeignKey('archived_tickets.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    def __repr__(self):
+        vote_type = "upvote" if self.is_upvote else "downvote"
+        return f'<ArchivedVote {self.id}: {vote_type} on Ticket {self.ticket_id}>'
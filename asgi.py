@@ -0,0 +1,448 @@
+"""ASGI serving mode.
+
+Connections live on an asyncio event loop instead of one worker thread each:
+
+- Request bodies (uploads included) are received on the loop before any
+  thread is involved, spooling to disk past 1 MB.
+- Flask handlers, and with them all blocking database work, run on a bounded
+  thread pool (--threads). The pool size caps concurrent database work no
+  matter how many clients are connected.
+- Response bodies are pulled from Flask in chunks on the pool but written on
+  the loop, so a slow client never holds a thread while it drains.
+- /api/notifications/stream is answered natively: one poller per tenant and
+  process reads the ticket event log and fans events out to the open streams.
+
+Usage: python -m src.asgi [--bind 0.0.0.0:8000] [--threads 16] [--workers 1]
+
+Needs uvicorn. On SIGTERM the process fails /readyz for --drain-delay seconds
+before uvicorn stops accepting connections (single worker mode).
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from werkzeug.http import parse_cookie
+from src.main import app
+from src.models.user import db, User
+from src.routes.health import mark_draining, is_draining
+from src.tenancy import tenant_context, DEFAULT_TENANT_ID
+from src.policy import Principal
+from src.notifications import (
+    latest_event_id, fetch_events, is_visible, format_event, stream_preamble,
+    parse_last_event_id, HEARTBEAT
+)
+
+try:
+    import uvicorn
+except ImportError:  # Only needed to run the server, not to import the application
+    uvicorn = None
+
+STREAM_PATH = '/api/notifications/stream'
+# Bytes pulled from a Flask response per thread pool hop
+RESPONSE_CHUNK = 64 * 1024
+# Request bodies larger than this go to a temporary file instead of memory
+SPOOL_SIZE = 1024 * 1024
+# Events buffered per stream before a slow subscriber is disconnected
+SUBSCRIBER_QUEUE = 256
+
+
+def build_environ(scope, body, content_length):
+    """WSGI environ for an ASGI HTTP scope (PEP 3333 strings are latin-1)"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+            continue
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def send_json_error(send, status, message):
+    body = app.json.dumps({'error': message}).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class Subscriber:
+    """One open notification stream"""
+
+    def __init__(self, user, last_id):
+        self.user = user
+        self.last_id = last_id
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self.closed = False
+
+    def offer(self, event, payload):
+        if self.closed or event['id'] <= self.last_id:
+            return
+        self.last_id = event['id']
+        if not is_visible(event, self.user):
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Too far behind; dropping it makes the client reconnect and replay from Last-Event-ID
+            self.close()
+
+    def close(self):
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Notifier:
+    """Single event log poller per tenant, broadcasting to that tenant's open streams"""
+
+    def __init__(self, server, tenant_id):
+        self.server = server
+        self.tenant_id = tenant_id
+        self.subscribers = set()
+        self.last_id = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def subscribe(self, subscriber, resume_from):
+        self.subscribers.add(subscriber)
+        self._wakeup.set()
+        if resume_from is not None:
+            # Replay what the client missed; offer() drops anything the poller delivers twice
+            for event, payload in await self.server.run_sync(self._fetch, resume_from, tenant_id=self.tenant_id):
+                subscriber.offer(event, payload)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    @staticmethod
+    def _fetch(after_id):
+        return [(event, format_event(event)) for event in fetch_events(after_id)]
+
+    async def run(self):
+        poll = app.config['NOTIFY_POLL_SECONDS']
+        while True:
+            if not self.subscribers:
+                # Nobody listening: don't touch the database, start from the head when someone joins
+                self.last_id = None
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if is_draining():
+                # End open streams so clients reconnect elsewhere and shutdown isn't held up by them
+                for subscriber in list(self.subscribers):
+                    subscriber.close()
+            try:
+                if self.last_id is None:
+                    self.last_id = await self.server.run_sync(latest_event_id, tenant_id=self.tenant_id)
+                for event, payload in await self.server.run_sync(self._fetch, self.last_id, tenant_id=self.tenant_id):
+                    self.last_id = event['id']
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(event, payload)
+            except Exception:
+                app.logger.exception('Notification poll failed')
+            await asyncio.sleep(poll)
+
+
+class QuickDeskASGI:
+    """ASGI application wrapping the Flask app"""
+
+    def __init__(self, flask_app, threads=None):
+        self.app = flask_app
+        self.threads = threads or int(os.environ.get('ASGI_THREADS', 16))
+        self.executor = None
+        self.notifiers = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            self._ensure_started()
+            if scope['path'] == STREAM_PATH and scope['method'] == 'GET':
+                await self.notification_stream(scope, receive, send)
+            else:
+                await self.handle_wsgi(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']}")
+
+    def _ensure_started(self):
+        # Servers without lifespan support start us on the first request
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='quickdesk')
+
+    def notifier_for(self, tenant_id):
+        notifier = self.notifiers.get(tenant_id)
+        if notifier is None:
+            notifier = self.notifiers[tenant_id] = Notifier(self, tenant_id)
+            notifier.start()
+        return notifier
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._ensure_started()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                mark_draining()
+                for notifier in self.notifiers.values():
+                    await notifier.stop()
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run_sync(self, function, *args, tenant_id=None):
+        """Run blocking work on the bounded pool inside an app context, as a tenant"""
+        def call():
+            with self.app.app_context(), tenant_context(tenant_id):
+                try:
+                    return function(*args)
+                finally:
+                    db.session.remove()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def read_body(self, receive):
+        """Receive the whole request body on the loop; returns (file, length) or None if too large"""
+        limit = self.app.config.get('MAX_CONTENT_LENGTH')
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        length = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None, 0
+            chunk = message.get('body', b'')
+            length += len(chunk)
+            if limit is not None and length > limit:
+                body.close()
+                return None, length
+            body.write(chunk)
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        return body, length
+
+    async def handle_wsgi(self, scope, receive, send):
+        body, length = await self.read_body(receive)
+        if body is None:
+            if length:
+                await send_json_error(send, 413, 'Request too large')
+            return
+
+        loop = asyncio.get_running_loop()
+        # One context for the whole response, so Flask's context locals survive pool thread hops
+        context = contextvars.copy_context()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and 'status' in response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+            return lambda data: (_ for _ in ()).throw(RuntimeError('write() is not supported'))
+
+        def pull(iterator):
+            chunks = []
+            size = 0
+            for chunk in iterator:
+                if chunk:
+                    chunks.append(chunk)
+                    size += len(chunk)
+                if size >= RESPONSE_CHUNK:
+                    return b''.join(chunks), False
+            return b''.join(chunks), True
+
+        def begin():
+            iterable = self.app(build_environ(scope, body, length), start_response)
+            iterator = iter(iterable)
+            return iterable, iterator, pull(iterator)
+
+        def finish(iterable):
+            try:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            finally:
+                body.close()
+
+        iterable = None
+        try:
+            iterable, iterator, (chunk, done) = await loop.run_in_executor(self.executor, context.run, begin)
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            while True:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': not done})
+                if done:
+                    break
+                chunk, done = await loop.run_in_executor(self.executor, context.run, pull, iterator)
+        finally:
+            # Flask tears down the request context (and its session) when the iterable is closed
+            if iterable is not None:
+                await loop.run_in_executor(self.executor, context.run, finish, iterable)
+            else:
+                body.close()
+
+    def _session_user(self, scope):
+        """(user id, tenant id) from the signed Flask session cookie, or (None, None)"""
+        header = b'; '.join(value for name, value in scope['headers'] if name == b'cookie')
+        cookies = parse_cookie(header.decode('latin-1'))
+        cookie = cookies.get(self.app.config['SESSION_COOKIE_NAME'])
+        serializer = self.app.session_interface.get_signing_serializer(self.app)
+        if not cookie or serializer is None:
+            return None, None
+        try:
+            data = serializer.loads(cookie, max_age=int(self.app.permanent_session_lifetime.total_seconds()))
+        except Exception:
+            return None, None
+        return data.get('user_id'), data.get('tenant_id', DEFAULT_TENANT_ID)
+
+    async def notification_stream(self, scope, receive, send):
+        """Native async SSE stream; holds no thread while connected"""
+        user_id, tenant_id = self._session_user(scope)
+        user = await self.run_sync(db.session.get, User, user_id, tenant_id=tenant_id) if user_id is not None else None
+        if user is None:
+            await send_json_error(send, 401, 'Authentication required')
+            return
+
+        headers = dict(scope['headers'])
+        resume_from = parse_last_event_id(headers.get(b'last-event-id', b'').decode('latin-1') or None)
+        notifier = self.notifier_for(tenant_id)
+        subscriber = Subscriber(Principal(user.id, user.role), resume_from if resume_from is not None else 0)
+        if resume_from is None:
+            subscriber.last_id = notifier.last_id if notifier.last_id is not None else \
+                await self.run_sync(latest_event_id, tenant_id=tenant_id)
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': stream_preamble(), 'more_body': True})
+
+        await notifier.subscribe(subscriber, resume_from)
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        heartbeat = self.app.config['NOTIFY_HEARTBEAT_SECONDS']
+        try:
+            while not disconnected.done():
+                getter = asyncio.ensure_future(subscriber.queue.get())
+                finished, _ = await asyncio.wait(
+                    {getter, disconnected}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter not in finished:
+                    getter.cancel()
+                    if not disconnected.done():
+                        await send({'type': 'http.response.body', 'body': HEARTBEAT, 'more_body': True})
+                    continue
+                payload = getter.result()
+                if payload is None:
+                    break
+                await send({'type': 'http.response.body', 'body': payload, 'more_body': True})
+        finally:
+            notifier.unsubscribe(subscriber)
+            if not disconnected.done():
+                disconnected.cancel()
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+
+application = QuickDeskASGI(app)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run QuickDesk as an ASGI application')
+    parser.add_argument('--bind', default=os.environ.get('BIND', '0.0.0.0:8000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('ASGI_THREADS', 16)))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--drain-delay', type=float, default=float(os.environ.get('DRAIN_DELAY', 5)))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if uvicorn is None:
+        sys.exit('ASGI mode needs uvicorn: pip install uvicorn')
+
+    host, _, port = args.bind.rpartition(':')
+    application.threads = args.threads
+    os.environ['ASGI_THREADS'] = str(args.threads)
+
+    if args.workers > 1:
+        # uvicorn supervises the worker processes itself, each importing `application`
+        uvicorn.run('src.asgi:application', host=host or '0.0.0.0', port=int(port), workers=args.workers,
+                    timeout_graceful_shutdown=args.graceful_timeout, lifespan='on')
+        return
+
+    class DrainingServer(uvicorn.Server):
+        """Fail readiness for drain_delay seconds before shutting down"""
+
+        def handle_exit(self, sig, frame):
+            mark_draining()
+            timer = threading.Timer(args.drain_delay, super().handle_exit, (sig, frame))
+            timer.daemon = True
+            timer.start()
+
+    config = uvicorn.Config(application, host=host or '0.0.0.0', port=int(port), lifespan='on',
+                            timeout_graceful_shutdown=args.graceful_timeout)
+    DrainingServer(config).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+from flask import current_app
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.tenancy import PerTenant
+from sqlalchemy import and_, case, insert, or_, update
+from collections import defaultdict
+from datetime import datetime
+import heapq
+import threading
+import time
+
+# Statuses that count towards an agent's workload
+ACTIVE_STATUSES = (TicketStatus.OPEN, TicketStatus.IN_PROGRESS)
+
+DEFAULT_CONFIG = {
+    'AUTO_ASSIGN_TICKETS': True,
+    # Agents within this many open tickets of the least loaded one compete on category affinity
+    'ASSIGNMENT_AFFINITY_SLACK': 2,
+    # Rebuild from the database this often to pick up changes made by other worker processes
+    'ASSIGNMENT_RESYNC_SECONDS': 60,
+}
+
+def is_active_status(status):
+    """Check whether a ticket in this status counts towards agent load"""
+    return status in ACTIVE_STATUSES
+
+
+class AssignmentEngine:
+    """Balances new tickets across support agents by open load and category affinity.
+
+    Loads live in a min-heap of (load, agent_id) entries with lazy deletion: an
+    entry is stale when its load no longer matches the current load for that
+    agent. State is built with two GROUP BY queries and then kept in step with
+    ticket changes, so picking an agent never runs a COUNT per agent.
+
+    Each tenant has its own engine (see assignment_engine below), so loads are
+    only ever built from and applied to one tenant's agents and tickets.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loads = None
+        self._affinity = None
+        self._heap = []
+        self._loaded_at = 0.0
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+
+    def invalidate(self):
+        """Drop cached state; the next call rebuilds it (e.g. after agent changes)"""
+        with self._lock:
+            self._loads = None
+
+    def _ensure_loaded(self):
+        resync = current_app.config['ASSIGNMENT_RESYNC_SECONDS']
+        if self._loads is not None and time.monotonic() - self._loaded_at < resync:
+            return
+
+        agent_ids = [
+            row.id for row in db.session.query(User.id).filter(
+                User.role == UserRole.SUPPORT_AGENT,
+                User.is_active == True
+            )
+        ]
+        loads = dict.fromkeys(agent_ids, 0)
+        for agent_id, count in db.session.query(Ticket.assigned_to, db.func.count(Ticket.id)).filter(
+            Ticket.assigned_to.in_(agent_ids),
+            Ticket.status.in_(ACTIVE_STATUSES)
+        ).group_by(Ticket.assigned_to):
+            loads[agent_id] = count
+
+        affinity = defaultdict(lambda: defaultdict(int))
+        for agent_id, category_id, count in db.session.query(
+            Ticket.assigned_to, Ticket.category_id, db.func.count(Ticket.id)
+        ).filter(Ticket.assigned_to.in_(agent_ids)).group_by(Ticket.assigned_to, Ticket.category_id):
+            affinity[agent_id][category_id] = count
+
+        self._loads = loads
+        self._affinity = affinity
+        self._heap = [(load, agent_id) for agent_id, load in loads.items()]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+
+    def _set_load(self, agent_id, load):
+        self._loads[agent_id] = load
+        heapq.heappush(self._heap, (load, agent_id))
+
+    def _pop_current(self):
+        """Pop the least loaded agent, skipping stale heap entries"""
+        while self._heap:
+            load, agent_id = heapq.heappop(self._heap)
+            if self._loads.get(agent_id) == load:
+                return load, agent_id
+        return None
+
+    def reserve(self, category_id, exclude=None):
+        """Pick an agent for a new ticket and count it against them; returns agent id or None"""
+        with self._lock:
+            self._ensure_loaded()
+            skipped = []
+            candidates = []
+            slack = current_app.config['ASSIGNMENT_AFFINITY_SLACK']
+
+            # Take every agent close to the minimum load, prefer the one who knows the category
+            while True:
+                entry = self._pop_current()
+                if entry is None:
+                    break
+                if entry[1] == exclude:
+                    skipped.append(entry)
+                    continue
+                if candidates and entry[0] > candidates[0][0] + slack:
+                    skipped.append(entry)
+                    break
+                candidates.append(entry)
+
+            for entry in skipped:
+                heapq.heappush(self._heap, entry)
+            if not candidates:
+                return None
+
+            best = max(candidates, key=lambda entry: (self._affinity[entry[1]][category_id], -entry[0]))
+            for entry in candidates:
+                if entry is not best:
+                    heapq.heappush(self._heap, entry)
+
+            load, agent_id = best
+            self._set_load(agent_id, load + 1)
+            self._affinity[agent_id][category_id] += 1
+            return agent_id
+
+    def release(self, agent_id, category_id):
+        """Undo a reservation whose transaction was rolled back"""
+        self.ticket_changed(agent_id, True, None, False)
+        with self._lock:
+            if self._affinity is not None and self._affinity[agent_id][category_id] > 0:
+                self._affinity[agent_id][category_id] -= 1
+
+    def ticket_changed(self, old_agent, old_active, new_agent, new_active, category_id=None):
+        """Apply a committed change of assignee and/or status to the load table"""
+        with self._lock:
+            if self._loads is None:
+                return
+            if old_agent in self._loads and old_active and (old_agent != new_agent or not new_active):
+                self._set_load(old_agent, max(self._loads[old_agent] - 1, 0))
+            if new_agent in self._loads and new_active and (old_agent != new_agent or not old_active):
+                self._set_load(new_agent, self._loads[new_agent] + 1)
+            if category_id is not None and new_agent in self._loads and new_agent != old_agent:
+                self._affinity[new_agent][category_id] += 1
+
+    def loads(self):
+        """Snapshot of open ticket load per agent"""
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._loads)
+
+    def rebalance(self, include_overloaded=False, batch_size=500):
+        """Assign the unassigned open backlog, optionally moving open tickets off overloaded agents"""
+        assigned = 0
+        moved = 0
+
+        # Unassigned backlog, oldest first, in batches
+        while True:
+            rows = db.session.query(Ticket.id, Ticket.category_id).filter(
+                Ticket.assigned_to.is_(None),
+                Ticket.status == TicketStatus.OPEN
+            ).order_by(Ticket.created_at).limit(batch_size).all()
+            if not rows:
+                break
+
+            updates = []
+            for ticket_id, category_id in rows:
+                agent_id = self.reserve(category_id)
+                if agent_id is None:
+                    return {'assigned': assigned, 'moved': moved}
+                updates.append({'ticket_id': ticket_id, 'agent_id': agent_id, 'old_agent': None, 'category_id': category_id})
+
+            assigned += len(self._apply_batch(updates))
+
+        if include_overloaded:
+            moved = self._spread_overloaded(batch_size)
+
+        return {'assigned': assigned, 'moved': moved}
+
+    def _spread_overloaded(self, batch_size):
+        """Move not-yet-started tickets from agents above the average load"""
+        loads = self.loads()
+        if not loads:
+            return 0
+        target = -(-sum(loads.values()) // len(loads))  # ceil of the average
+
+        moved = 0
+        for agent_id, load in sorted(loads.items(), key=lambda item: -item[1]):
+            excess = load - target
+            if excess <= 0:
+                break
+            rows = db.session.query(Ticket.id, Ticket.category_id).filter(
+                Ticket.assigned_to == agent_id,
+                Ticket.status == TicketStatus.OPEN
+            ).order_by(Ticket.created_at.desc()).limit(min(excess, batch_size)).all()
+
+            updates = []
+            for ticket_id, category_id in rows:
+                new_agent = self.reserve(category_id, exclude=agent_id)
+                if new_agent is None:
+                    break
+                updates.append({'ticket_id': ticket_id, 'agent_id': new_agent, 'old_agent': agent_id, 'category_id': category_id})
+
+            applied = self._apply_batch(updates)
+            for _ in applied:
+                self.ticket_changed(agent_id, True, None, False)
+            moved += len(applied)
+        return moved
+
+    def _apply_batch(self, updates):
+        """Write reserved assignments and their events; returns the ids of the tickets that moved
+
+        A ticket only moves if its assignee is still old_agent, so one changed by
+        someone else meanwhile is left alone: its reservation is released and no
+        event is written for it.
+        """
+        if not updates:
+            return set()
+        now = datetime.utcnow()
+        table = Ticket.__table__
+        statement = update(table).where(or_(*[
+            and_(table.c.id == row['ticket_id'], table.c.assigned_to.is_not_distinct_from(row['old_agent']))
+            for row in updates
+        ])).values(
+            assigned_to=case({row['ticket_id']: row['agent_id'] for row in updates}, value=table.c.id),
+            updated_at=now
+        ).returning(table.c.id)
+        try:
+            applied = set(db.session.scalars(statement))
+            events = [
+                {
+                    'ticket_id': row['ticket_id'],
+                    'event_type': TicketEventType.ASSIGNED,
+                    'old_value': None if row['old_agent'] is None else str(row['old_agent']),
+                    'new_value': str(row['agent_id']),
+                    'created_at': now,
+                    'actor_id': None,
+                }
+                for row in updates if row['ticket_id'] in applied
+            ]
+            if events:
+                db.session.execute(insert(TicketEvent.__table__), events)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for row in updates:
+                self.release(row['agent_id'], row['category_id'])
+            self.invalidate()
+            raise
+
+        for row in updates:
+            if row['ticket_id'] not in applied:
+                self.release(row['agent_id'], row['category_id'])
+        return applied
+
+
+assignment_engine = PerTenant(AssignmentEngine)
@@ -0,0 +1,49 @@
+from src.models.user import db
+from datetime import datetime
+from enum import Enum
+
+class AttachmentStatus(Enum):
+    PENDING = "pending"
+    CLEAN = "clean"
+    REJECTED = "rejected"
+
+class Attachment(db.Model):
+    """An uploaded file, held in quarantine until src/attachments.py has checked it"""
+    __tablename__ = 'attachments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    original_name = db.Column(db.String(255), nullable=False)
+    staged_name = db.Column(db.String(300), nullable=False)  # File name in the quarantine directory
+    path = db.Column(db.String(500), nullable=True)  # Public path under static/, set once clean
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)  # Sniffed from the content
+    status = db.Column(db.Enum(AttachmentStatus), nullable=False, default=AttachmentStatus.PENDING)
+    reason = db.Column(db.String(255), nullable=True)  # Why it was rejected
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # Scan lease, see AttachmentScanner.claim
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    scanned_at = db.Column(db.DateTime, nullable=True)
+    
+    # No foreign key on ticket_id: attachments outlive the move to the archive tables
+    ticket_id = db.Column(db.Integer, nullable=True, index=True)
+    
+    # Workers look for pending files oldest first
+    __table_args__ = (db.Index('ix_attachments_status', 'status', 'id'),)
+    
+    def to_dict(self):
+        """Convert attachment to dictionary"""
+        return {
+            'id': self.id,
+            'original_name': self.original_name,
+            'path': self.path,
+            'size': self.size,
+            'content_type': self.content_type,
+            'status': self.status,
+            'reason': self.reason,
+            'created_at': self.created_at,
+            'scanned_at': self.scanned_at,
+            'ticket_id': self.ticket_id
+        }
+    
+    def __repr__(self):
+        return f'<Attachment {self.id}: {self.original_name} ({self.status.value})>'
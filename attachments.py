@@ -0,0 +1,333 @@
+"""Quarantine-then-promote pipeline for ticket attachments.
+
+Uploads are written to a private quarantine directory and recorded as pending;
+the request returns straight away. Scan workers (an in-process thread pool, and
+`flask scan-attachments` for files nobody picked up) check each file's magic
+bytes against its extension, look for decompression bombs and run the optional
+virus scanner. Only clean files are moved under static/uploads, where they
+become servable; rejected files are deleted.
+
+Each scan claims the attachment with a compare-and-set on its lease, so any
+number of workers in any number of processes can share the queue.
+"""
+from flask import current_app
+from werkzeug.utils import secure_filename, import_string
+from src.models.user import db
+from src.models.ticket import Ticket
+from src.models.archived_ticket import ArchivedTicket
+from src.models.attachment import Attachment, AttachmentStatus
+from src.tenancy import current_tenant_id, tenant_context
+from sqlalchemy import update, or_
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from datetime import datetime, timedelta
+import os
+import shlex
+import shutil
+import struct
+import subprocess
+import threading
+import uuid
+import zipfile
+
+# Extensions accepted for upload and the content type their bytes must match
+EXTENSION_TYPES = {
+    'txt': 'text/plain',
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+ALLOWED_EXTENSIONS = set(EXTENSION_TYPES)
+
+# (magic prefix, content type); docx is a zip archive, refined by _check_docx
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    (b'PK\x03\x04', EXTENSION_TYPES['docx']),
+)
+
+DEFAULT_CONFIG = {
+    'ATTACHMENT_QUARANTINE_DIR': os.path.join(os.path.dirname(__file__), 'database', 'quarantine'),
+    # Scan new uploads on a thread pool in the web process; turn off to leave them to scan-attachments
+    'ATTACHMENT_SCAN_IN_PROCESS': True,
+    'ATTACHMENT_SCAN_WORKERS': 4,
+    # A worker that dies mid-scan loses its claim after this long
+    'ATTACHMENT_SCAN_LEASE_SECONDS': 300,
+    'ATTACHMENT_SCAN_MAX_ATTEMPTS': 3,
+    # Virus scanner: 'module:callable' taking a path and returning a rejection reason or None
+    'ATTACHMENT_SCANNER': None,
+    # Or a command run with the path appended, exiting 1 when infected (e.g. clamdscan --no-summary)
+    'ATTACHMENT_SCAN_COMMAND': None,
+    'ATTACHMENT_SCAN_TIMEOUT': 60,
+    'ATTACHMENT_MAX_PIXELS': 50_000_000,
+    'ATTACHMENT_MAX_UNPACKED_BYTES': 100 * 1024 * 1024,
+    'ATTACHMENT_MAX_ARCHIVE_ENTRIES': 5000,
+}
+
+
+class AttachmentRejected(Exception):
+    """The file failed a check and must not be served"""
+
+
+def sniff_type(head):
+    for magic, content_type in SIGNATURES:
+        if head.startswith(magic):
+            return content_type
+    # Plain text has no signature; binary content almost always contains NUL bytes
+    if b'\x00' not in head:
+        return 'text/plain'
+    return None
+
+
+def image_size(head, content_type):
+    """Declared (width, height) from an image header, or None if it can't be read"""
+    if content_type == 'image/png' and len(head) >= 24 and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if content_type == 'image/gif' and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if content_type == 'image/jpeg':
+        offset = 2
+        while offset + 9 <= len(head):
+            if head[offset] != 0xFF:
+                return None
+            marker = head[offset + 1]
+            if marker == 0xFF:
+                offset += 1
+                continue
+            length = struct.unpack('>H', head[offset + 2:offset + 4])[0]
+            # Start-of-frame markers carry the dimensions (C4, C8 and CC are other tables)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', head[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def _check_docx(path, config):
+    """Reject archives that expand past the configured limits or aren't Word documents"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            entries = archive.infolist()
+            if len(entries) > config['ATTACHMENT_MAX_ARCHIVE_ENTRIES']:
+                raise AttachmentRejected('Too many entries in archive')
+            names = {entry.filename for entry in entries}
+            if '[Content_Types].xml' not in names or 'word/document.xml' not in names:
+                raise AttachmentRejected('Not a Word document')
+            # Count what actually decompresses; the sizes in the directory can lie
+            remaining = config['ATTACHMENT_MAX_UNPACKED_BYTES']
+            for entry in entries:
+                with archive.open(entry) as member:
+                    while True:
+                        chunk = member.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+                        if remaining < 0:
+                            raise AttachmentRejected('Archive expands beyond the allowed size')
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError, NotImplementedError) as e:
+        raise AttachmentRejected(f'Corrupt archive: {e}')
+
+
+def command_scanner(path):
+    """Run ATTACHMENT_SCAN_COMMAND on a file; exit status 1 means infected"""
+    command = shlex.split(current_app.config['ATTACHMENT_SCAN_COMMAND']) + [path]
+    result = subprocess.run(command, capture_output=True, text=True,
+                            timeout=current_app.config['ATTACHMENT_SCAN_TIMEOUT'])
+    if result.returncode == 0:
+        return None
+    if result.returncode == 1:
+        return f"Malware detected: {result.stdout.strip().splitlines()[-1] if result.stdout.strip() else 'unknown'}"
+    # Anything else is a scanner failure, retried on a later attempt
+    raise RuntimeError(f'Scanner exited with {result.returncode}: {result.stderr.strip()}')
+
+
+def get_scanner(config):
+    if config['ATTACHMENT_SCANNER']:
+        return import_string(config['ATTACHMENT_SCANNER'].replace(':', '.'))
+    if config['ATTACHMENT_SCAN_COMMAND']:
+        return command_scanner
+    return None
+
+
+def inspect_file(path, extension, config):
+    """Run every check on a quarantined file; returns its content type or raises AttachmentRejected"""
+    size = os.path.getsize(path)
+    if size == 0:
+        raise AttachmentRejected('Empty file')
+
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+
+    content_type = sniff_type(head)
+    expected = EXTENSION_TYPES.get(extension)
+    if content_type is None or content_type != expected:
+        raise AttachmentRejected(f'Content does not match the .{extension} extension')
+
+    if content_type.startswith('image/'):
+        dimensions = image_size(head, content_type)
+        if dimensions is None:
+            raise AttachmentRejected('Unreadable image header')
+        if dimensions[0] * dimensions[1] > config['ATTACHMENT_MAX_PIXELS']:
+            raise AttachmentRejected('Image dimensions too large')
+    elif extension == 'docx':
+        _check_docx(path, config)
+
+    scanner = get_scanner(config)
+    if scanner is not None:
+        reason = scanner(path)
+        if reason:
+            raise AttachmentRejected(reason)
+    return content_type
+
+
+class AttachmentScanner:
+    """Stages uploads in quarantine and scans them off the request path"""
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+        os.makedirs(app.config['ATTACHMENT_QUARANTINE_DIR'], exist_ok=True)
+        self._app = app
+
+    def quarantine_path(self, attachment):
+        return os.path.join(current_app.config['ATTACHMENT_QUARANTINE_DIR'], attachment.staged_name)
+
+    def stage(self, file):
+        """Save an upload to quarantine; returns an unsaved pending Attachment"""
+        original_name = secure_filename(file.filename) or 'attachment'
+        # UUID prefix prevents filename conflicts
+        attachment = Attachment(original_name=original_name, staged_name=f'{uuid.uuid4()}_{original_name}')
+        path = self.quarantine_path(attachment)
+        file.save(path)
+        attachment.size = os.path.getsize(path)
+        attachment.status = AttachmentStatus.PENDING
+        return attachment
+
+    def discard(self, attachment):
+        """Remove a staged file whose ticket was never created"""
+        try:
+            os.remove(self.quarantine_path(attachment))
+        except FileNotFoundError:
+            pass
+
+    def submit(self, attachment_ids):
+        """Queue attachments for scanning on this process's worker pool (after commit)"""
+        if not current_app.config['ATTACHMENT_SCAN_IN_PROCESS']:
+            return
+        with self._lock:
+            if self._executor is None:
+                # Created on first use so preforked workers each get their own threads
+                self._executor = ThreadPoolExecutor(
+                    max_workers=current_app.config['ATTACHMENT_SCAN_WORKERS'],
+                    thread_name_prefix='attachment-scan'
+                )
+        # Scan as the uploading tenant, whose database holds the attachment row
+        tenant_id = current_tenant_id()
+        for attachment_id in attachment_ids:
+            self._executor.submit(self._run, attachment_id, tenant_id)
+
+    def _run(self, attachment_id, tenant_id=None):
+        with self._app.app_context(), tenant_context(tenant_id):
+            try:
+                return self.scan(attachment_id)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('Scanning attachment %s failed', attachment_id)
+                return None
+            finally:
+                db.session.remove()
+
+    def claim(self, attachment_id, now):
+        """Take the scan lease on a pending attachment; False if another worker holds it"""
+        lease = timedelta(seconds=current_app.config['ATTACHMENT_SCAN_LEASE_SECONDS'])
+        claimed = db.session.execute(
+            update(Attachment).where(
+                Attachment.id == attachment_id,
+                Attachment.status == AttachmentStatus.PENDING,
+                or_(Attachment.claimed_at.is_(None), Attachment.claimed_at < now - lease)
+            ).values(claimed_at=now, attempts=Attachment.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return bool(claimed)
+
+    def scan(self, attachment_id):
+        """Check one attachment and promote or reject it; returns its new status, None if not claimed"""
+        config = current_app.config
+        if not self.claim(attachment_id, datetime.utcnow()):
+            return None
+
+        attachment = db.session.get(Attachment, attachment_id)
+        source = self.quarantine_path(attachment)
+        extension = attachment.original_name.rsplit('.', 1)[-1].lower()
+        try:
+            if not os.path.exists(source):
+                raise AttachmentRejected('File missing from quarantine')
+            attachment.content_type = inspect_file(source, extension, config)
+        except AttachmentRejected as e:
+            attachment.status = AttachmentStatus.REJECTED
+            attachment.reason = str(e)[:255]
+        except Exception:
+            if attachment.attempts < config['ATTACHMENT_SCAN_MAX_ATTEMPTS']:
+                # Leave it claimed; it is retried once the lease runs out
+                db.session.rollback()
+                raise
+            attachment.status = AttachmentStatus.REJECTED
+            attachment.reason = 'Scan failed'
+        else:
+            attachment.status = AttachmentStatus.CLEAN
+            attachment.path = f'uploads/{attachment.staged_name}'
+            shutil.move(source, os.path.join(current_app.static_folder, attachment.path))
+
+        attachment.scanned_at = datetime.utcnow()
+        attachment.claimed_at = None
+        if attachment.status == AttachmentStatus.REJECTED and os.path.exists(source):
+            os.remove(source)
+
+        if attachment.ticket_id is not None:
+            for model in (Ticket, ArchivedTicket):
+                # Keep updated_at: the ticket itself didn't change
+                db.session.execute(
+                    update(model).where(model.id == attachment.ticket_id).values(
+                        attachment_path=attachment.path,
+                        attachment_status=attachment.status,
+                        updated_at=model.updated_at
+                    ).execution_options(synchronize_session=False)
+                )
+        db.session.commit()
+        return attachment.status
+
+    def scan_pending(self, workers=None, limit=1000):
+        """Scan pending attachments whose lease is free on a thread pool; returns a Counter of outcomes"""
+        lease = timedelta(seconds=current_app.config['ATTACHMENT_SCAN_LEASE_SECONDS'])
+        attachment_ids = [
+            row.id for row in db.session.query(Attachment.id).filter(
+                Attachment.status == AttachmentStatus.PENDING,
+                or_(Attachment.claimed_at.is_(None), Attachment.claimed_at < datetime.utcnow() - lease)
+            ).order_by(Attachment.id).limit(limit)
+        ]
+        db.session.commit()
+
+        workers = workers or current_app.config['ATTACHMENT_SCAN_WORKERS']
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='attachment-scan') as executor:
+            outcomes = Counter(
+                status.value if status else 'skipped'
+                for status in executor.map(self._run, attachment_ids, [current_tenant_id()] * len(attachment_ids))
+            )
+        return outcomes
+
+
+attachment_scanner = AttachmentScanner()
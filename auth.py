@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from src.models.user import db, User, UserRole
+from src.assignment import assignment_engine
+from src.workload import agent_workload
 from functools import wraps
 import re
 
@@ -93,9 +95,14 @@ def register():
         db.session.add(user)
         db.session.commit()
         
+        if user.role == UserRole.SUPPORT_AGENT:
+            assignment_engine.invalidate()
+            agent_workload.invalidate()
+        
         # Log in the user
         session['user_id'] = user.id
         session['user_role'] = user.role.value
+        session['tenant_id'] = user.tenant_id
         
         return jsonify({
             'message': 'User registered successfully',
@@ -103,6 +110,7 @@ def register():
         }), 201
         
     except Exception as e:
+        current_app.logger.exception('Registration failed')
         db.session.rollback()
         return jsonify({'error': 'Registration failed'}), 500
 
@@ -133,6 +141,7 @@ def login():
         # Log in the user
         session['user_id'] = user.id
         session['user_role'] = user.role.value
+        session['tenant_id'] = user.tenant_id
         
         return jsonify({
             'message': 'Login successful',
@@ -140,6 +149,7 @@ def login():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Login failed')
         return jsonify({'error': 'Login failed'}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -161,6 +171,7 @@ def get_current_user():
         return jsonify({'user': user.to_dict()}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to get user information')
         return jsonify({'error': 'Failed to get user information'}), 500
 
 @auth_bp.route('/change-password', methods=['POST'])
@@ -190,6 +201,7 @@ def change_password():
         return jsonify({'message': 'Password changed successfully'}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to change password')
         db.session.rollback()
         return jsonify({'error': 'Failed to change password'}), 500
 
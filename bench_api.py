@@ -0,0 +1,183 @@
+"""API benchmark harness: p50/p99 latency and queries per request.
+
+Runs against the database in DATABASE_URL (load one with `flask seed-synthetic`)
+through the Flask test client, logged in as the synthetic bench users.
+
+Usage:
+    python -m src.bench_api [--iterations 5] [--max-combinations 100]
+                            [--baseline FILE] [--save-baseline FILE]
+
+With --baseline, each scenario is compared against the stored numbers and the
+run exits non-zero when p50 latency or query count regresses beyond --tolerance.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db, User
+from src.models.ticket import Ticket, TicketStatus, TicketPriority
+from src.models.category import Category
+from src.synthetic_data import BENCH_ADMIN, BENCH_AGENT, BENCH_END_USER, BENCH_PASSWORD
+
+SORTS = [(sort_by, order) for sort_by in ('created_at', 'updated_at', 'most_replied') for order in ('desc', 'asc')]
+
+
+class QueryCounter:
+    """Counts statements executed on the engine while active"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def measure(client, counter, method, url, iterations, **kwargs):
+    """Issue the same request repeatedly and summarize latency and query counts"""
+    timings, queries = [], []
+    for _ in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'queries': max(queries),
+    }
+
+
+def ticket_list_urls(category_id, max_combinations, rng):
+    """Every filter and sort combination for get_tickets, optionally sampled"""
+    statuses = [None] + [status.value for status in TicketStatus]
+    priorities = [None] + [priority.value for priority in TicketPriority]
+    combos = list(itertools.product(
+        ('all', 'my_tickets', 'unassigned'), statuses, (None, category_id), priorities, (None, 'error'), SORTS
+    ))
+    if max_combinations and len(combos) > max_combinations:
+        combos = rng.sample(combos, max_combinations)
+
+    for queue, status, category, priority, search, (sort_by, order) in combos:
+        params = {'queue': queue, 'status': status, 'category_id': category, 'priority': priority,
+                  'search': search, 'sort_by': sort_by, 'sort_order': order}
+        query = '&'.join(f'{key}={value}' for key, value in params.items() if value is not None)
+        yield f'get_tickets?{query}', f'/api/tickets/?{query}'
+
+
+def end_user_list_urls():
+    """get_tickets as an end user: own tickets or everything visible, in each sort"""
+    for my_tickets, (sort_by, order) in itertools.product(('true', 'false'), SORTS):
+        query = f'my_tickets={my_tickets}&sort_by={sort_by}&sort_order={order}'
+        yield f'get_tickets[end_user]?{query}', f'/api/tickets/?{query}'
+
+
+def login(client, username):
+    response = client.post('/api/auth/login', json={'username': username, 'password': BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f'could not log in as {username}; load data with `flask seed-synthetic` first')
+
+
+def run(iterations, max_combinations, seed):
+    rng = random.Random(seed)
+    results = {}
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        category_id = Category.query.order_by(Category.id).first().id
+        ticket_ids = [row.id for row in Ticket.query.with_entities(Ticket.id).order_by(Ticket.id.desc()).limit(50)]
+        own_ticket_id = db.session.scalar(
+            db.select(Ticket.id).join(User, Ticket.user_id == User.id)
+            .where(User.username == BENCH_END_USER).order_by(Ticket.id.desc()).limit(1)
+        )
+    if own_ticket_id is None:
+        raise RuntimeError(f'{BENCH_END_USER} owns no tickets; seed more tickets with `flask seed-synthetic`')
+
+    agent = app.test_client()
+    login(agent, BENCH_AGENT)
+    admin = app.test_client()
+    login(admin, BENCH_ADMIN)
+    end_user = app.test_client()
+    login(end_user, BENCH_END_USER)
+
+    for name, url in ticket_list_urls(category_id, max_combinations, rng):
+        results[name] = measure(agent, counter, 'GET', url, iterations)
+    for name, url in end_user_list_urls():
+        results[name] = measure(end_user, counter, 'GET', url, iterations)
+
+    ticket_id = ticket_ids[0]
+    results['get_ticket'] = measure(agent, counter, 'GET', f'/api/tickets/{ticket_id}', iterations)
+    results['vote_ticket'] = measure(agent, counter, 'POST', f'/api/tickets/{ticket_id}/vote', iterations,
+                                     json={'is_upvote': True})
+    results['add_comment'] = measure(agent, counter, 'POST', f'/api/tickets/{ticket_id}/comments', iterations,
+                                     json={'content': 'Benchmark comment'})
+    # The end-user path is filtered by ownership, so it is measured on a ticket they own
+    results['get_ticket[end_user]'] = measure(end_user, counter, 'GET', f'/api/tickets/{own_ticket_id}', iterations)
+    results['vote_ticket[end_user]'] = measure(end_user, counter, 'POST', f'/api/tickets/{own_ticket_id}/vote',
+                                               iterations, json={'is_upvote': True})
+    results['get_user_stats'] = measure(admin, counter, 'GET', '/api/users/stats', iterations)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print scenarios that regressed against the baseline; return True if any did"""
+    regressed = False
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        slower = current['p50_ms'] > previous['p50_ms'] * (1 + tolerance)
+        more_queries = current['queries'] > previous['queries']
+        if slower or more_queries:
+            regressed = True
+            print(f'REGRESSION {name}: p50 {previous["p50_ms"]} -> {current["p50_ms"]} ms, '
+                  f'queries {previous["queries"]} -> {current["queries"]}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--max-combinations', type=int, default=0,
+                        help='Sample this many get_tickets combinations (0 runs all).')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help='JSON file with previous results to compare against.')
+    parser.add_argument('--save-baseline', help='Write results to this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown fraction.')
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.max_combinations, args.seed)
+
+    print(f'{"scenario":<100} {"p50 ms":>9} {"p99 ms":>9} {"queries":>8}')
+    for name, result in sorted(results.items()):
+        print(f'{name:<100} {result["p50_ms"]:>9} {result["p99_ms"]:>9} {result["queries"]:>8}')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
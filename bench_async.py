@@ -0,0 +1,153 @@
+"""Benchmark open notification streams against ordinary request latency.
+
+Opens --streams concurrent /api/notifications/stream connections against the
+threaded WSGI server and the ASGI server in turn, then times /healthz while
+they stay open.
+
+Usage: python -m src.bench_async [--streams 200] [--threads 8] [--requests 50] [--port 5056]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': lambda port, threads: [sys.executable, '-m', 'src.wsgi', '--bind', f'127.0.0.1:{port}',
+                                   '--workers', '1', '--threads', str(threads), '--drain-delay', '0'],
+    'asgi': lambda port, threads: [sys.executable, '-m', 'src.asgi', '--bind', f'127.0.0.1:{port}',
+                                   '--workers', '1', '--threads', str(threads), '--drain-delay', '0'],
+}
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz', timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError('Server did not start')
+
+
+def post_json(port, path, payload):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}', data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.headers.get('Set-Cookie', '').split(';', 1)[0]
+
+
+def session_cookie(port):
+    """Register a throwaway user and return its session cookie"""
+    user = f'bench{os.getpid()}{time.monotonic_ns()}'
+    credentials = {'username': user, 'email': f'{user}@example.com', 'password': 'Bench-password-1'}
+    try:
+        post_json(port, '/api/auth/register', credentials)
+    except urllib.error.HTTPError:
+        pass  # Registration may log in or reject; log in explicitly below
+    return post_json(port, '/api/auth/login', {'username': user, 'password': credentials['password']})
+
+
+async def open_stream(port, cookie, timeout):
+    """Open a stream; returns the connection once the preamble arrives, or None"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(
+            f'GET /api/notifications/stream HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n'
+            f'Accept: text/event-stream\r\n\r\n'.encode('latin-1')
+        )
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        if b' 200 ' not in head.split(b'\r\n', 1)[0]:
+            writer.close()
+            return None
+        await asyncio.wait_for(reader.readuntil(b'\n\n'), timeout)
+        return writer
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+
+
+def time_health(port, count, timeout):
+    """Sequential /healthz timings in ms; failures count as the timeout"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz', timeout=timeout) as response:
+                response.read()
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def measure(port, args):
+    cookie = await asyncio.to_thread(session_cookie, port)
+    start = time.perf_counter()
+    writers = await asyncio.gather(*[open_stream(port, cookie, args.timeout) for _ in range(args.streams)])
+    opened = [writer for writer in writers if writer is not None]
+    open_seconds = time.perf_counter() - start
+    timings = await asyncio.to_thread(time_health, port, args.requests, args.timeout)
+    for writer in opened:
+        writer.close()
+    return {
+        'streams_open': len(opened),
+        'open_seconds': open_seconds,
+        'health_p50_ms': statistics.median(timings),
+        'health_max_ms': max(timings),
+    }
+
+
+def run_server(mode, args, database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', NOTIFY_STREAM_SECONDS='3600')
+    process = subprocess.Popen(SERVERS[mode](args.port, args.threads), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(args.port)
+        return asyncio.run(measure(args.port, args))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.db')
+        subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'src.main', 'init-db'], cwd=ROOT, check=True,
+            env=dict(os.environ, DATABASE_URL=f'sqlite:///{database}'), stdout=subprocess.DEVNULL
+        )
+        print(f'{args.streams} streams, {args.threads} threads')
+        for mode in args.modes.split(','):
+            result = run_server(mode, args, database)
+            print(
+                f"{mode}: {result['streams_open']}/{args.streams} streams open in {result['open_seconds']:.2f}s, "
+                f"/healthz p50 {result['health_p50_ms']:.1f} ms max {result['health_max_ms']:.1f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark compression ratio against CPU cost for a ticket list response.
+
+Usage: python -m src.bench_compression [--items 100] [--rounds 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from src.json_provider import QuickDeskJSONProvider
+from src.compression import DEFAULT_CONFIG, brotli, compress_body
+from src.bench_json import build_payload
+
+
+def run(label, data, encoding, config, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = compress_body(data, encoding, config)
+    elapsed = time.perf_counter() - start
+    ratio = len(data) / len(body)
+    print(f'{label:<12} {elapsed / rounds * 1000:8.3f} ms  {len(body):8d} bytes  {ratio:6.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    provider = QuickDeskJSONProvider(app)
+    with app.app_context():
+        data = provider.response(build_payload(args.items, native=True)).get_data()
+    print(f'{args.items} tickets, {len(data)} bytes uncompressed, {args.rounds} rounds')
+
+    for level in (1, 3, 6, 9):
+        config = dict(DEFAULT_CONFIG, COMPRESS_LEVEL=level)
+        run(f'gzip -{level}', data, 'gzip', config, args.rounds)
+
+    if brotli is not None:
+        for level in (0, 2, 4, 6, 11):
+            config = dict(DEFAULT_CONFIG, COMPRESS_BR_LEVEL=level)
+            run(f'br -{level}', data, 'br', config, args.rounds)
+    else:
+        print('brotli not installed, skipping br levels')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark Flask's default JSON provider against QuickDeskJSONProvider.
+
+Usage: python -m src.bench_json [--items 100] [--rounds 200]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.json_provider import QuickDeskJSONProvider, orjson
+
+
+class _Status(Enum):
+    OPEN = "open"
+
+
+def _user(i, now):
+    return {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com',
+            'role': 'end_user', 'created_at': now, 'is_active': True}
+
+
+def build_payload(items, native):
+    """Build a ticket list payload shaped like get_tickets' response"""
+    now = datetime.utcnow()
+    tickets = []
+    for i in range(items):
+        created = now - timedelta(minutes=i)
+        ticket = {
+            'id': i,
+            'subject': f'Ticket {i}',
+            'description': 'Something is broken. ' * 20,
+            'status': _Status.OPEN,
+            'priority': _Status.OPEN,
+            'created_at': created,
+            'updated_at': created,
+            'resolved_at': None,
+            'attachment_path': None,
+            'user_id': i,
+            'assigned_to': None,
+            'category_id': 1,
+            'upvotes': 3,
+            'downvotes': 1,
+            'comment_count': 5,
+            'creator': _user(i, created),
+            'assignee': None,
+            'category': {'id': 1, 'name': 'Technical Support', 'description': 'Technical issues',
+                         'color': '#3B82F6', 'is_active': True, 'created_at': now, 'ticket_count': 10},
+        }
+        tickets.append(ticket)
+
+    if not native:
+        # What the models produced before: preformatted strings
+        for ticket in tickets:
+            for key in ('created_at', 'updated_at'):
+                ticket[key] = ticket[key].isoformat()
+            ticket['status'] = ticket['status'].value
+            ticket['priority'] = ticket['priority'].value
+            ticket['creator']['created_at'] = ticket['creator']['created_at'].isoformat()
+            ticket['category']['created_at'] = ticket['category']['created_at'].isoformat()
+    return {'tickets': tickets}
+
+
+def run(label, app, provider, payload, rounds):
+    app.json = provider
+    with app.app_context():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            body = provider.response(payload).get_data()
+        elapsed = time.perf_counter() - start
+    print(f'{label:<32} {elapsed / rounds * 1000:8.3f} ms/response  {len(body):8d} bytes')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f'{args.items} tickets per response, {args.rounds} rounds, orjson={"yes" if orjson else "no"}')
+
+    run('flask default (preformatted)', app, DefaultJSONProvider(app),
+        build_payload(args.items, native=False), args.rounds)
+
+    stdlib = QuickDeskJSONProvider(app, use_orjson=False)
+    run('quickdesk stdlib (native types)', app, stdlib,
+        build_payload(args.items, native=True), args.rounds)
+
+    if orjson is not None:
+        run('quickdesk orjson (native types)', app, QuickDeskJSONProvider(app),
+            build_payload(args.items, native=True), args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Ticket and user list serialization: ORM to_dict versus the column read models.
+
+Runs against the database in DATABASE_URL (load one with `flask seed-synthetic`)
+inside an app context, so no HTTP or JSON encoding is included. For 100-row
+pages and for a full export of every ticket it reports rows per second and the
+peak Python memory allocated while building the payload, and checks that both
+paths produce identical output.
+
+Usage:
+    python -m src.bench_read_models [--pages 20] [--export-limit 0]
+                                    [--fields id,subject,status] [--expand creator]
+                                    [--description-length 200]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.models.user import db, User
+from src.models.ticket import Ticket
+from src.read_models import ticket_columns, ticket_dicts, user_columns, user_dict
+
+PAGE_SIZE = 100
+
+
+def orm_tickets(query, fields, expand, description_length):
+    query = query.options(*Ticket.load_options(fields, expand, description_length))
+    return [
+        ticket.to_dict(fields=fields, expand=expand, description_length=description_length)
+        for ticket in query
+    ]
+
+
+def row_tickets(query, fields, expand, description_length):
+    rows = query.with_entities(*ticket_columns(Ticket, fields, expand, description_length)).all()
+    return ticket_dicts(Ticket, rows, fields, expand, description_length)
+
+
+def orm_users(query):
+    return [user.to_dict() for user in query]
+
+
+def row_users(query):
+    return [user_dict(row) for row in query.with_entities(*user_columns())]
+
+
+def run(build, queries):
+    """Build every payload once; returns (payloads, rows, seconds, peak bytes)"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    payloads = [build(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return payloads, sum(len(payload) for payload in payloads), elapsed, peak
+
+
+def compare(name, queries, orm_build, row_build):
+    orm_payloads, rows, orm_seconds, orm_peak = run(orm_build, queries)
+    row_payloads, _, row_seconds, row_peak = run(row_build, queries)
+    identical = orm_payloads == row_payloads
+    print(f'{name:<24} {rows:>8} rows')
+    for label, seconds, peak in (('orm to_dict', orm_seconds, orm_peak), ('read model', row_seconds, row_peak)):
+        rate = rows / seconds if seconds else float('inf')
+        print(f'  {label:<12} {rate:>12,.0f} rows/s  {seconds * 1000:>10.1f} ms  peak {peak / 1024 / 1024:>8.1f} MiB')
+    print(f'  speedup {orm_seconds / row_seconds if row_seconds else 0:.1f}x, '
+          f'memory {orm_peak / row_peak if row_peak else 0:.1f}x less, identical output: {identical}')
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help='Number of 100-row pages to serialize.')
+    parser.add_argument('--export-limit', type=int, default=0, help='Cap the full export at N tickets (0: all).')
+    parser.add_argument('--fields', default=None, help='Sparse fieldset, as in ?fields=.')
+    parser.add_argument('--expand', default=None, help='Embedded relationships, as in ?expand=.')
+    parser.add_argument('--description-length', type=int, default=None)
+    args = parser.parse_args()
+
+    fields = tuple(args.fields.split(',')) if args.fields is not None else None
+    expand = tuple(name for name in args.expand.split(',') if name) if args.expand is not None else None
+    options = (fields, expand, args.description_length)
+
+    identical = True
+    with app.app_context():
+        tickets = Ticket.query.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+        pages = [tickets.limit(PAGE_SIZE).offset(page * PAGE_SIZE) for page in range(args.pages)]
+        export = tickets.limit(args.export_limit) if args.export_limit else tickets
+        users = User.query.order_by(User.created_at.desc(), User.id.desc())
+        user_pages = [users.limit(PAGE_SIZE).offset(page * PAGE_SIZE) for page in range(args.pages)]
+
+        identical &= compare('ticket pages', pages,
+                             lambda query: orm_tickets(query, *options),
+                             lambda query: row_tickets(query, *options))
+        identical &= compare('ticket export', [export],
+                             lambda query: orm_tickets(query, *options),
+                             lambda query: row_tickets(query, *options))
+        identical &= compare('user pages', user_pages, orm_users, row_users)
+        identical &= compare('user export', [users], orm_users, row_users)
+
+    if not identical:
+        sys.exit('Read model output differs from to_dict')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark time from process start until the first request is served.
+
+Usage: python -m src.bench_startup [--runs 5] [--port 5055]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_to_first_request(port, timeout):
+    """Start the production entry point and poll /healthz until it answers"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.wsgi', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+         '--drain-delay', '0'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError('server did not become healthy in time')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    timings = sorted(time_to_first_request(args.port, args.timeout) for _ in range(args.runs))
+    print(f'runs={args.runs} min={timings[0] * 1000:.0f}ms '
+          f'median={timings[len(timings) // 2] * 1000:.0f}ms max={timings[-1] * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
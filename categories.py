@@ -1,10 +1,20 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from src.models.user import db, User, UserRole
 from src.models.category import Category
 from src.routes.auth import login_required, role_required
+from src.urgency import mark_for_recompute
+from src.models.ticket import Ticket
+from src.models.archived_ticket import ArchivedTicket
+from src.delta_sync import record_deletion
 
 categories_bp = Blueprint('categories', __name__)
 
+def validate_sla_hours(value):
+    """Validate an SLA target in hours (None clears it)"""
+    if value is None:
+        return True
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
 @categories_bp.route('/', methods=['GET'])
 @login_required
 def get_categories():
@@ -16,6 +26,7 @@ def get_categories():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch categories')
         return jsonify({'error': 'Failed to fetch categories'}), 500
 
 @categories_bp.route('/', methods=['POST'])
@@ -41,10 +52,15 @@ def create_category():
         if not color.startswith('#') or len(color) != 7:
             return jsonify({'error': 'Invalid color format. Use hex format like #FF0000'}), 400
         
+        sla_hours = data.get('sla_hours')
+        if not validate_sla_hours(sla_hours):
+            return jsonify({'error': 'SLA hours must be a positive integer'}), 400
+        
         category = Category(
             name=name,
             description=description,
-            color=color
+            color=color,
+            sla_hours=sla_hours
         )
         
         db.session.add(category)
@@ -56,6 +72,7 @@ def create_category():
         }), 201
         
     except Exception as e:
+        current_app.logger.exception('Failed to create category')
         db.session.rollback()
         return jsonify({'error': 'Failed to create category'}), 500
 
@@ -72,6 +89,7 @@ def get_category(category_id):
         return jsonify({'category': category.to_dict()}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch category')
         return jsonify({'error': 'Failed to fetch category'}), 500
 
 @categories_bp.route('/<int:category_id>', methods=['PUT'])
@@ -114,6 +132,14 @@ def update_category(category_id):
                 return jsonify({'error': 'Invalid color format. Use hex format like #FF0000'}), 400
             category.color = color
         
+        # Update SLA target if provided; open tickets in the category need rescoring
+        if 'sla_hours' in data:
+            if not validate_sla_hours(data['sla_hours']):
+                return jsonify({'error': 'SLA hours must be a positive integer'}), 400
+            if data['sla_hours'] != category.sla_hours:
+                category.sla_hours = data['sla_hours']
+                mark_for_recompute(Ticket.category_id == category_id)
+        
         # Update active status if provided
         if 'is_active' in data:
             category.is_active = bool(data['is_active'])
@@ -126,6 +152,7 @@ def update_category(category_id):
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to update category')
         db.session.rollback()
         return jsonify({'error': 'Failed to update category'}), 500
 
@@ -139,19 +166,21 @@ def delete_category(category_id):
         if not category:
             return jsonify({'error': 'Category not found'}), 404
         
-        # Check if category has tickets
-        if category.tickets.count() > 0:
+        # Check if category has tickets, live or archived
+        if category.tickets.count() > 0 or ArchivedTicket.query.filter_by(category_id=category_id).first():
             # Soft delete - just deactivate
             category.is_active = False
             db.session.commit()
             return jsonify({'message': 'Category deactivated successfully'}), 200
         else:
-            # Hard delete if no tickets
+            # Hard delete if no tickets; sync clients learn of it from the tombstone
             db.session.delete(category)
+            record_deletion('categories', category_id)
             db.session.commit()
             return jsonify({'message': 'Category deleted successfully'}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to delete category')
         db.session.rollback()
         return jsonify({'error': 'Failed to delete category'}), 500
 
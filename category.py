@@ -1,30 +1,40 @@
 from src.models.user import db
+from src.tenancy import TenantScoped
 from datetime import datetime
 
-class Category(db.Model):
+class Category(TenantScoped, db.Model):
     __tablename__ = 'categories'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     color = db.Column(db.String(7), nullable=True)  # Hex color code
+    sla_hours = db.Column(db.Integer, nullable=True)  # Resolution target for medium priority tickets
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Sync watermark
     
     # Relationships
     tickets = db.relationship('Ticket', backref='category', lazy='dynamic')
     
-    def to_dict(self):
+    __table_args__ = (db.UniqueConstraint('tenant_id', 'name', name='uq_categories_tenant_name'),)
+    
+    def to_dict(self, include_ticket_count=True):
         """Convert category to dictionary"""
-        return {
+        result = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'color': self.color,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat(),
-            'ticket_count': self.tickets.count()
+            'sla_hours': self.sla_hours,
+            'created_at': self.created_at
         }
+        
+        if include_ticket_count:
+            result['ticket_count'] = self.tickets.count()
+        
+        return result
     
     def __repr__(self):
         return f'<Category {self.name}>'
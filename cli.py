@@ -0,0 +1,307 @@
+from src.models.user import db
+from src.models.category import Category
+from src.models.ticket import Ticket
+from src.models.ticket_metric import TicketMetric
+from src.models.tenant import Tenant
+from src.tenancy import DEFAULT_TENANT_ID, tenant_directory, tenant_context, current_tenant_id, all_tenants
+from src.urgency import backfill_unscored, recompute_due
+from src.comments import recount_comments
+from sqlalchemy import inspect, update
+import click
+import signal
+import threading
+import time
+
+DEFAULT_CATEGORIES = [
+    {'name': 'Technical Support', 'description': 'Technical issues and bugs', 'color': '#3B82F6'},
+    {'name': 'Account Issues', 'description': 'Account related problems', 'color': '#EF4444'},
+    {'name': 'Feature Request', 'description': 'New feature suggestions', 'color': '#10B981'},
+    {'name': 'General Inquiry', 'description': 'General questions and inquiries', 'color': '#8B5CF6'},
+    {'name': 'Billing', 'description': 'Billing and payment issues', 'color': '#F59E0B'}
+]
+
+def seed_default_categories():
+    """Create default categories if they don't exist"""
+    if Category.query.count() > 0:
+        return False
+    
+    for cat_data in DEFAULT_CATEGORIES:
+        db.session.add(Category(**cat_data))
+    
+    db.session.commit()
+    return True
+
+def upgrade_schema(engine=None):
+    """Add columns and indexes that models gained since the tables were created
+    
+    create_all only creates missing tables, so existing databases would otherwise
+    never see new nullable columns or new indexes. Returns the (table, column)
+    pairs that were added, so callers can backfill them.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    ddl += f' DEFAULT {column.server_default.arg}'
+                connection.execute(db.text(ddl))
+                added.add((table.name, column.name))
+                print(f'Added column {table.name}.{column.name}')
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return added
+
+def backfill_upgraded(added):
+    """Fill columns that upgrade_schema just added to existing tables"""
+    if ('tickets', 'comment_count') in added:
+        print(f'Counted comments on {recount_comments()} tickets')
+    if ('tickets', 'changed_at') in added:
+        # Sync reads tickets in changed_at order; until now updated_at was the change time
+        with all_tenants():
+            db.session.execute(update(Ticket).values(changed_at=Ticket.updated_at, updated_at=Ticket.updated_at))
+            db.session.commit()
+    if ('ticket_metrics', 'tenant_id') in added:
+        # tenant_id joined the primary key, which ALTER TABLE can't change; the totals
+        # are derived, so recreate the table and recount every tenant's
+        from src.history import rebuild_metrics
+        bind = db.session.get_bind(mapper=TicketMetric.__mapper__)
+        TicketMetric.__table__.drop(bind)
+        TicketMetric.__table__.create(bind)
+        with all_tenants():
+            print(f'Rebuilt {rebuild_metrics()} metric rows per tenant')
+    if ('categories', 'updated_at') in added:
+        # Sync reads categories in updated_at order, so existing ones need a change time
+        with all_tenants():
+            db.session.execute(update(Category).values(updated_at=Category.created_at))
+            db.session.commit()
+
+def ensure_default_tenant():
+    """Create the tenant that existing and unassigned data belongs to"""
+    if db.session.get(Tenant, DEFAULT_TENANT_ID) is None:
+        db.session.add(Tenant(id=DEFAULT_TENANT_ID, slug='default', name='Default'))
+        db.session.commit()
+        tenant_directory.invalidate()
+
+def create_tenant_schema(engine):
+    """Create or upgrade the tables in a tenant's dedicated database; returns the columns added"""
+    db.metadata.create_all(bind=engine)
+    return upgrade_schema(engine)
+
+def init_db(seed=True):
+    """Create all tables, upgrade existing ones and optionally seed default data"""
+    db.create_all()
+    added = upgrade_schema()
+    ensure_default_tenant()
+    for tenant, engine in tenant_directory.dedicated_engines():
+        tenant_added = create_tenant_schema(engine)
+        with tenant_context(tenant.id):
+            backfill_upgraded(tenant_added)
+            backfill_unscored()
+    backfill_upgraded(added)
+    backfill_unscored()
+    with tenant_context(DEFAULT_TENANT_ID):
+        if seed and seed_default_categories():
+            print("Default categories created")
+
+def register_commands(app):
+    """Register management commands on the Flask CLI"""
+    
+    @app.cli.command('init-db')
+    @click.option('--seed/--no-seed', default=True, help='Seed default categories.')
+    def init_db_command(seed):
+        """Create database tables and seed default categories"""
+        init_db(seed=seed)
+        click.echo('Database initialized')
+    
+    @app.cli.command('seed-synthetic')
+    @click.option('--users', default=10000, show_default=True)
+    @click.option('--tickets', default=1000000, show_default=True)
+    @click.option('--comments', default=5000000, show_default=True)
+    @click.option('--votes', default=10000000, show_default=True)
+    @click.option('--categories', default=12, show_default=True)
+    @click.option('--batch-size', default=10000, show_default=True)
+    @click.option('--seed', 'random_seed', default=42, show_default=True, help='Random seed.')
+    def seed_synthetic_command(users, tickets, comments, votes, categories, batch_size, random_seed):
+        """Bulk-load a synthetic production-scale dataset into an empty database"""
+        from src.synthetic_data import generate
+        db.create_all()
+        generate(users=users, tickets=tickets, comments=comments, votes=votes,
+                 categories=categories, batch_size=batch_size, seed=random_seed)
+    
+    @app.cli.command('recompute-urgency')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    @click.option('--batch-size', default=1000, show_default=True)
+    def recompute_urgency_command(interval, batch_size):
+        """Rescore tickets whose urgency may have changed since the last run"""
+        while True:
+            click.echo(f'Rescored {recompute_due(batch_size=batch_size)} tickets')
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('build-duplicate-index')
+    @click.option('--batch-size', default=1000, show_default=True)
+    def build_duplicate_index_command(batch_size):
+        """Index existing tickets for duplicate detection"""
+        from src.duplicates import build_index
+        click.echo(f'Indexed {build_index(batch_size=batch_size)} tickets')
+    
+    @app.cli.command('archive-tickets')
+    @click.option('--older-than', type=int, default=None, help='Days since last update (default ARCHIVE_AFTER_DAYS).')
+    @click.option('--batch-size', default=500, show_default=True)
+    def archive_tickets_command(older_than, batch_size):
+        """Move old closed tickets with their comments and votes to the archive tables"""
+        from src.archive import archive_closed_tickets
+        days = app.config['ARCHIVE_AFTER_DAYS'] if older_than is None else older_than
+        click.echo(f'Archived {archive_closed_tickets(days, batch_size=batch_size)} tickets')
+    
+    @app.cli.command('rebuild-ticket-metrics')
+    def rebuild_ticket_metrics_command():
+        """Recompute response and resolution metrics from existing tickets and comments"""
+        from src.history import rebuild_metrics
+        click.echo(f'Rebuilt {rebuild_metrics()} metric rows')
+    
+    @app.cli.command('recount-comments')
+    def recount_comments_command():
+        """Reset every ticket's comment_count from its live (not deleted) comments"""
+        click.echo(f'Recounted comments on {recount_comments()} tickets')
+    
+    @app.cli.command('refresh-reports')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    def refresh_reports_command(interval):
+        """Fold new tickets, resolutions, comments and votes into the daily rollups"""
+        from src.reporting import refresh_rollups
+        while True:
+            processed = refresh_rollups()
+            click.echo(', '.join(f'{source}: {count}' for source, count in processed.items()))
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('scan-attachments')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    @click.option('--workers', default=None, type=int, help='Parallel scans (default ATTACHMENT_SCAN_WORKERS).')
+    def scan_attachments_command(interval, workers):
+        """Scan quarantined attachments that no worker has picked up"""
+        from src.attachments import attachment_scanner
+        while True:
+            outcomes = attachment_scanner.scan_pending(workers=workers)
+            click.echo(', '.join(f'{status}: {count}' for status, count in sorted(outcomes.items())) or 'Nothing to scan')
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('purge-idempotency-keys')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    def purge_idempotency_keys_command(interval):
+        """Delete expired Idempotency-Key records and trim the store to IDEMPOTENCY_MAX_KEYS"""
+        from src.idempotency import purge_expired
+        while True:
+            click.echo(f'Purged {purge_expired()} idempotency keys')
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('purge-sync-tombstones')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    def purge_sync_tombstones_command(interval):
+        """Delete sync tombstones older than SYNC_TOMBSTONE_DAYS"""
+        from src.delta_sync import purge_tombstones
+        while True:
+            click.echo(f'Purged {purge_tombstones()} sync tombstones')
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('close-resolved-tickets')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    def close_resolved_tickets_command(interval):
+        """Close resolved tickets unchanged for AUTO_CLOSE_AFTER_DAYS"""
+        from src.scheduler import close_resolved
+        while True:
+            click.echo(f'Closed {close_resolved()} tickets')
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('flag-stale-tickets')
+    @click.option('--interval', default=0, help='Repeat every N seconds instead of running once.')
+    def flag_stale_tickets_command(interval):
+        """Flag in-progress tickets unchanged for STALE_AFTER_DAYS"""
+        from src.scheduler import flag_stale
+        while True:
+            counts = flag_stale()
+            click.echo(f"Flagged {counts['flagged']} stale tickets, cleared {counts['cleared']}")
+            if not interval:
+                break
+            time.sleep(interval)
+    
+    @app.cli.command('purge-orphan-uploads')
+    def purge_orphan_uploads_command():
+        """Delete uploaded files older than ORPHAN_UPLOAD_HOURS that no attachment or ticket refers to"""
+        from src.scheduler import purge_orphan_uploads
+        click.echo(f'Removed {purge_orphan_uploads()} orphaned uploads')
+    
+    @app.cli.command('run-scheduler')
+    @click.option('--job', 'jobs', multiple=True, help='Only run these jobs (default: every job in SCHEDULER_INTERVALS).')
+    def run_scheduler_command(jobs):
+        """Run the periodic jobs on their SCHEDULER_INTERVALS until SIGTERM or Ctrl+C"""
+        from src.scheduler import JOBS, run_scheduler
+        unknown = set(jobs) - set(JOBS)
+        if unknown:
+            raise click.ClickException(f"Unknown jobs: {', '.join(sorted(unknown))}")
+        stop = threading.Event()
+        # Finish the chunk in progress, then exit
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        try:
+            run_scheduler(stop, jobs or None)
+        except KeyboardInterrupt:
+            pass
+    
+    @app.cli.command('create-tenant')
+    @click.argument('slug')
+    @click.option('--name', default=None, help='Display name (default: the slug).')
+    @click.option('--database-url', default=None, help='Give the tenant its own database, e.g. sqlite:////data/hr.db.')
+    @click.option('--seed/--no-seed', default=True, help='Seed default categories.')
+    def create_tenant_command(slug, name, database_url, seed):
+        """Add a tenant, optionally with a dedicated database"""
+        if Tenant.query.filter_by(slug=slug).first():
+            raise click.ClickException(f'Tenant {slug} already exists')
+        tenant = Tenant(slug=slug, name=name or slug, database_url=database_url)
+        db.session.add(tenant)
+        db.session.commit()
+        tenant_directory.invalidate()
+        
+        if database_url:
+            create_tenant_schema(tenant_directory.engine_for(tenant_directory.get(tenant.id)))
+        with tenant_context(tenant.id):
+            if seed:
+                seed_default_categories()
+        click.echo(f'Created tenant {slug} (id {tenant.id})')
+    
+    @app.cli.command('list-tenants')
+    def list_tenants_command():
+        """List tenants and where their data lives"""
+        for tenant in Tenant.query.order_by(Tenant.id):
+            location = tenant.database_url or 'main database'
+            state = '' if tenant.is_active else ' (inactive)'
+            click.echo(f'{tenant.id}\t{tenant.slug}\t{tenant.name}\t{location}{state}')
+    
+    @app.cli.command('seed')
+    def seed_command():
+        """Seed default categories for TENANT (default: the default tenant)"""
+        with tenant_context(current_tenant_id() or DEFAULT_TENANT_ID):
+            seeded = seed_default_categories()
+        if seeded:
+            click.echo('Default categories created')
+        else:
+            click.echo('Categories already present, nothing to seed')
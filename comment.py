@@ -9,19 +9,40 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_internal = db.Column(db.Boolean, default=False)  # Internal notes for agents
+    edit_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Tombstone: deleted comments keep their row (and id) but lose their content
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    deleted_by = db.Column(db.Integer, nullable=True)  # No foreign key, so User.comments stays unambiguous
     
     # Foreign Keys
     ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # Threads only read live comments; the index predicate matches Comment.live() exactly.
+    # Delta sync reads "changed since" in (updated_at, id) order, tombstones included.
+    __table_args__ = (
+        db.Index(
+            'ix_comments_ticket_live', 'ticket_id', 'created_at',
+            sqlite_where=db.text('deleted_at IS NULL'), postgresql_where=db.text('deleted_at IS NULL')
+        ),
+        db.Index('ix_comments_updated', 'updated_at', 'id'),
+    )
+    
+    @classmethod
+    def live(cls):
+        """Predicate for comments that haven't been deleted"""
+        return cls.deleted_at.is_(None)
+    
     def to_dict(self):
         """Convert comment to dictionary"""
         return {
             'id': self.id,
             'content': self.content,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'is_internal': self.is_internal,
+            'edit_count': self.edit_count,
             'ticket_id': self.ticket_id,
             'user_id': self.user_id,
             'author': self.author.to_dict() if self.author else None
@@ -0,0 +1,35 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class CommentRevision(db.Model):
+    """One edit of a comment, stored as a reverse delta
+    
+    delta turns the content written by this edit back into the content it
+    replaced, so the comment row always holds the full current text and older
+    versions are rebuilt newest first (see src/comments.py).
+    """
+    __tablename__ = 'comment_revisions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False)  # 1 for the first edit
+    delta = db.Column(db.Text, nullable=False)  # JSON list of [start, end, replacement]
+    edited_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # No foreign key on comment_id: deleting a comment only tombstones it
+    comment_id = db.Column(db.Integer, nullable=False)
+    edited_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (db.UniqueConstraint('comment_id', 'revision', name='uq_comment_revisions_comment_revision'),)
+    
+    @property
+    def operations(self):
+        return json.loads(self.delta)
+    
+    @operations.setter
+    def operations(self, value):
+        self.delta = json.dumps(value, separators=(',', ':'))
+    
+    def __repr__(self):
+        return f'<CommentRevision {self.revision} of Comment {self.comment_id}>'
+
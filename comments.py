@@ -0,0 +1,183 @@
+"""Comment editing and deletion.
+
+Edits keep the full current text on the comment row and store each previous
+version as a reverse delta (CommentRevision): the word-level differences
+needed to turn the new text back into the old one. A typo fix on a long
+comment costs a few bytes instead of another copy. Compaction keeps the
+history short:
+
+- successive edits by the same person within COMMENT_EDIT_COMPACT_SECONDS are
+  folded into one revision, and an edit that restores the earlier text drops
+  that revision entirely;
+- only the newest COMMENT_MAX_REVISIONS revisions are kept.
+
+Deleting a comment tombstones it: the row and id stay (events and replies may
+point at it) but its content and history go, and it drops out of threads via
+the deleted_at IS NULL predicate, which ix_comments_ticket_live indexes.
+
+Ticket.comment_count counts live comments. It is adjusted with a relative
+UPDATE in the same transaction as the add or delete, and a delete only counts
+when its conditional UPDATE actually tombstoned the row, so concurrent
+deletes can't decrement twice.
+"""
+from flask import current_app
+from src.models.user import db
+from src.models.ticket import Ticket
+from src.models.comment import Comment
+from src.models.comment_revision import CommentRevision
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment, ArchivedCommentRevision
+from src.tenancy import all_tenants
+from sqlalchemy import delete, func, select, update
+from difflib import SequenceMatcher
+from datetime import datetime, timedelta
+import re
+
+DEFAULT_CONFIG = {
+    # Edits by the same person closer together than this share one revision
+    'COMMENT_EDIT_COMPACT_SECONDS': 300,
+    'COMMENT_MAX_REVISIONS': 50,
+}
+
+_TOKENS = re.compile(r'\s+|\w+|[^\w\s]')
+
+
+class EditConflict(Exception):
+    """The comment changed or was deleted since it was read"""
+
+
+def make_delta(new, old):
+    """[start, end, replacement] edits that turn new into old, with offsets into new"""
+    new_tokens, old_tokens = _TOKENS.findall(new), _TOKENS.findall(old)
+    offsets = [0]
+    for token in new_tokens:
+        offsets.append(offsets[-1] + len(token))
+    matcher = SequenceMatcher(None, new_tokens, old_tokens, autojunk=False)
+    return [
+        [offsets[i1], offsets[i2], ''.join(old_tokens[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal'
+    ]
+
+
+def apply_delta(new, delta):
+    """Rebuild the older text from the newer one"""
+    parts, position = [], 0
+    for start, end, replacement in delta:
+        parts.append(new[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(new[position:])
+    return ''.join(parts)
+
+
+def adjust_comment_count(ticket_id, change):
+    """Move a ticket's live comment counter without recounting"""
+    db.session.execute(
+        update(Ticket).where(Ticket.id == ticket_id)
+        .values(comment_count=Ticket.comment_count + change)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def edit_comment(comment, content, editor_id, now=None):
+    """Replace a comment's content and record the change; returns False if nothing changed
+
+    Raises EditConflict when another request edited or deleted the comment
+    after it was loaded. The caller commits.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    previous = comment.content
+    if content == previous:
+        return False
+
+    latest = CommentRevision.query.filter_by(comment_id=comment.id, revision=comment.edit_count).first()
+    window = timedelta(seconds=config['COMMENT_EDIT_COMPACT_SECONDS'])
+    edit_count = comment.edit_count
+
+    if latest is not None and latest.edited_by == editor_id and now - latest.edited_at <= window:
+        # Fold into the previous edit: diff straight back to the text before it
+        original = apply_delta(previous, latest.operations)
+        if content == original:
+            db.session.delete(latest)
+            edit_count -= 1
+        else:
+            latest.operations = make_delta(content, original)
+            latest.edited_at = now
+    else:
+        edit_count += 1
+        revision = CommentRevision(comment_id=comment.id, revision=edit_count, edited_by=editor_id, edited_at=now)
+        revision.operations = make_delta(content, previous)
+        db.session.add(revision)
+        oldest_kept = edit_count - config['COMMENT_MAX_REVISIONS']
+        if oldest_kept > 0:
+            db.session.execute(delete(CommentRevision).where(
+                CommentRevision.comment_id == comment.id, CommentRevision.revision <= oldest_kept
+            ))
+
+    # Compare-and-set on the text the delta was computed from
+    changed = db.session.execute(
+        update(Comment).where(Comment.id == comment.id, Comment.live(), Comment.content == previous)
+        .values(content=content, edit_count=edit_count, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not changed:
+        raise EditConflict()
+    db.session.expire(comment)
+    return True
+
+
+def delete_comment(comment, actor_id, now=None):
+    """Tombstone a comment and decrement its ticket's counter; False if it was already deleted"""
+    now = now or datetime.utcnow()
+    deleted = db.session.execute(
+        update(Comment).where(Comment.id == comment.id, Comment.live())
+        .values(deleted_at=now, deleted_by=actor_id, content='', edit_count=0, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not deleted:
+        return False
+    db.session.execute(delete(CommentRevision).where(CommentRevision.comment_id == comment.id))
+    adjust_comment_count(comment.ticket_id, -1)
+    db.session.expire(comment)
+    return True
+
+
+def comment_history(comment):
+    """Earlier versions of a comment, newest first, rebuilt from the stored deltas"""
+    revision_model = ArchivedCommentRevision if isinstance(comment, ArchivedComment) else CommentRevision
+    versions = []
+    content = comment.content
+    for revision in revision_model.query.filter_by(comment_id=comment.id).order_by(revision_model.revision.desc()):
+        content = apply_delta(content, revision.operations)
+        versions.append({
+            'revision': revision.revision,
+            'content': content,
+            'replaced_at': revision.edited_at,
+            'replaced_by': revision.edited_by,
+        })
+    return versions
+
+
+def recount_comments():
+    """Set every ticket's comment_count from its live comments; returns tickets updated
+
+    Only needed once for tickets that predate the counter, or to repair it.
+    """
+    updated = 0
+    with all_tenants():
+        for ticket_model, comment_model in ((Ticket, Comment), (ArchivedTicket, ArchivedComment)):
+            live = select(func.count(comment_model.id)).where(
+                comment_model.ticket_id == ticket_model.id, comment_model.live()
+            ).scalar_subquery()
+            # A repair is not a change to the ticket: keep updated_at (sync, archiving)
+            updated += db.session.execute(
+                update(ticket_model).values(comment_count=live, updated_at=ticket_model.updated_at)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        db.session.commit()
+    return updated
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,154 @@
+from flask import current_app, request
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Types worth compressing; images, archives and PDFs are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon',
+}
+
+DEFAULT_CONFIG = {
+    'COMPRESS_ALGORITHMS': ['br', 'gzip'],  # Server preference when qualities tie
+    'COMPRESS_LEVEL': 6,                    # gzip level, 1 (fast) - 9 (small)
+    'COMPRESS_BR_LEVEL': 4,                 # brotli quality, 0 (fast) - 11 (small)
+    'COMPRESS_MIN_SIZE': 500,               # Bytes; smaller bodies aren't worth the CPU
+    'COMPRESS_MIMETYPES': COMPRESSIBLE_MIMETYPES,
+    'COMPRESS_STREAMS': True,
+}
+
+
+class _GzipStream:
+    """Incremental gzip compressor"""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    """Incremental brotli compressor"""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def make_compressor(encoding, config):
+    """Create an incremental compressor for the negotiated encoding"""
+    if encoding == 'br':
+        return _BrotliStream(config['COMPRESS_BR_LEVEL'])
+    return _GzipStream(config['COMPRESS_LEVEL'])
+
+
+def compress_body(data, encoding, config):
+    """Compress a complete response body in one shot"""
+    compressor = make_compressor(encoding, config)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _compress_stream(chunks, compressor):
+    """Compress an iterable body, flushing after each chunk so clients see data promptly"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class Compress:
+    """Compress responses with brotli or gzip based on Accept-Encoding"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+        app.after_request(self.after_request)
+
+    def negotiate(self, config):
+        """Pick the best supported encoding the client accepts, or None"""
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in config['COMPRESS_ALGORITHMS']:
+            if encoding == 'br' and brotli is None:
+                continue
+            quality = accepted[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def should_compress(self, response, config):
+        """Check whether the response is eligible for compression at all"""
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in response.headers:
+            return False
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return False
+        if response.is_streamed:
+            if not config['COMPRESS_STREAMS']:
+                return False
+            # Streams of unknown length (generators) are always worth compressing
+            if response.content_length is None:
+                return True
+        return (response.content_length or 0) >= config['COMPRESS_MIN_SIZE']
+
+    def after_request(self, response):
+        """Compress the outgoing response if the client and content type allow it"""
+        config = current_app.config
+
+        response.vary.add('Accept-Encoding')
+        if not self.should_compress(response, config):
+            return response
+
+        encoding = self.negotiate(config)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.direct_passthrough = False
+            response.response = _compress_stream(response.response, make_compressor(encoding, config))
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compress_body(response.get_data(), encoding, config))
+
+        response.headers['Content-Encoding'] = encoding
+        # Byte ranges would refer to the uncompressed file
+        response.headers.pop('Accept-Ranges', None)
+
+        # The compressed body is no longer byte-identical, so only a weak validator holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
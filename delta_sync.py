@@ -0,0 +1,250 @@
+"""Delta sync for clients that keep a local copy of tickets, comments and categories.
+
+A client calls GET /api/sync without a token for a full snapshot, then with
+the token from the previous answer to get only what changed since. Each
+resource is read as a stream in (change time, id) order from an index:
+
+- tickets: changed_at (ix_tickets_tenant_changed). Every UPDATE of a ticket
+  bumps it, including the ones that keep updated_at because they aren't a
+  change by a person (rescoring, stored counters, stale flags), and votes
+  bump it through record_change since the payload carries their counts.
+  sla_status is the one field that moves with the clock alone; the rescore
+  run that falls due at each SLA threshold writes the row, so it follows;
+- archived: tickets moved to the archive, by archived_at; the client drops
+  them from its working set (they stay readable through GET /api/tickets/<id>);
+- comments: updated_at (ix_comments_updated); deleted comments come back as
+  tombstones, since deleting one sets deleted_at and updated_at;
+- categories: updated_at, plus SyncTombstone rows for hard deletes.
+
+The token records a (time, id) position per stream. Change times are taken
+before commit, so a slow transaction can commit a row older than one the
+client has already seen; positions are therefore never advanced past
+SYNC_OVERLAP_SECONDS ago, not even between pages, and the last moments are
+sent again on the next sync (clients upsert by id, so repeats are harmless).
+When more than a page changed within the overlap, the rest follows on a later
+sync once it is older than that.
+
+Rows are scoped with the same policy rules as the rest of the API. The token
+is signed and bound to the user, tenant and role it was issued for: if the
+role has changed, or the token is too old for the retained tombstones, the
+answer is a full snapshot with reset set, and the client replaces its store.
+"""
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.orm import joinedload
+from src.models.user import db
+from src.models.ticket import Ticket, TICKET_EXPANSIONS
+from src.models.comment import Comment
+from src.models.category import Category
+from src.models.archived_ticket import ArchivedTicket
+from src.models.sync_tombstone import SyncTombstone
+from src.read_models import ticket_columns, ticket_dicts
+from src.tenancy import all_tenants
+from src import policy
+from datetime import datetime, timedelta
+
+DEFAULT_CONFIG = {
+    # Rows per stream per call; the client calls again while has_more is set
+    'SYNC_PAGE_SIZE': 500,
+    # Changes this recent are sent again on the next sync, for transactions still committing
+    'SYNC_OVERLAP_SECONDS': 30,
+    # Category tombstones are kept this long; older tokens get a full resync
+    'SYNC_TOMBSTONE_DAYS': 30,
+}
+
+# Bumped when the payload, the scoping rules or a stream's ordering change, so old tokens resync
+SYNC_VERSION = 2
+
+
+class SyncReset(Exception):
+    """The client's token can't be continued from"""
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='delta-sync')
+
+
+def encode_token(user, tenant_id, positions):
+    return _serializer().dumps({
+        'v': SYNC_VERSION,
+        'u': user.id,
+        't': tenant_id,
+        'r': user.role.value,
+        'p': {name: [at.isoformat(), row_id] for name, (at, row_id) in positions.items() if at is not None},
+    })
+
+
+def decode_token(token, user, tenant_id, now):
+    """{stream: (time, id)} positions from a token; raises SyncReset when it must start over"""
+    try:
+        data = _serializer().loads(token)
+    except BadSignature:
+        raise SyncReset('invalid token')
+    if data.get('v') != SYNC_VERSION or data.get('u') != user.id or data.get('t') != tenant_id:
+        raise SyncReset('token was issued for another user or version')
+    if data.get('r') != user.role.value:
+        raise SyncReset('permissions changed')
+    positions = {name: (datetime.fromisoformat(at), row_id) for name, (at, row_id) in data.get('p', {}).items()}
+    oldest = now - timedelta(days=current_app.config['SYNC_TOMBSTONE_DAYS'])
+    if 'tombstones' not in positions or positions['tombstones'][0] < oldest:
+        raise SyncReset('token is older than the retained deletions')
+    return positions
+
+
+def _after(at_column, id_column, position):
+    """Keyset condition for rows past a (time, id) position
+
+    The leading at_column >= at lets the database seek the time index; the
+    OR form alone is evaluated row by row.
+    """
+    if position is None:
+        return None
+    at, row_id = position
+    return and_(at_column >= at, or_(at_column > at, id_column > row_id))
+
+
+def _read(query, at_column, id_column, position, limit):
+    """One page of a stream: (rows, truncated)"""
+    after = _after(at_column, id_column, position)
+    if after is not None:
+        query = query.filter(after)
+    rows = query.order_by(at_column, id_column).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def _advance(position, rows, truncated, at_of, horizon):
+    """(position to resume from after reading rows, whether reading on gets further)
+
+    The position never passes the overlap horizon, full page or not, so rows a
+    slow transaction commits with an older change time are still picked up. A
+    full page that already started at the horizon can't move it; the rows
+    after it wait until they fall behind the horizon, rather than the client
+    being told to fetch the same page again.
+    """
+    resume = position
+    if rows:
+        resume = (at_of(rows[-1]), rows[-1].id)
+    if resume is None or resume[0] is None or resume > (horizon, 0):
+        resume = (horizon, 0)
+    return resume, truncated and resume != position
+
+
+def sync(user, tenant_id, token=None, now=None):
+    """Changes visible to user since token (everything without one), and the token to continue from"""
+    config = current_app.config
+    now = now or datetime.utcnow()
+    limit = config['SYNC_PAGE_SIZE']
+    horizon = now - timedelta(seconds=config['SYNC_OVERLAP_SECONDS'])
+
+    positions, reset_reason = {}, None
+    if token:
+        try:
+            positions = decode_token(token, user, tenant_id, now)
+        except SyncReset as e:
+            reset_reason = str(e)
+    # Without a usable token the answer is a snapshot that replaces the client's store
+    full = not positions
+    result = {'tickets': [], 'archived': [], 'comments': [], 'categories': [],
+              'deleted': {'comments': [], 'categories': []}}
+    has_more = False
+
+    def read(name, query, at_column, id_column, at_of):
+        nonlocal has_more
+        rows, truncated = _read(query, at_column, id_column, positions.get(name), limit)
+        positions[name], more = _advance(positions.get(name), rows, truncated, at_of, horizon)
+        has_more = has_more or more
+        return rows
+
+    # Tickets, through the list read model; category ticket counts come from GET /api/categories
+    ticket_rows = read(
+        'tickets',
+        Ticket.query.filter(policy.condition(user, 'ticket.view', Ticket)).with_entities(
+            *ticket_columns(Ticket, expand=TICKET_EXPANSIONS), Ticket.changed_at
+        ),
+        Ticket.changed_at, Ticket.id, lambda row: row.changed_at
+    )
+    result['tickets'] = ticket_dicts(Ticket, ticket_rows, expand=TICKET_EXPANSIONS)
+
+    # A first sync only wants the working set; archiving is news to clients that hold the ticket
+    if full:
+        positions['archived'] = (horizon, 0)
+    else:
+        archived = read(
+            'archived',
+            db.session.query(ArchivedTicket.id, ArchivedTicket.archived_at).filter(
+                policy.condition(user, 'ticket.view', ArchivedTicket)
+            ),
+            ArchivedTicket.archived_at, ArchivedTicket.id, lambda row: row.archived_at
+        )
+        result['archived'] = [row.id for row in archived]
+
+    comments = read(
+        'comments',
+        Comment.query.options(joinedload(Comment.author)).join(Ticket, Ticket.id == Comment.ticket_id).filter(
+            policy.condition(user, 'ticket.view', Ticket),
+            policy.condition(user, 'comment.view', Comment),
+        ),
+        Comment.updated_at, Comment.id, lambda row: row.updated_at
+    )
+    for comment in comments:
+        if comment.deleted_at is None:
+            result['comments'].append(comment.to_dict())
+        elif not full:
+            result['deleted']['comments'].append({'id': comment.id, 'ticket_id': comment.ticket_id})
+
+    categories = read('categories', Category.query, Category.updated_at, Category.id, lambda row: row.updated_at)
+    result['categories'] = [category.to_dict(include_ticket_count=False) for category in categories]
+
+    if full:
+        positions['tombstones'] = (horizon, 0)
+    else:
+        tombstones = read(
+            'tombstones', SyncTombstone.query, SyncTombstone.deleted_at, SyncTombstone.id,
+            lambda row: row.deleted_at
+        )
+        for tombstone in tombstones:
+            result['deleted'].setdefault(tombstone.resource, []).append(tombstone.resource_id)
+
+    result.update({
+        'reset': full,
+        'reset_reason': reset_reason,
+        'has_more': has_more,
+        'token': encode_token(user, tenant_id, positions),
+        'server_time': now,
+    })
+    return result
+
+
+def record_change(*criteria):
+    """Mark tickets as changed for sync when data they carry lives in another table (votes)
+
+    Runs in the caller's transaction and keeps updated_at.
+    """
+    db.session.execute(
+        update(Ticket).where(*criteria)
+        .values(changed_at=datetime.utcnow(), updated_at=Ticket.updated_at)
+    )
+
+
+def record_deletion(resource, resource_id):
+    """Leave a tombstone for a hard-deleted row, in the caller's transaction"""
+    db.session.add(SyncTombstone(resource=resource, resource_id=resource_id))
+
+
+def purge_tombstones(now=None):
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; returns rows deleted"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=current_app.config['SYNC_TOMBSTONE_DAYS'])
+    with all_tenants():
+        deleted = db.session.execute(
+            delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+    return deleted
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,167 @@
+"""Near-duplicate ticket detection with MinHash and locality-sensitive hashing.
+
+Every ticket's subject and description are reduced to a MinHash signature that
+is split into bands. Each band is hashed together with the ticket's category
+into a bucket stored in ticket_lsh_buckets. Looking up a new ticket is then a
+primary-key IN query over its own buckets, followed by a signature comparison
+of the few candidates that share one, no matter how many tickets exist.
+"""
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus
+from src.models.vote import Vote
+from src.models.ticket_signature import TicketSignature, TicketLSHBucket
+from sqlalchemy import insert, select, delete, and_, exists
+from sqlalchemy.orm import aliased
+from array import array
+import hashlib
+import random
+import re
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS  # Candidate threshold is about (1/16)^(1/4) = 0.5
+
+# Minimum estimated Jaccard similarity to report a candidate
+DEFAULT_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x5EED)  # Fixed seed: signatures must stay stable across processes
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it my not of on or so that the '
+    'this to was we with you your can cant could please when what how after'.split()
+)
+
+
+def shingles(text):
+    """Word unigrams and bigrams of normalized text"""
+    tokens = [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+    result = set(tokens)
+    result.update(f'{first} {second}' for first, second in zip(tokens, tokens[1:]))
+    return result
+
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def minhash(subject, description):
+    """MinHash signature (NUM_PERMUTATIONS unsigned 32-bit ints) for a ticket's text"""
+    hashes = [_shingle_hash(shingle) for shingle in shingles(f'{subject} {description}')]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_buckets(signature, category_id):
+    """Bucket id per band; the category is part of the key so lookups stay in-category"""
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(
+            f'{category_id}:{band}:{",".join(map(str, values))}'.encode('ascii'), digest_size=8
+        ).digest()
+        # Signed 64-bit so it fits an SQLite INTEGER
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def pack(signature):
+    return array('I', signature).tobytes()
+
+
+def unpack(data):
+    signature = array('I')
+    signature.frombytes(data)
+    return signature
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERMUTATIONS
+
+
+def index_ticket(ticket_id, category_id, subject, description):
+    """Add a ticket to the index in the caller's transaction"""
+    signature = minhash(subject, description)
+    db.session.execute(insert(TicketSignature), [{'ticket_id': ticket_id, 'signature': pack(signature)}])
+    db.session.execute(insert(TicketLSHBucket), [
+        {'bucket': bucket, 'ticket_id': ticket_id} for bucket in set(band_buckets(signature, category_id))
+    ])
+
+
+def find_duplicates(subject, description, category_id, limit=5, threshold=DEFAULT_THRESHOLD, exclude_id=None):
+    """Open tickets in the same category whose text is likely the same issue"""
+    signature = minhash(subject, description)
+    buckets = list(set(band_buckets(signature, category_id)))
+
+    rows = db.session.query(Ticket.id, Ticket.subject, Ticket.status, TicketSignature.signature).join(
+        TicketSignature, TicketSignature.ticket_id == Ticket.id
+    ).filter(
+        Ticket.id.in_(
+            select(TicketLSHBucket.ticket_id).where(TicketLSHBucket.bucket.in_(buckets)).distinct()
+        ),
+        Ticket.status.in_((TicketStatus.OPEN, TicketStatus.IN_PROGRESS)),
+        Ticket.category_id == category_id
+    ).all()
+
+    matches = []
+    for row in rows:
+        if row.id == exclude_id:
+            continue
+        score = similarity(signature, unpack(row.signature))
+        if score >= threshold:
+            matches.append({'id': row.id, 'subject': row.subject, 'status': row.status, 'similarity': round(score, 2)})
+
+    matches.sort(key=lambda match: (-match['similarity'], match['id']))
+    return matches[:limit]
+
+
+def build_index(batch_size=1000):
+    """Index every ticket that isn't indexed yet; returns the number indexed"""
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Ticket.id, Ticket.category_id, Ticket.subject, Ticket.description).filter(
+            Ticket.id > last_id,
+            ~exists().where(TicketSignature.ticket_id == Ticket.id)
+        ).order_by(Ticket.id).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            index_ticket(row.id, row.category_id, row.subject, row.description)
+        db.session.commit()
+        indexed += len(rows)
+        last_id = rows[-1].id
+    return indexed
+
+
+def merge_votes(duplicate_id, canonical_id):
+    """Move votes onto the canonical ticket; users who voted on both keep their canonical vote
+
+    Returns the number of votes added to the canonical ticket.
+    """
+    canonical_vote = aliased(Vote)
+    merged = db.session.execute(
+        insert(Vote).from_select(
+            ['is_upvote', 'created_at', 'ticket_id', 'user_id'],
+            select(Vote.is_upvote, Vote.created_at, db.literal(canonical_id), Vote.user_id).where(
+                Vote.ticket_id == duplicate_id,
+                ~exists().where(and_(
+                    canonical_vote.ticket_id == canonical_id,
+                    canonical_vote.user_id == Vote.user_id
+                ))
+            )
+        )
+    ).rowcount
+    db.session.execute(delete(Vote).where(Vote.ticket_id == duplicate_id))
+    return merged
@@ -0,0 +1,227 @@
+from flask import Blueprint, request, jsonify, session, current_app
+from werkzeug.datastructures import MultiDict
+from src.models.user import db, User
+from src.models.ticket import Ticket
+from src.models.archived_ticket import ArchivedTicket
+from src.models.saved_filter import SavedFilter, SAVED_FILTER_PARAMS
+from src.routes.auth import login_required
+from src.routes.tickets import build_ticket_query, parse_sparse_params
+from datetime import datetime
+
+filters_bp = Blueprint('filters', __name__)
+
+def validate_filter_params(user, params):
+    """Normalize saved filter params to strings and check they build a query; raises ValueError"""
+    if not isinstance(params, dict):
+        raise ValueError('params must be an object')
+    
+    unknown = sorted(set(params) - set(SAVED_FILTER_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown filter parameters: {', '.join(unknown)}")
+    
+    normalized = {}
+    for key, value in params.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        if not isinstance(value, (str, int)):
+            raise ValueError(f'Invalid value for {key}')
+        normalized[key] = str(value)
+    
+    build_ticket_query(user, MultiDict(normalized))
+    return normalized
+
+def last_ticket_change(model):
+    """Newest change time on the table a filter reads, served by an index"""
+    column = ArchivedTicket.archived_at if model is ArchivedTicket else Ticket.changed_at
+    return db.session.query(db.func.max(column)).scalar()
+
+def get_own_filter(filter_id):
+    return SavedFilter.query.filter_by(id=filter_id, user_id=session['user_id']).first()
+
+@filters_bp.route('/', methods=['GET'])
+@login_required
+def get_filters():
+    """Get the current user's saved filters"""
+    try:
+        filters = SavedFilter.query.filter_by(user_id=session['user_id']).order_by(SavedFilter.name).all()
+        return jsonify({'filters': [saved.to_dict() for saved in filters]}), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch saved filters')
+        return jsonify({'error': 'Failed to fetch saved filters'}), 500
+
+@filters_bp.route('/', methods=['POST'])
+@login_required
+def create_filter():
+    """Save a named ticket filter"""
+    try:
+        user = User.query.get(session['user_id'])
+        data = request.get_json(silent=True) or {}
+        name = (data.get('name') or '').strip()
+        
+        if not name:
+            return jsonify({'error': 'Name is required'}), 400
+        
+        if SavedFilter.query.filter_by(user_id=user.id, name=name).first():
+            return jsonify({'error': 'A filter with this name already exists'}), 400
+        
+        try:
+            params = validate_filter_params(user, data.get('params', {}))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        saved = SavedFilter(name=name, user_id=user.id, materialize=bool(data.get('materialize', False)))
+        saved.filter_params = params
+        db.session.add(saved)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Filter saved successfully',
+            'filter': saved.to_dict()
+        }), 201
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to save filter')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to save filter'}), 500
+
+@filters_bp.route('/<int:filter_id>', methods=['PUT'])
+@login_required
+def update_filter(filter_id):
+    """Rename or change a saved filter"""
+    try:
+        user = User.query.get(session['user_id'])
+        saved = get_own_filter(filter_id)
+        
+        if not saved:
+            return jsonify({'error': 'Filter not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        
+        if 'name' in data:
+            name = (data.get('name') or '').strip()
+            if not name:
+                return jsonify({'error': 'Name is required'}), 400
+            duplicate = SavedFilter.query.filter_by(user_id=user.id, name=name).first()
+            if duplicate and duplicate.id != saved.id:
+                return jsonify({'error': 'A filter with this name already exists'}), 400
+            saved.name = name
+        
+        if 'params' in data:
+            try:
+                saved.filter_params = validate_filter_params(user, data['params'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        if 'materialize' in data:
+            saved.materialize = bool(data['materialize'])
+            if not saved.materialize:
+                saved.clear_snapshot()
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Filter updated successfully',
+            'filter': saved.to_dict()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to update filter')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update filter'}), 500
+
+@filters_bp.route('/<int:filter_id>', methods=['DELETE'])
+@login_required
+def delete_filter(filter_id):
+    """Delete a saved filter"""
+    try:
+        saved = get_own_filter(filter_id)
+        
+        if not saved:
+            return jsonify({'error': 'Filter not found'}), 404
+        
+        db.session.delete(saved)
+        db.session.commit()
+        
+        return jsonify({'message': 'Filter deleted successfully'}), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to delete filter')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete filter'}), 500
+
+@filters_bp.route('/<int:filter_id>/tickets', methods=['GET'])
+@login_required
+def get_filter_tickets(filter_id):
+    """Get a page of a saved filter's tickets, from its id snapshot when materialized"""
+    try:
+        user = User.query.get(session['user_id'])
+        saved = get_own_filter(filter_id)
+        
+        if not saved:
+            return jsonify({'error': 'Filter not found'}), 404
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        
+        try:
+            fields, expand, description_length = parse_sparse_params()
+            query, model = build_ticket_query(user, MultiDict(saved.filter_params))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        load_options = model.load_options(fields, expand, description_length)
+        
+        if not saved.materialize:
+            pagination = query.options(*load_options).paginate(page=page, per_page=per_page, error_out=False)
+            tickets = pagination.items
+            total = pagination.total
+            truncated = False
+        else:
+            ttl = current_app.config['SAVED_FILTER_TTL_SECONDS']
+            refresh = request.args.get('refresh', 'false').lower() == 'true'
+            if refresh or not saved.snapshot_is_fresh(ttl, last_ticket_change(model)):
+                # Timestamp before the query so a change racing it invalidates the snapshot
+                taken_at = datetime.utcnow()
+                limit = current_app.config['SAVED_FILTER_MAX_IDS']
+                ticket_ids = [row[0] for row in query.with_entities(model.id).limit(limit + 1)]
+                saved.store_snapshot(ticket_ids[:limit], truncated=len(ticket_ids) > limit, taken_at=taken_at)
+                db.session.commit()
+            
+            ticket_ids = saved.ticket_ids
+            total = len(ticket_ids)
+            truncated = saved.snapshot_truncated
+            page_ids = list(ticket_ids[(page - 1) * per_page:page * per_page])
+            
+            # One batched load for the page, put back in snapshot order; ids gone since are skipped
+            loaded = {
+                ticket.id: ticket
+                for ticket in model.query.options(*load_options).filter(model.id.in_(page_ids))
+            } if page_ids else {}
+            tickets = [loaded[ticket_id] for ticket_id in page_ids if ticket_id in loaded]
+        
+        pages = -(-total // per_page) if total else 0
+        
+        return jsonify({
+            'filter': saved.to_dict(),
+            'tickets': [
+                ticket.to_dict(fields=fields, expand=expand, description_length=description_length)
+                for ticket in tickets
+            ],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1,
+                'truncated': truncated
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch filter tickets')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to fetch filter tickets'}), 500
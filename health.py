@@ -0,0 +1,33 @@
+from flask import Blueprint, jsonify
+from src.models.user import db
+import threading
+
+health_bp = Blueprint('health', __name__)
+
+_draining = threading.Event()
+
+def mark_draining():
+    """Flag this process as shutting down so readiness checks fail"""
+    _draining.set()
+
+def is_draining():
+    """Check whether this process is shutting down"""
+    return _draining.is_set()
+
+@health_bp.route('/healthz', methods=['GET'])
+def health():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/readyz', methods=['GET'])
+def ready():
+    """Readiness probe: the process can take traffic and reach the database"""
+    if is_draining():
+        return jsonify({'status': 'draining'}), 503
+    
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'error': 'Database unreachable'}), 503
+    
+    return jsonify({'status': 'ready'}), 200
@@ -0,0 +1,173 @@
+"""Ticket event log and incrementally maintained response/resolution metrics.
+
+Every change to a ticket appends a TicketEvent in the caller's transaction.
+First response and resolution times are folded into running totals in
+ticket_metrics at the moment they happen, so reports read a handful of rows
+instead of aggregating the tickets and comments tables.
+"""
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket
+from src.models.comment import Comment
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.models.ticket_metric import TicketMetric
+from sqlalchemy import bindparam, update, delete
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+
+AGENT_ROLES = (UserRole.SUPPORT_AGENT, UserRole.ADMIN)
+
+
+def _value(value):
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def record_event(ticket_id, event_type, actor_id, old_value=None, new_value=None, at=None):
+    """Append an event to the current transaction"""
+    event = TicketEvent(
+        ticket_id=ticket_id,
+        event_type=event_type,
+        actor_id=actor_id,
+        old_value=_value(old_value),
+        new_value=_value(new_value),
+        created_at=at or datetime.utcnow()
+    )
+    db.session.add(event)
+    return event
+
+
+def record_changes(ticket, actor_id, old_status, old_assignee, old_priority):
+    """Append one event per tracked field that differs from its old value"""
+    changes = (
+        (TicketEventType.STATUS_CHANGED, old_status, ticket.status),
+        (TicketEventType.ASSIGNED, old_assignee, ticket.assigned_to),
+        (TicketEventType.PRIORITY_CHANGED, old_priority, ticket.priority),
+    )
+    for event_type, old_value, new_value in changes:
+        if old_value != new_value:
+            record_event(ticket.id, event_type, actor_id, old_value, new_value)
+
+
+def _bump(ticket, scope, scope_id, **increments):
+    """Add to a metric row of the ticket's tenant, creating the row on first use"""
+    values = {name: getattr(TicketMetric, name) + amount for name, amount in increments.items()}
+    values['updated_at'] = datetime.utcnow()
+    statement = update(TicketMetric).where(
+        TicketMetric.tenant_id == ticket.tenant_id, TicketMetric.scope == scope, TicketMetric.scope_id == scope_id
+    ).values(**values).execution_options(synchronize_session=False)
+
+    if db.session.execute(statement).rowcount:
+        return
+    try:
+        # Savepoint so a concurrent insert of the same row doesn't abort the caller's transaction
+        with db.session.begin_nested():
+            db.session.add(TicketMetric(
+                tenant_id=ticket.tenant_id, scope=scope, scope_id=scope_id, **increments
+            ))
+    except IntegrityError:
+        db.session.execute(statement)
+
+
+def record_first_response(ticket, responder_id, at):
+    """Count the first public agent reply on a ticket; later replies are ignored"""
+    if ticket.first_response_at is not None:
+        return
+    ticket.first_response_at = at
+    seconds = max((at - ticket.created_at).total_seconds(), 0)
+    _bump(ticket, 'category', ticket.category_id, first_response_count=1, first_response_seconds=seconds)
+    _bump(ticket, 'agent', responder_id, first_response_count=1, first_response_seconds=seconds)
+
+
+def record_resolution(ticket):
+    """Count a ticket's first resolution towards its category and assignee"""
+    seconds = max((ticket.resolved_at - ticket.created_at).total_seconds(), 0)
+    _bump(ticket, 'category', ticket.category_id, resolved_count=1, resolve_seconds=seconds)
+    if ticket.assigned_to is not None:
+        _bump(ticket, 'agent', ticket.assigned_to, resolved_count=1, resolve_seconds=seconds)
+
+
+def time_in_status(events, now=None):
+    """Seconds spent in each status, from a ticket's complete event timeline"""
+    now = now or datetime.utcnow()
+    durations = defaultdict(float)
+    current = since = None
+    for event in events:
+        if event.event_type in (TicketEventType.CREATED, TicketEventType.STATUS_CHANGED):
+            if current is not None:
+                durations[current] += (event.created_at - since).total_seconds()
+            current, since = event.new_value, event.created_at
+    if current is not None:
+        durations[current] += (now - since).total_seconds()
+    return dict(durations)
+
+
+def rebuild_metrics():
+    """Recompute ticket_metrics from scratch (backfill for tickets that predate the event log)
+
+    Also fills first_response_at on live tickets that have an agent reply but
+    no recorded first response. Only the current tenant's rows are replaced
+    (every tenant's without one). Returns the number of metric rows written.
+    """
+    totals = defaultdict(lambda: defaultdict(float))
+
+    for ticket_model, comment_model in ((Ticket, Comment), (ArchivedTicket, ArchivedComment)):
+        # Earliest public agent reply per ticket, from someone other than the requester
+        first_replies = {}
+        for ticket_id, user_id, created_at in db.session.query(
+            comment_model.ticket_id, comment_model.user_id, comment_model.created_at
+        ).join(User, User.id == comment_model.user_id).join(
+            ticket_model, ticket_model.id == comment_model.ticket_id
+        ).filter(
+            User.role.in_(AGENT_ROLES),
+            comment_model.is_internal == False,
+            comment_model.user_id != ticket_model.user_id
+        ).order_by(comment_model.ticket_id, comment_model.created_at).yield_per(1000):
+            first_replies.setdefault(ticket_id, (user_id, created_at))
+
+        for row in db.session.query(
+            ticket_model.id, ticket_model.tenant_id, ticket_model.category_id, ticket_model.assigned_to,
+            ticket_model.created_at, ticket_model.resolved_at
+        ).yield_per(1000):
+            if row.id in first_replies:
+                responder_id, replied_at = first_replies[row.id]
+                seconds = max((replied_at - row.created_at).total_seconds(), 0)
+                for key in ((row.tenant_id, 'category', row.category_id), (row.tenant_id, 'agent', responder_id)):
+                    totals[key]['first_response_count'] += 1
+                    totals[key]['first_response_seconds'] += seconds
+            if row.resolved_at is not None:
+                seconds = max((row.resolved_at - row.created_at).total_seconds(), 0)
+                keys = [(row.tenant_id, 'category', row.category_id)]
+                if row.assigned_to is not None:
+                    keys.append((row.tenant_id, 'agent', row.assigned_to))
+                for key in keys:
+                    totals[key]['resolved_count'] += 1
+                    totals[key]['resolve_seconds'] += seconds
+
+        if ticket_model is Ticket and first_replies:
+            table = Ticket.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('ticket_id'), table.c.first_response_at.is_(None))
+                # Backfilling a metric isn't a change to the ticket
+                .values(first_response_at=bindparam('replied_at'), updated_at=table.c.updated_at),
+                [{'ticket_id': ticket_id, 'replied_at': replied_at} for ticket_id, (_, replied_at) in first_replies.items()]
+            )
+
+    db.session.execute(delete(TicketMetric))
+    db.session.add_all(
+        TicketMetric(
+            tenant_id=tenant_id, scope=scope, scope_id=scope_id,
+            first_response_count=int(counters['first_response_count']),
+            first_response_seconds=counters['first_response_seconds'],
+            resolved_count=int(counters['resolved_count']),
+            resolve_seconds=counters['resolve_seconds']
+        )
+        for (tenant_id, scope, scope_id), counters in totals.items()
+    )
+    db.session.commit()
+    return len(totals)
@@ -0,0 +1,209 @@
+"""Idempotency-Key support for endpoints that create things.
+
+A client that may retry a POST sends a unique Idempotency-Key header. The
+first request with a key claims it by inserting a pending row before running
+the view; the unique (tenant, user, key) constraint makes that claim atomic, so
+of two concurrent retries exactly one runs. Once the view has answered, its
+status and body are stored and every later retry with the same key gets them
+back (marked with Idempotent-Replayed: true) without touching the write path.
+
+- A retry while the first request is still running gets 409 and Retry-After.
+- Reusing a key for a different request (other endpoint or body) gets 422.
+- 5xx answers and crashes release the key, since their write was rolled back,
+  so the client can simply retry. A pending key whose request died without
+  releasing it can be taken over after IDEMPOTENCY_LOCK_SECONDS.
+- Keys expire after IDEMPOTENCY_TTL_SECONDS. purge_expired() deletes them and
+  keeps the table under IDEMPOTENCY_MAX_KEYS rows (flask purge-idempotency-keys).
+"""
+from flask import current_app, jsonify, make_response, request, session
+from src.models.user import db
+from src.models.idempotency_key import IdempotencyKey
+from src.tenancy import all_tenants
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+
+DEFAULT_CONFIG = {
+    # How long a retry replays the stored response
+    'IDEMPOTENCY_TTL_SECONDS': 24 * 3600,
+    # A pending key older than this belongs to a request that died
+    'IDEMPOTENCY_LOCK_SECONDS': 60,
+    # Upper bound on stored keys; the oldest beyond it are purged early
+    'IDEMPOTENCY_MAX_KEYS': 100000,
+}
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+FORM_MIMETYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+
+
+def request_fingerprint():
+    """sha256 over the method, path and body, so a key can't be replayed for another request"""
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    if request.mimetype in FORM_MIMETYPES:
+        # Reading the raw body would stop werkzeug from parsing the form, so hash the parsed fields
+        for name, values in sorted(request.form.lists()):
+            for value in values:
+                digest.update(f'{name}={value}\n'.encode())
+        for name, upload in sorted(request.files.items(multi=True), key=lambda item: (item[0], item[1].filename or '')):
+            digest.update(f'{name}:{upload.filename}\n'.encode())
+            for chunk in iter(lambda: upload.stream.read(64 * 1024), b''):
+                digest.update(chunk)
+            upload.stream.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _error(message, status, retry_after=None):
+    response = make_response(jsonify({'error': message}), status)
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _replay(record):
+    response = current_app.response_class(record.response_body, status=record.response_status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _take_over(record, condition, fingerprint, now):
+    """Re-lock an expired or abandoned key for this request; False if another request got there first"""
+    ttl = timedelta(seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])
+    taken = db.session.execute(
+        update(IdempotencyKey).where(IdempotencyKey.id == record.id, condition).values(
+            endpoint=request.endpoint, fingerprint=fingerprint,
+            response_status=None, response_body=None,
+            locked_at=now, created_at=now, expires_at=now + ttl
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return bool(taken)
+
+
+def claim(key, fingerprint, now):
+    """Lock the key for this request: (record, None) to run the view, or (None, response) to answer with"""
+    config = current_app.config
+    record = IdempotencyKey(
+        key=key, user_id=session['user_id'], endpoint=request.endpoint, fingerprint=fingerprint,
+        locked_at=now, expires_at=now + timedelta(seconds=config['IDEMPOTENCY_TTL_SECONDS'])
+    )
+    db.session.add(record)
+    try:
+        db.session.commit()
+        return record, None
+    except IntegrityError:
+        db.session.rollback()
+
+    existing = IdempotencyKey.query.filter_by(user_id=session['user_id'], key=key).first()
+    busy = None, _error('A request with this Idempotency-Key is in progress', 409, retry_after=1)
+    if existing is None:
+        # Purged between our insert and this read; let the client come back
+        return busy
+
+    if existing.expires_at <= now:
+        if _take_over(existing, IdempotencyKey.expires_at <= now, fingerprint, now):
+            return existing, None
+        return busy
+
+    if existing.endpoint != request.endpoint or existing.fingerprint != fingerprint:
+        return None, _error('Idempotency-Key was already used for a different request', 422)
+
+    if existing.response_status is not None:
+        return None, _replay(existing)
+
+    abandoned = now - timedelta(seconds=config['IDEMPOTENCY_LOCK_SECONDS'])
+    if existing.locked_at < abandoned and _take_over(
+        existing, (IdempotencyKey.response_status.is_(None)) & (IdempotencyKey.locked_at == existing.locked_at),
+        fingerprint, now
+    ):
+        return existing, None
+    return busy
+
+
+def release(record_id):
+    """Forget a key whose request failed so a retry runs again"""
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+    db.session.commit()
+
+
+def complete(record_id, response):
+    db.session.execute(
+        update(IdempotencyKey).where(IdempotencyKey.id == record_id).values(
+            response_status=response.status_code, response_body=response.get_data(as_text=True)
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def idempotent(view):
+    """Replay the first response to retries that carry the same Idempotency-Key
+
+    Goes below login_required: keys are scoped to the logged-in user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters', 400)
+
+        record, answer = claim(key, request_fingerprint(), datetime.utcnow())
+        if answer is not None:
+            return answer
+        record_id = record.id
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            release(record_id)
+            raise
+
+        if response.status_code >= 500:
+            release(record_id)
+        else:
+            complete(record_id, response)
+        return response
+    return wrapper
+
+
+def purge_expired(now=None, batch_size=1000):
+    """Delete expired keys, then the oldest ones beyond IDEMPOTENCY_MAX_KEYS; returns rows deleted"""
+    now = now or datetime.utcnow()
+    limit = current_app.config['IDEMPOTENCY_MAX_KEYS']
+    deleted = 0
+    with all_tenants():
+        while True:
+            ids = db.session.scalars(
+                select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= now).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+
+        excess = db.session.query(IdempotencyKey).count() - limit
+        while excess > 0:
+            ids = db.session.scalars(
+                select(IdempotencyKey.id).where(IdempotencyKey.response_status.isnot(None))
+                .order_by(IdempotencyKey.id).limit(min(excess, batch_size))
+            ).all()
+            if not ids:
+                break
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+            excess -= len(ids)
+    return deleted
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,30 @@
+from src.models.user import db
+from src.tenancy import TenantScoped
+from datetime import datetime
+
+class IdempotencyKey(TenantScoped, db.Model):
+    """A client-supplied Idempotency-Key and the response its first request produced
+    
+    A row is pending (response_status is None) while the first request runs;
+    src/idempotency.py replays the stored response to retries until expires_at.
+    """
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)  # When the request now running took the key
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    __table_args__ = (db.UniqueConstraint('tenant_id', 'user_id', 'key', name='uq_idempotency_keys_tenant_user_key'),)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} for User {self.user_id}>'
+
@@ -0,0 +1,217 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from src.models.user import db
+from src.tenancy import tenant_directory
+import bisect
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+slow_query_logger = logging.getLogger('quickdesk.sql.slow')
+
+DEFAULT_CONFIG = {
+    'INSTRUMENTATION_ENABLED': False,
+    'SLOW_QUERY_MS': 100,
+    'SERVER_TIMING_HEADER': True,
+    'PROFILE_DIR': None,        # Defaults to <instance_path>/profiles
+    'PROFILE_SAMPLE_RATE': 0.0,  # Fraction of requests to profile, adjustable at runtime
+    'METRICS_TOKEN': None,       # Bearer token required by /metrics when set
+}
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def normalize_statement(statement):
+    """Collapse whitespace, literals and IN lists so similar statements group together"""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _LITERALS.sub('?', statement)
+    return _IN_LIST.sub('(?...)', statement)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition format"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class MetricsRegistry:
+    """Per-process request and SQL metrics keyed by route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.sql_time = {}
+            self.sql_count = {}
+            self.responses = {}
+            self.slow_queries = 0
+
+    def record_request(self, method, route, status, duration, sql_count, sql_time):
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.sql_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(sql_time)
+            self.sql_count.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(sql_count)
+            status_key = (method, route, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self):
+        """Render all metrics as Prometheus text"""
+        lines = []
+        with self._lock:
+            lines.append('# TYPE quickdesk_requests_total counter')
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'quickdesk_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}'
+                )
+
+            for name, histograms in (
+                ('quickdesk_request_duration_seconds', self.latency),
+                ('quickdesk_sql_duration_seconds', self.sql_time),
+                ('quickdesk_sql_queries_per_request', self.sql_count),
+            ):
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), histogram in sorted(histograms.items()):
+                    lines.extend(histogram.lines(name, f'method="{method}",route="{route}"'))
+
+            lines.append('# TYPE quickdesk_slow_queries_total counter')
+            lines.append(f'quickdesk_slow_queries_total {self.slow_queries}')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """Opt-in request timing, SQL counting and sampling profiler"""
+
+    def __init__(self, app=None):
+        self.metrics = MetricsRegistry()
+        self.sample_rate = 0.0
+        self.profile_dir = None
+        self.slow_query_seconds = 0.1
+        self.server_timing = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+        app.extensions['instrumentation'] = self
+
+        if not app.config['INSTRUMENTATION_ENABLED']:
+            return
+
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.profile_dir = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+        self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        self.server_timing = app.config['SERVER_TIMING_HEADER']
+
+        with app.app_context():
+            for engine in db.engines.values():
+                self._instrument(engine)
+        # Tenants with their own database get engines later, on first use
+        tenant_directory.on_engine(self._instrument)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _instrument(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def set_sample_rate(self, rate):
+        """Change the fraction of requests that get profiled, effective immediately"""
+        self.sample_rate = max(0.0, min(float(rate), 1.0))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+
+        if has_request_context() and 'instrumentation' in g:
+            stats = g.instrumentation
+            stats['sql_count'] += 1
+            stats['sql_time'] += elapsed
+
+        if elapsed >= self.slow_query_seconds:
+            self.metrics.record_slow_query()
+            slow_query_logger.warning(
+                'slow query %.1fms: %s', elapsed * 1000, normalize_statement(statement)
+            )
+
+    def _before_request(self):
+        g.instrumentation = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0}
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Only one profiler can be active per interpreter on Python 3.12+
+                return
+            g.instrumentation['profiler'] = profiler
+
+    def _after_request(self, response):
+        stats = g.get('instrumentation')
+        if stats is None:
+            return response
+
+        duration = time.perf_counter() - stats['start']
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.metrics.record_request(
+            request.method, route, response.status_code,
+            duration, stats['sql_count'], stats['sql_time']
+        )
+
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'app;dur={duration * 1000:.1f}, '
+                f'db;dur={stats["sql_time"] * 1000:.1f};desc="{stats["sql_count"]} queries"'
+            )
+        return response
+
+    def _teardown_request(self, exc):
+        stats = g.pop('instrumentation', None)
+        profiler = stats and stats.get('profiler')
+        if not profiler:
+            return
+
+        profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+        filename = f'{endpoint}-{int(time.time() * 1000)}-{threading.get_ident()}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
@@ -10,70 +10,163 @@ from src.models.ticket import Ticket
 from src.models.category import Category
 from src.models.comment import Comment
 from src.models.vote import Vote
+from src.models.ticket_signature import TicketSignature, TicketLSHBucket
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment, ArchivedCommentRevision, ArchivedVote
+from src.models.ticket_event import TicketEvent
+from src.models.ticket_metric import TicketMetric
+from src.models.report_rollup import DailyRollup, ReportWatermark
+from src.models.saved_filter import SavedFilter
+from src.models.attachment import Attachment
+from src.models.tenant import Tenant
+from src.models.idempotency_key import IdempotencyKey
+from src.models.comment_revision import CommentRevision
+from src.models.sync_tombstone import SyncTombstone
 from src.routes.auth import auth_bp
 from src.routes.tickets import tickets_bp
 from src.routes.categories import categories_bp
 from src.routes.users import users_bp
+from src.routes.health import health_bp
+from src.routes.metrics import metrics_bp
+from src.routes.reports import reports_bp
+from src.routes.filters import filters_bp
+from src.routes.stream import stream_bp
+from src.routes.sync import sync_bp
+from src.json_provider import QuickDeskJSONProvider
+from src.compression import Compress
+from src.instrumentation import Instrumentation
+from src.assignment import assignment_engine
+from src.attachments import attachment_scanner
+from src.workload import agent_workload
+from src.user_search import user_index
+from src import tenancy, idempotency, structured_logging, comments, delta_sync, scheduler
+from src.cli import register_commands, init_db
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 
-# Enable CORS for all routes
-CORS(app, origins="*")
+def create_app(config=None):
+    """Application factory
 
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(tickets_bp, url_prefix='/api/tickets')
-app.register_blueprint(categories_bp, url_prefix='/api/categories')
-app.register_blueprint(users_bp, url_prefix='/api/users')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Create upload directory
-upload_dir = os.path.join(os.path.dirname(__file__), 'static', 'uploads')
-os.makedirs(upload_dir, exist_ok=True)
-
-with app.app_context():
-    db.create_all()
-    
-    # Create default categories if they don't exist
-    from src.models.category import Category
-    if Category.query.count() == 0:
-        default_categories = [
-            {'name': 'Technical Support', 'description': 'Technical issues and bugs', 'color': '#3B82F6'},
-            {'name': 'Account Issues', 'description': 'Account related problems', 'color': '#EF4444'},
-            {'name': 'Feature Request', 'description': 'New feature suggestions', 'color': '#10B981'},
-            {'name': 'General Inquiry', 'description': 'General questions and inquiries', 'color': '#8B5CF6'},
-            {'name': 'Billing', 'description': 'Billing and payment issues', 'color': '#F59E0B'}
-        ]
-        
-        for cat_data in default_categories:
-            category = Category(**cat_data)
-            db.session.add(category)
-        
-        db.session.commit()
-        print("Default categories created")
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+    Building the app has no side effects on the database; run
+    `flask --app src.main init-db` once per deployment to create the schema
+    and seed default categories.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    
+    # Database configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+    app.config['AUTO_ASSIGN_TICKETS'] = os.environ.get('AUTO_ASSIGN_TICKETS', 'true').lower() == 'true'
+    # Closed tickets untouched for this many days move to the archive tables (flask archive-tickets)
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    # Resolved tickets close and in-progress ones are flagged stale after this many quiet days
+    # (flask run-scheduler, see src/scheduler.py)
+    app.config['AUTO_CLOSE_AFTER_DAYS'] = int(os.environ.get('AUTO_CLOSE_AFTER_DAYS', 7))
+    app.config['STALE_AFTER_DAYS'] = int(os.environ.get('STALE_AFTER_DAYS', 3))
+    # Report requests fold in new activity when the rollups are older than this
+    app.config['REPORT_REFRESH_SECONDS'] = int(os.environ.get('REPORT_REFRESH_SECONDS', 300))
+    # Materialized saved filters keep their id list this long unless a ticket changes first
+    app.config['SAVED_FILTER_TTL_SECONDS'] = int(os.environ.get('SAVED_FILTER_TTL_SECONDS', 60))
+    app.config['SAVED_FILTER_MAX_IDS'] = int(os.environ.get('SAVED_FILTER_MAX_IDS', 5000))
+    # Notification streams (/api/notifications/stream): event log poll interval, WSGI stream
+    # lifetime before the client reconnects, and keep-alive comment interval
+    app.config['NOTIFY_POLL_SECONDS'] = float(os.environ.get('NOTIFY_POLL_SECONDS', 2))
+    app.config['NOTIFY_STREAM_SECONDS'] = int(os.environ.get('NOTIFY_STREAM_SECONDS', 300))
+    app.config['NOTIFY_HEARTBEAT_SECONDS'] = int(os.environ.get('NOTIFY_HEARTBEAT_SECONDS', 15))
+    # Tenant for CLI jobs; requests take theirs from the session, X-Tenant or the host name
+    app.config['TENANT'] = os.environ.get('TENANT')
+    # Attachment scanning, see src/attachments.py for the remaining settings
+    app.config['ATTACHMENT_SCAN_IN_PROCESS'] = os.environ.get('ATTACHMENT_SCAN_IN_PROCESS', 'true').lower() == 'true'
+    app.config['ATTACHMENT_SCAN_WORKERS'] = int(os.environ.get('ATTACHMENT_SCAN_WORKERS', 4))
+    app.config['ATTACHMENT_SCAN_COMMAND'] = os.environ.get('ATTACHMENT_SCAN_COMMAND')
+    
+    # Opt-in request/SQL instrumentation, see src/instrumentation.py
+    app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('INSTRUMENTATION', 'false').lower() == 'true'
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # JSON logs through a background writer, see src/structured_logging.py
+    app.config['STRUCTURED_LOGGING'] = os.environ.get('STRUCTURED_LOGGING', 'true').lower() == 'true'
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+    app.config['LOG_FILE'] = os.environ.get('LOG_FILE')
+    app.config['LOG_SUCCESS_SAMPLE_RATE'] = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', 0.1))
+    
+    if config:
+        app.config.update(config)
+    
+    # Fast JSON encoding (orjson when installed), compact output unless JSON_COMPACT=false
+    app.json = QuickDeskJSONProvider(app)
+    app.json.compact = os.environ.get('JSON_COMPACT', 'true').lower() != 'false'
+    
+    # First, so request ids exist before other hooks log anything
+    structured_logging.init_app(app)
+    
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+    
+    # Compress JSON and static assets (gzip, or brotli when installed)
+    Compress(app)
+    
+    db.init_app(app)
+    
+    # Resolves each request's tenant (and its database) before any view runs a query
+    tenancy.init_app(app)
+    
+    # Needs the engines created by db.init_app
+    Instrumentation(app)
+    
+    assignment_engine.init_app(app)
+    attachment_scanner.init_app(app)
+    agent_workload.init_app(app)
+    user_index.init_app(app)
+    idempotency.init_app(app)
+    comments.init_app(app)
+    delta_sync.init_app(app)
+    scheduler.init_app(app)
+    
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(tickets_bp, url_prefix='/api/tickets')
+    app.register_blueprint(categories_bp, url_prefix='/api/categories')
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(filters_bp, url_prefix='/api/saved-filters')
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
+    
+    register_commands(app)
+    
+    # Create upload directory
+    upload_dir = os.path.join(app.static_folder, 'uploads')
+    os.makedirs(upload_dir, exist_ok=True)
+    
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+                return "Static folder not configured", 404
+    
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+    
+    return app
+
+app = create_app()
 
 
 if __name__ == '__main__':
+    # The development server sets up the schema itself for convenience
+    with app.app_context():
+        init_db()
     app.run(host='0.0.0.0', port=5000, debug=True)
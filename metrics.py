@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify, current_app, Response
+from src.models.user import UserRole
+from src.routes.auth import role_required
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def get_instrumentation():
+    """Return the Instrumentation extension if it is enabled, else None"""
+    if not current_app.config.get('INSTRUMENTATION_ENABLED'):
+        return None
+    return current_app.extensions.get('instrumentation')
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    instrumentation = get_instrumentation()
+    if instrumentation is None:
+        return jsonify({'error': 'Instrumentation is disabled'}), 404
+    
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({'error': 'Authentication required'}), 401
+    
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@metrics_bp.route('/api/admin/profiler', methods=['GET', 'PUT'])
+@role_required([UserRole.ADMIN])
+def profiler():
+    """Get or change the request profiler sample rate (Admin only)"""
+    instrumentation = get_instrumentation()
+    if instrumentation is None:
+        return jsonify({'error': 'Instrumentation is disabled'}), 404
+    
+    if request.method == 'PUT':
+        data = request.get_json()
+        try:
+            instrumentation.set_sample_rate(data.get('sample_rate', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'sample_rate must be a number between 0 and 1'}), 400
+    
+    return jsonify({
+        'profiler': {
+            'sample_rate': instrumentation.sample_rate,
+            'profile_dir': instrumentation.profile_dir
+        }
+    }), 200
@@ -0,0 +1,81 @@
+"""Live ticket notifications fed from the ticket event log.
+
+Both serving modes stream the same Server-Sent Events: the WSGI route in
+src/routes/stream.py polls per connection, the ASGI server in src/asgi.py runs
+one poller per process and fans events out to every open stream.
+"""
+from flask import current_app
+from src.models.user import db
+from src.models.ticket import Ticket
+from src.models.ticket_event import TicketEvent
+from src import policy
+
+# Largest backlog replayed to a reconnecting client (Last-Event-ID)
+MAX_REPLAY = 500
+
+# What the ticket.notify rule's column names mean for an event row
+NOTIFY_COLUMNS = {
+    'user_id': Ticket.user_id,
+    'assigned_to': Ticket.assigned_to,
+    'event_type': TicketEvent.event_type,
+}
+
+
+def latest_event_id():
+    return db.session.query(db.func.max(TicketEvent.id)).scalar() or 0
+
+
+def fetch_events(after_id, limit=MAX_REPLAY, user=None):
+    """Events on the current tenant's live tickets after an id, with the fields needed to decide who sees them
+
+    user_id in each event is the ticket owner. Given a user (see policy.Principal),
+    only events that user may be notified about are fetched.
+    """
+    query = db.session.query(
+        TicketEvent.id, TicketEvent.ticket_id, TicketEvent.event_type, TicketEvent.old_value,
+        TicketEvent.new_value, TicketEvent.created_at, TicketEvent.actor_id,
+        Ticket.subject, Ticket.user_id, Ticket.assigned_to
+    ).join(Ticket, Ticket.id == TicketEvent.ticket_id).filter(
+        TicketEvent.id > after_id
+    )
+    if user is not None:
+        query = query.filter(
+            policy.condition(user, 'ticket.notify', NOTIFY_COLUMNS),
+            (TicketEvent.actor_id != user.id) | TicketEvent.actor_id.is_(None)
+        )
+    return [row._asdict() for row in query.order_by(TicketEvent.id).limit(limit)]
+
+
+def is_visible(event, user):
+    """Whether a user should be notified about an event; nobody is notified of their own changes"""
+    return event['actor_id'] != user.id and policy.allows(user, 'ticket.notify', event)
+
+
+def format_event(event):
+    """Encode an event as an SSE message; the id lets clients resume with Last-Event-ID"""
+    data = current_app.json.dumps({
+        'id': event['id'],
+        'ticket_id': event['ticket_id'],
+        'subject': event['subject'],
+        'event_type': event['event_type'],
+        'old_value': event['old_value'],
+        'new_value': event['new_value'],
+        'created_at': event['created_at'],
+        'actor_id': event['actor_id'],
+    })
+    return f"id: {event['id']}\nevent: ticket\ndata: {data}\n\n".encode('utf-8')
+
+
+HEARTBEAT = b': ping\n\n'
+
+
+def stream_preamble(retry_ms=3000):
+    """First bytes of a stream: how long clients wait before reconnecting"""
+    return f'retry: {retry_ms}\n\n'.encode('ascii')
+
+
+def parse_last_event_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,152 @@
+"""Who may do what to which rows.
+
+Permissions are declared once in RULES, per action and role, as the rows the
+action is allowed on:
+
+- ALL: any row;
+- a tuple of alternatives (OR), each a dict of column -> required value (AND),
+  where USER stands for the acting user's id. {'user_id': USER} means "rows the
+  user owns";
+- a role missing from an action's rules is denied.
+
+At import every rule is compiled twice: into an in-memory predicate for a
+loaded row (allows) and into a SQLAlchemy filter for a model or a mapping of
+column expressions (condition). Handlers check single rows with allows; list
+endpoints, saved filters and notification feeds push the same rule into their
+query with condition, so a row is never visible in one place and hidden in
+another. tests/test_policy.py checks both against the handlers' checks from
+before this module.
+"""
+from sqlalchemy import and_, false, or_, true
+from src.models.user import UserRole
+from src.models.ticket_event import TicketEventType
+from collections import namedtuple
+
+# Placeholder for the acting user's id in a rule
+USER = object()
+ALL = 'all'
+
+# The acting user; anything with id and role works (a User row, or this when only those are kept)
+Principal = namedtuple('Principal', 'id role')
+
+OWN = ({'user_id': USER},)
+AGENTS_ALL = {UserRole.SUPPORT_AGENT: ALL, UserRole.ADMIN: ALL}
+
+RULES = {
+    # Lists, search and saved filters: end users may browse every ticket (my_tickets is a filter)
+    'ticket.list': {UserRole.END_USER: ALL, **AGENTS_ALL},
+    # The full ticket with its thread and history
+    'ticket.view': {UserRole.END_USER: OWN, **AGENTS_ALL},
+    'ticket.update': {UserRole.END_USER: OWN, **AGENTS_ALL},
+    'ticket.comment': {UserRole.END_USER: OWN, **AGENTS_ALL},
+    'ticket.prioritize': {UserRole.END_USER: OWN, **AGENTS_ALL},
+    # Status, assignment and internal notes
+    'ticket.triage': AGENTS_ALL,
+    # Live notifications: your own and assigned tickets; agents also hear about unclaimed new tickets
+    'ticket.notify': {
+        UserRole.END_USER: ({'user_id': USER}, {'assigned_to': USER}),
+        UserRole.SUPPORT_AGENT: (
+            {'user_id': USER}, {'assigned_to': USER},
+            {'assigned_to': None, 'event_type': TicketEventType.CREATED},
+        ),
+        UserRole.ADMIN: ALL,
+    },
+    # Internal notes are for agents only
+    'comment.view': {UserRole.END_USER: ({'is_internal': False},), **AGENTS_ALL},
+    'comment.edit': {UserRole.END_USER: OWN, UserRole.SUPPORT_AGENT: OWN, UserRole.ADMIN: ALL},
+    'comment.delete': {UserRole.END_USER: OWN, UserRole.SUPPORT_AGENT: OWN, UserRole.ADMIN: ALL},
+    'user.view': {UserRole.END_USER: ({'id': USER},), **AGENTS_ALL},
+    'user.update': {UserRole.END_USER: ({'id': USER},), **AGENTS_ALL},
+    # Role and active status
+    'user.manage': {UserRole.ADMIN: ALL},
+}
+
+
+class Policy:
+    """One action for one role, compiled to a predicate and a SQL filter"""
+    __slots__ = ('rule', '_allows')
+
+    def __init__(self, rule):
+        self.rule = rule
+        self._allows = self._compile_predicate(rule)
+
+    @staticmethod
+    def _compile_predicate(rule):
+        if rule == ALL:
+            return lambda get, user_id: True
+        if rule is None:
+            return lambda get, user_id: False
+        # Split each clause into the columns compared with the user and those compared with constants
+        clauses = [
+            (
+                tuple(name for name, value in clause.items() if value is USER),
+                tuple((name, value) for name, value in clause.items() if value is not USER),
+            )
+            for clause in rule
+        ]
+
+        def allows(get, user_id):
+            for user_columns, fixed in clauses:
+                if all(get(name) == user_id for name in user_columns) and all(
+                    get(name) == value for name, value in fixed
+                ):
+                    return True
+            return False
+        return allows
+
+    def allows(self, user_id, target):
+        if isinstance(target, dict):
+            return self._allows(target.get, user_id)
+        return self._allows(lambda name: getattr(target, name), user_id)
+
+    def condition(self, user_id, columns):
+        """SQL filter over columns (a model, or a dict of column name to expression)"""
+        if self.rule == ALL:
+            return true()
+        if self.rule is None:
+            return false()
+        resolve = columns.get if isinstance(columns, dict) else lambda name: getattr(columns, name)
+        alternatives = []
+        for clause in self.rule:
+            terms = []
+            for name, value in clause.items():
+                column = resolve(name)
+                if value is USER:
+                    terms.append(column == user_id)
+                elif value is None:
+                    terms.append(column.is_(None))
+                else:
+                    terms.append(column == value)
+            alternatives.append(and_(*terms))
+        return or_(*alternatives)
+
+
+COMPILED = {
+    (action, role): Policy(roles.get(role))
+    for action, roles in RULES.items()
+    for role in UserRole
+}
+
+
+def policy_for(user, action):
+    try:
+        return COMPILED[action, user.role]
+    except KeyError:
+        raise ValueError(f'Unknown action {action}') from None
+
+
+def allows(user, action, target=None):
+    """Whether user may perform action on target (a loaded row or a dict)
+
+    Without a target, whether the role may perform the action on any row at all.
+    """
+    policy = policy_for(user, action)
+    if target is None:
+        return policy.rule is not None
+    return policy.allows(user.id, target)
+
+
+def condition(user, action, columns):
+    """SQL filter for the rows of columns (a model or a name -> column dict) user may act on"""
+    return policy_for(user, action).condition(user.id, columns)
+
@@ -0,0 +1,162 @@
+"""Read-only list views built from column SELECTs instead of ORM instances.
+
+List endpoints only turn rows into JSON, so hydrating a full Ticket or User per
+row (identity map entry, attribute state, lazy relationship proxies, one COUNT
+query per counter) is wasted work. The functions here select just the columns a
+payload needs as plain result rows (tuples with attribute access), fetch the
+counters and embedded users and categories for a whole page in one grouped
+query each, and build dicts that are identical to the models' to_dict output.
+
+Statements are built from the mapped column attributes and run through the ORM
+session, so tenant scoping and per-tenant database routing still apply.
+"""
+from src.models.user import db, User
+from src.models.category import Category
+from src.models.ticket import (
+    Ticket, TICKET_COLUMNS, TICKET_DERIVED, TICKET_EXPANSIONS, TICKET_FIELDS, sla_status, is_stale
+)
+from src.models.archived_ticket import ArchivedTicket, ArchivedVote
+from src.models.vote import Vote
+from sqlalchemy import case, func, select
+
+USER_FIELDS = ('id', 'username', 'email', 'role', 'created_at', 'is_active')
+CATEGORY_FIELDS = ('id', 'name', 'description', 'color', 'is_active', 'sla_hours', 'created_at')
+
+# Vote table that holds each ticket model's vote counters (comment_count is a column)
+VOTE_MODELS = {
+    Ticket: Vote,
+    ArchivedTicket: ArchivedVote,
+}
+
+
+def user_columns():
+    return [getattr(User, field) for field in USER_FIELDS]
+
+
+def user_dict(row):
+    """Same output as User.to_dict for a row selected with user_columns()"""
+    return {field: getattr(row, field) for field in USER_FIELDS}
+
+
+def ticket_columns(model, fields=None, expand=None, description_length=None):
+    """Columns to select for a ticket list payload, mirroring TicketMixin.load_options"""
+    fields = TICKET_FIELDS if fields is None else fields
+    expand = TICKET_EXPANSIONS if expand is None else expand
+
+    columns = {'id', 'user_id'}
+    columns.update(field for field in fields if field in TICKET_COLUMNS)
+    for field in fields:
+        columns.update(TICKET_DERIVED.get(field, ()))
+    columns.update(TICKET_EXPANSIONS[name] for name in expand)
+    if model is ArchivedTicket:
+        columns.add('archived_at')
+
+    selected = []
+    if description_length is not None and 'description' in columns:
+        # One extra character tells whether the description was cut
+        columns.discard('description')
+        selected.append(func.substr(model.description, 1, description_length + 1).label('description'))
+    selected.extend(getattr(model, column) for column in sorted(columns))
+    return selected
+
+
+def _counters(model, ticket_ids, fields):
+    """{ticket_id: {counter: value}} for the requested counters of a page"""
+    counters = {ticket_id: {'upvotes': 0, 'downvotes': 0} for ticket_id in ticket_ids}
+    if not ticket_ids:
+        return counters
+    vote_model = VOTE_MODELS[model]
+
+    if 'upvotes' in fields or 'downvotes' in fields:
+        rows = db.session.execute(
+            select(
+                vote_model.ticket_id,
+                func.sum(case((vote_model.is_upvote, 1), else_=0)),
+                func.sum(case((vote_model.is_upvote, 0), else_=1)),
+            )
+            .where(vote_model.ticket_id.in_(ticket_ids))
+            .group_by(vote_model.ticket_id)
+        )
+        for ticket_id, upvotes, downvotes in rows:
+            counters[ticket_id]['upvotes'] = upvotes
+            counters[ticket_id]['downvotes'] = downvotes
+    return counters
+
+
+def _users(user_ids):
+    if not user_ids:
+        return {}
+    rows = db.session.execute(select(*user_columns()).where(User.id.in_(user_ids)))
+    return {row.id: user_dict(row) for row in rows}
+
+
+def _categories(category_ids, include_ticket_count):
+    if not category_ids:
+        return {}
+    rows = db.session.execute(
+        select(*[getattr(Category, field) for field in CATEGORY_FIELDS]).where(Category.id.in_(category_ids))
+    )
+    categories = {row.id: {field: getattr(row, field) for field in CATEGORY_FIELDS} for row in rows}
+    if include_ticket_count:
+        counts = dict(db.session.execute(
+            select(Ticket.category_id, func.count())
+            .where(Ticket.category_id.in_(categories))
+            .group_by(Ticket.category_id)
+        ).all())
+        for category_id, category in categories.items():
+            category['ticket_count'] = counts.get(category_id, 0)
+    return categories
+
+
+def ticket_dicts(model, rows, fields=None, expand=None, description_length=None):
+    """Serialize rows selected with ticket_columns(); same output as model.to_dict
+
+    The counters and embedded creator, assignee and category are fetched for the
+    whole batch at once, so a page costs a fixed number of queries.
+    """
+    sparse = fields is not None or expand is not None
+    fields = TICKET_FIELDS if fields is None else fields
+    expand = TICKET_EXPANSIONS if expand is None else expand
+
+    counters = _counters(model, [row.id for row in rows], fields)
+    user_ids = set()
+    if 'creator' in expand:
+        user_ids.update(row.user_id for row in rows)
+    if 'assignee' in expand:
+        user_ids.update(row.assigned_to for row in rows if row.assigned_to is not None)
+    users = _users(user_ids)
+    categories = _categories({row.category_id for row in rows}, not sparse) if 'category' in expand else {}
+
+    results = []
+    for row in rows:
+        result = {}
+        for field in fields:
+            if field == 'description':
+                continue
+            if field in TICKET_COLUMNS:
+                result[field] = getattr(row, field)
+            elif field == 'sla_status':
+                result[field] = sla_status(row.status, row.created_at, row.sla_due_at)
+            elif field == 'stale':
+                result[field] = is_stale(row.status, row.updated_at, row.stale_since)
+            else:
+                result[field] = counters[row.id][field]
+
+        if 'description' in fields:
+            if description_length is None:
+                result['description'] = row.description
+            else:
+                result['description'] = row.description[:description_length]
+                result['description_truncated'] = len(row.description) > description_length
+
+        if 'creator' in expand:
+            result['creator'] = users.get(row.user_id)
+        if 'assignee' in expand:
+            result['assignee'] = users.get(row.assigned_to)
+        if 'category' in expand:
+            result['category'] = categories.get(row.category_id)
+
+        if model is ArchivedTicket:
+            result['archived_at'] = row.archived_at
+        results.append(result)
+    return results
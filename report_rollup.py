@@ -0,0 +1,31 @@
+from src.models.user import db
+from datetime import datetime
+
+class DailyRollup(db.Model):
+    """Pre-aggregated daily counts for admin reports, maintained by src/reporting.py
+
+    Dimensions that don't apply to a metric are stored as 0 / '' so every row
+    has a complete primary key.
+    """
+    __tablename__ = 'daily_rollups'
+    
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True, default=0)
+    priority = db.Column(db.String(20), primary_key=True, default='')
+    agent_id = db.Column(db.Integer, primary_key=True, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyRollup {self.day} {self.metric}: {self.count}>'
+
+class ReportWatermark(db.Model):
+    """Highest source row id already folded into the rollups, per source"""
+    __tablename__ = 'report_watermarks'
+    
+    source = db.Column(db.String(30), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReportWatermark {self.source}: {self.last_id}>'
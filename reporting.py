@@ -0,0 +1,210 @@
+"""Daily rollups behind the admin reports.
+
+Each source table is folded into daily_rollups from a high-water mark: a refresh
+reads only the rows whose id is above the source's last_id, adds their counts
+to the matching rollup rows and moves the mark in the same transaction. The
+mark is claimed with a compare-and-set first, so two concurrent refreshes can't
+count the same rows twice.
+"""
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus
+from src.models.comment import Comment
+from src.models.vote import Vote
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment, ArchivedVote
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.models.report_rollup import DailyRollup, ReportWatermark
+from src.models.category import Category
+from src.tenancy import all_tenants
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from datetime import datetime, timedelta
+
+METRICS = ('tickets_created', 'tickets_resolved', 'comments', 'upvotes', 'downvotes')
+DIMENSIONS = ('category_id', 'priority', 'agent_id')
+
+
+def _max_id(*models):
+    return max(db.session.query(db.func.max(model.id)).scalar() or 0 for model in models)
+
+
+def _ticket_dimensions(ticket_ids):
+    """(category_id, priority, assigned_to) per ticket, live or archived"""
+    dimensions = {}
+    ticket_ids = list(ticket_ids)
+    for model in (Ticket, ArchivedTicket):
+        for start in range(0, len(ticket_ids), 500):
+            for row in db.session.query(model.id, model.category_id, model.priority, model.assigned_to).filter(
+                model.id.in_(ticket_ids[start:start + 500])
+            ):
+                dimensions[row.id] = (row.category_id, row.priority.value, row.assigned_to or 0)
+    return dimensions
+
+
+def _created_tickets(low, high):
+    for model in (Ticket, ArchivedTicket):
+        for row in db.session.query(model.created_at, model.category_id, model.priority, model.assigned_to).filter(
+            model.id > low, model.id <= high
+        ).yield_per(1000):
+            yield row.created_at.date(), 'tickets_created', row.category_id, row.priority.value, row.assigned_to or 0
+
+
+def _resolved_tickets(low, high):
+    resolutions = db.session.query(TicketEvent.ticket_id, TicketEvent.created_at).filter(
+        TicketEvent.id > low,
+        TicketEvent.id <= high,
+        TicketEvent.event_type == TicketEventType.STATUS_CHANGED,
+        TicketEvent.new_value == TicketStatus.RESOLVED.value
+    ).all()
+    dimensions = _ticket_dimensions({row.ticket_id for row in resolutions})
+    for ticket_id, resolved_at in resolutions:
+        if ticket_id in dimensions:
+            yield (resolved_at.date(), 'tickets_resolved') + dimensions[ticket_id]
+
+
+def _child_rows(models, columns, low, high):
+    """Rows of a per-ticket child table (live and archived) tagged with their ticket's category and priority"""
+    for model in models:
+        rows = db.session.query(model.ticket_id, *[getattr(model, column) for column in columns]).filter(
+            model.id > low, model.id <= high
+        ).all()
+        dimensions = _ticket_dimensions({row.ticket_id for row in rows})
+        for row in rows:
+            if row.ticket_id in dimensions:
+                category_id, priority, _ = dimensions[row.ticket_id]
+                yield row, category_id, priority
+
+
+def _comments(low, high):
+    for row, category_id, priority in _child_rows((Comment, ArchivedComment), ('created_at',), low, high):
+        yield row.created_at.date(), 'comments', category_id, priority, 0
+
+
+def _votes(low, high):
+    for row, category_id, priority in _child_rows((Vote, ArchivedVote), ('created_at', 'is_upvote'), low, high):
+        yield row.created_at.date(), 'upvotes' if row.is_upvote else 'downvotes', category_id, priority, 0
+
+
+# source name -> (models whose ids the mark tracks, row generator)
+SOURCES = {
+    'tickets': ((Ticket, ArchivedTicket), _created_tickets),
+    'resolutions': ((TicketEvent,), _resolved_tickets),
+    'comments': ((Comment, ArchivedComment), _comments),
+    'votes': ((Vote, ArchivedVote), _votes),
+}
+
+
+def _watermark(source):
+    watermark = db.session.get(ReportWatermark, source)
+    if watermark is None:
+        try:
+            with db.session.begin_nested():
+                watermark = ReportWatermark(source=source, last_id=0)
+                db.session.add(watermark)
+        except IntegrityError:
+            watermark = db.session.get(ReportWatermark, source)
+    return watermark
+
+
+def _add_counts(counts):
+    for (day, metric, category_id, priority, agent_id), count in counts.items():
+        key = (
+            DailyRollup.day == day, DailyRollup.metric == metric, DailyRollup.category_id == category_id,
+            DailyRollup.priority == priority, DailyRollup.agent_id == agent_id
+        )
+        updated = db.session.execute(
+            update(DailyRollup).where(*key).values(count=DailyRollup.count + count)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.add(DailyRollup(
+                day=day, metric=metric, category_id=category_id, priority=priority, agent_id=agent_id, count=count
+            ))
+    db.session.flush()
+
+
+def refresh_rollups(batch_size=50000):
+    """Fold every source's new rows into the rollups; returns rows counted per source
+
+    Each source advances in id windows of batch_size, one transaction per window.
+    Rollups cover every tenant sharing the database; reports pick their tenant's
+    rows out by category.
+    """
+    with all_tenants():
+        return _refresh_rollups(batch_size)
+
+
+def _refresh_rollups(batch_size):
+    processed = {}
+    for source, (models, rows) in SOURCES.items():
+        processed[source] = 0
+        high = _max_id(*models)
+        while True:
+            low = _watermark(source).last_id
+            if low >= high:
+                break
+            window_high = min(low + batch_size, high)
+            try:
+                claimed = db.session.execute(
+                    update(ReportWatermark).where(
+                        ReportWatermark.source == source, ReportWatermark.last_id == low
+                    ).values(last_id=window_high, refreshed_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not claimed:
+                    # Another refresh got here first
+                    db.session.rollback()
+                    break
+
+                counts = Counter(rows(low, window_high))
+                _add_counts(counts)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            db.session.expire_all()
+            processed[source] += sum(counts.values())
+
+    db.session.execute(
+        update(ReportWatermark).values(refreshed_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return processed
+
+
+def refresh_if_stale(max_age_seconds):
+    """Refresh unless every source was refreshed within max_age_seconds"""
+    oldest = db.session.query(db.func.min(ReportWatermark.refreshed_at)).scalar()
+    sources = db.session.query(db.func.count(ReportWatermark.source)).scalar()
+    if oldest is None or sources < len(SOURCES) or datetime.utcnow() - oldest > timedelta(seconds=max_age_seconds):
+        refresh_rollups()
+
+
+def rollup_report(start, end, group_by=None):
+    """Sum rollups between two dates (inclusive), optionally grouped by day or a dimension
+
+    Only rows for the current tenant's categories are counted; categories are
+    tenant scoped, so the subquery carries the tenant filter.
+    """
+    columns = []
+    if group_by == 'day':
+        columns.append(DailyRollup.day)
+    elif group_by in DIMENSIONS:
+        columns.append(getattr(DailyRollup, group_by))
+
+    query = db.session.query(*columns, DailyRollup.metric, db.func.sum(DailyRollup.count)).filter(
+        DailyRollup.day >= start, DailyRollup.day <= end,
+        DailyRollup.category_id.in_(db.session.query(Category.id))
+    ).group_by(*columns, DailyRollup.metric)
+    if columns:
+        query = query.order_by(columns[0])
+
+    rows = {}
+    for row in query:
+        key = row[0] if columns else None
+        if key not in rows:
+            rows[key] = dict.fromkeys(METRICS, 0)
+            if columns:
+                rows[key] = {group_by: key, **rows[key]}
+        rows[key][row[-2]] = int(row[-1])
+    return list(rows.values())
@@ -0,0 +1,62 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db, UserRole
+from src.models.report_rollup import ReportWatermark
+from src.routes.auth import role_required
+from src.reporting import refresh_if_stale, refresh_rollups, rollup_report, DIMENSIONS
+from datetime import date, timedelta
+
+reports_bp = Blueprint('reports', __name__)
+
+def parse_date_range():
+    """start/end query params as dates, defaulting to the last 30 days; raises ValueError"""
+    end = request.args.get('end')
+    end = date.fromisoformat(end) if end else date.today()
+    start = request.args.get('start')
+    start = date.fromisoformat(start) if start else end - timedelta(days=29)
+    if start > end:
+        raise ValueError('start must not be after end')
+    return start, end
+
+@reports_bp.route('/tickets', methods=['GET'])
+@role_required([UserRole.ADMIN])
+def get_ticket_report():
+    """Daily rollup totals for a date range, optionally grouped (Admin only)"""
+    try:
+        try:
+            start, end = parse_date_range()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        group_by = request.args.get('group_by') or None
+        if group_by is not None and group_by != 'day' and group_by not in DIMENSIONS:
+            return jsonify({'error': f"group_by must be one of: day, {', '.join(DIMENSIONS)}"}), 400
+        
+        refresh_if_stale(current_app.config['REPORT_REFRESH_SECONDS'])
+        
+        return jsonify({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'rows': rollup_report(start, end, group_by),
+            'refreshed_at': db.session.query(db.func.min(ReportWatermark.refreshed_at)).scalar()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch ticket report')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to fetch ticket report'}), 500
+
+@reports_bp.route('/refresh', methods=['POST'])
+@role_required([UserRole.ADMIN])
+def refresh_reports():
+    """Fold new activity into the rollups now (Admin only)"""
+    try:
+        return jsonify({
+            'message': 'Reports refreshed successfully',
+            'processed': refresh_rollups()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to refresh reports')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to refresh reports'}), 500
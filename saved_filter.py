@@ -0,0 +1,84 @@
+from src.models.user import db
+from datetime import datetime
+from array import array
+import json
+
+# get_tickets parameters a saved filter may store
+SAVED_FILTER_PARAMS = (
+    'status', 'category_id', 'priority', 'search', 'sort_by', 'sort_order',
+    'queue', 'my_tickets', 'archived'
+)
+
+class SavedFilter(db.Model):
+    """A named get_tickets query belonging to one user
+
+    When materialize is set, the ordered ids of every matching ticket are kept
+    in snapshot_ids so paging through the queue doesn't re-run the filter.
+    """
+    __tablename__ = 'saved_filters'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON object of SAVED_FILTER_PARAMS
+    materialize = db.Column(db.Boolean, nullable=False, default=False)
+    snapshot_ids = db.Column(db.LargeBinary, nullable=True)  # Packed signed 64-bit ids in result order
+    snapshot_at = db.Column(db.DateTime, nullable=True)
+    snapshot_truncated = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'name', name='unique_user_filter_name'),)
+    
+    @property
+    def filter_params(self):
+        return json.loads(self.params or '{}')
+    
+    @filter_params.setter
+    def filter_params(self, value):
+        self.params = json.dumps(value, sort_keys=True)
+        self.clear_snapshot()
+    
+    @property
+    def ticket_ids(self):
+        ids = array('q')
+        if self.snapshot_ids:
+            ids.frombytes(self.snapshot_ids)
+        return ids
+    
+    def store_snapshot(self, ticket_ids, truncated=False, taken_at=None):
+        self.snapshot_ids = array('q', ticket_ids).tobytes()
+        self.snapshot_truncated = truncated
+        self.snapshot_at = taken_at or datetime.utcnow()
+    
+    def clear_snapshot(self):
+        self.snapshot_ids = None
+        self.snapshot_at = None
+        self.snapshot_truncated = False
+    
+    def snapshot_is_fresh(self, ttl_seconds, last_ticket_change, now=None):
+        """A snapshot is reusable while it is younger than the TTL and no ticket changed after it"""
+        if self.snapshot_at is None or self.snapshot_ids is None:
+            return False
+        now = now or datetime.utcnow()
+        if (now - self.snapshot_at).total_seconds() > ttl_seconds:
+            return False
+        return last_ticket_change is None or last_ticket_change < self.snapshot_at
+    
+    def to_dict(self):
+        """Convert saved filter to dictionary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'params': self.filter_params,
+            'materialize': self.materialize,
+            'snapshot_at': self.snapshot_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'user_id': self.user_id
+        }
+    
+    def __repr__(self):
+        return f'<SavedFilter {self.id}: {self.name}>'
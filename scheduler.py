@@ -0,0 +1,292 @@
+"""Built-in scheduler for periodic maintenance jobs.
+
+`flask run-scheduler` runs every job in JOBS on its SCHEDULER_INTERVALS period
+in one long-lived process; each job also keeps its own command for cron or
+one-off runs. Besides the existing jobs (urgency rescoring, report rollups,
+attachment scans, archiving and the purges) three sweeps live here:
+
+- close_resolved: resolved tickets unchanged for AUTO_CLOSE_AFTER_DAYS are
+  closed, with a status_changed event that has no actor;
+- flag_stale: in-progress tickets unchanged for STALE_AFTER_DAYS get
+  stale_since set. The flag keeps updated_at, as rescoring and the other
+  bookkeeping writes do (only changed_at moves, for sync), so it is no change
+  to the ticket itself and the quiet period carries on. Any later change
+  clears it (see is_stale), and the sweep tidies up flags that no longer hold;
+- purge_orphan_uploads: files in quarantine or static/uploads that no
+  attachment or ticket refers to, once older than ORPHAN_UPLOAD_HOURS.
+
+SQLite lets one writer in at a time, so the sweeps never hold it for long:
+tickets are taken SCHEDULER_BATCH_SIZE at a time through an index, each chunk
+is its own short transaction, and the sweep pauses between chunks so request
+traffic gets the lock. The UPDATE for a chunk repeats the selection criteria,
+so a ticket someone changed in the meantime is left alone, and two schedulers
+running at once only duplicate work.
+
+Ticket jobs run once for the main database (every tenant sharing it) and once
+for each tenant with its own database; with TENANT set, only for that tenant.
+"""
+from flask import current_app
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus
+from src.models.archived_ticket import ArchivedTicket
+from src.models.attachment import Attachment, AttachmentStatus
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.tenancy import tenant_directory, tenant_context, all_tenants
+from sqlalchemy import and_, insert, null, or_, select, update
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('quickdesk.scheduler')
+
+DEFAULT_CONFIG = {
+    'AUTO_CLOSE_AFTER_DAYS': 7,
+    'STALE_AFTER_DAYS': 3,
+    # Uploads younger than this may still belong to a request that is creating its ticket
+    'ORPHAN_UPLOAD_HOURS': 24,
+    # Tickets per transaction in the sweeps, and the pause that lets other writers in between
+    'SCHEDULER_BATCH_SIZE': 200,
+    'SCHEDULER_BATCH_PAUSE_SECONDS': 0.1,
+    # Seconds between runs of each job under run-scheduler; 0 leaves a job out
+    'SCHEDULER_INTERVALS': {
+        'recompute-urgency': 60,
+        'scan-attachments': 300,
+        'refresh-reports': 300,
+        'close-resolved-tickets': 3600,
+        'flag-stale-tickets': 3600,
+        'purge-idempotency-keys': 3600,
+        'archive-tickets': 86400,
+        'purge-sync-tombstones': 86400,
+        'purge-orphan-uploads': 86400,
+    },
+}
+
+
+def _chunks(query):
+    """Lists of ids from query, a batch at a time with a pause in between
+
+    Each batch must stop matching query once handled, as the sweeps' updates do.
+    """
+    config = current_app.config
+    size = config['SCHEDULER_BATCH_SIZE']
+    while True:
+        ids = db.session.scalars(query.limit(size)).all()
+        if not ids:
+            return
+        yield ids
+        if len(ids) < size:
+            return
+        time.sleep(config['SCHEDULER_BATCH_PAUSE_SECONDS'])
+
+
+def close_resolved(now=None):
+    """Close resolved tickets nobody has touched for AUTO_CLOSE_AFTER_DAYS; returns the number closed"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=current_app.config['AUTO_CLOSE_AFTER_DAYS'])
+    due = and_(Ticket.status == TicketStatus.RESOLVED, Ticket.updated_at < cutoff)
+
+    closed = 0
+    for ids in _chunks(select(Ticket.id).where(due).order_by(Ticket.updated_at)):
+        chunk = and_(Ticket.id.in_(ids), due)
+        try:
+            # Once the insert holds the write lock, the update sees the same rows
+            db.session.execute(insert(TicketEvent).from_select(
+                ['ticket_id', 'event_type', 'actor_id', 'old_value', 'new_value', 'created_at'],
+                select(
+                    Ticket.id, db.literal(TicketEventType.STATUS_CHANGED, TicketEvent.event_type.type), null(),
+                    db.literal(TicketStatus.RESOLVED.value), db.literal(TicketStatus.CLOSED.value), db.literal(now)
+                ).where(chunk)
+            ))
+            closed += db.session.execute(
+                update(Ticket).where(chunk).values(status=TicketStatus.CLOSED)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return closed
+
+
+def flag_stale(now=None):
+    """Flag in-progress tickets unchanged for STALE_AFTER_DAYS and drop flags that lapsed
+
+    Returns {'flagged': n, 'cleared': n}.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=current_app.config['STALE_AFTER_DAYS'])
+    quiet = and_(
+        Ticket.status == TicketStatus.IN_PROGRESS,
+        Ticket.updated_at < cutoff,
+        # Not flagged yet, or flagged before a change and quiet again since
+        or_(Ticket.stale_since.is_(None), Ticket.stale_since < Ticket.updated_at)
+    )
+    # The ticket changed or moved on after it was flagged (served by the partial ix_tickets_stale)
+    lapsed = and_(
+        Ticket.stale_since.isnot(None),
+        or_(Ticket.status != TicketStatus.IN_PROGRESS, Ticket.updated_at > Ticket.stale_since)
+    )
+
+    counts = {}
+    for name, condition, stale_since in (('flagged', quiet, now), ('cleared', lapsed, None)):
+        counts[name] = 0
+        for ids in _chunks(select(Ticket.id).where(condition)):
+            # Keep updated_at: being flagged isn't a change to the ticket
+            counts[name] += db.session.execute(
+                update(Ticket).where(Ticket.id.in_(ids), condition)
+                .values(stale_since=stale_since, updated_at=Ticket.updated_at)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+    return counts
+
+
+def databases():
+    """Tenant ids that cover every database once: None for the main one, then each dedicated one"""
+    yield None
+    for tenant, engine in tenant_directory.dedicated_engines():
+        yield tenant.id
+
+
+def _referenced_files():
+    """Names of upload files an attachment or ticket in the current database refers to"""
+    names = set(db.session.scalars(
+        select(Attachment.staged_name).where(Attachment.status != AttachmentStatus.REJECTED)
+    ))
+    with all_tenants():
+        for model in (Ticket, ArchivedTicket):
+            # Tickets from before attachments were tracked only have the path
+            names.update(os.path.basename(path) for path in db.session.scalars(
+                select(model.attachment_path).where(model.attachment_path.isnot(None))
+            ))
+    return names
+
+
+def purge_orphan_uploads(now=None):
+    """Delete old files in quarantine and static/uploads that nothing refers to; returns files removed
+
+    Uploads are shared by every tenant, so references are gathered from every
+    database whatever TENANT is set to.
+    """
+    config = current_app.config
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=config['ORPHAN_UPLOAD_HOURS'])
+    cutoff = (cutoff - datetime(1970, 1, 1)).total_seconds()
+    candidates = []
+    for directory in (config['ATTACHMENT_QUARANTINE_DIR'], os.path.join(current_app.static_folder, 'uploads')):
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                candidates.extend(entry for entry in entries if entry.is_file() and entry.stat().st_mtime < cutoff)
+    if not candidates:
+        return 0
+
+    referenced = set()
+    for tenant_id in databases():
+        with tenant_context(tenant_id):
+            referenced |= _referenced_files()
+            db.session.rollback()
+
+    removed = 0
+    for entry in candidates:
+        if entry.name in referenced:
+            continue
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _archive():
+    from src.archive import archive_closed_tickets
+    return archive_closed_tickets(current_app.config['ARCHIVE_AFTER_DAYS'])
+
+
+def _recompute_urgency():
+    from src.urgency import recompute_due
+    return recompute_due()
+
+
+def _refresh_reports():
+    from src.reporting import refresh_rollups
+    return refresh_rollups()
+
+
+def _scan_attachments():
+    from src.attachments import attachment_scanner
+    return dict(attachment_scanner.scan_pending())
+
+
+def _purge_idempotency_keys():
+    from src.idempotency import purge_expired
+    return purge_expired()
+
+
+def _purge_sync_tombstones():
+    from src.delta_sync import purge_tombstones
+    return purge_tombstones()
+
+
+# name: (function, whether it runs once per database)
+JOBS = {
+    'recompute-urgency': (_recompute_urgency, True),
+    'scan-attachments': (_scan_attachments, True),
+    'refresh-reports': (_refresh_reports, True),
+    'close-resolved-tickets': (close_resolved, True),
+    'flag-stale-tickets': (flag_stale, True),
+    'purge-idempotency-keys': (_purge_idempotency_keys, True),
+    'archive-tickets': (_archive, True),
+    'purge-sync-tombstones': (_purge_sync_tombstones, True),
+    'purge-orphan-uploads': (purge_orphan_uploads, False),
+}
+
+
+def run_job(name):
+    """Run one job wherever it applies; returns {tenant id or None: result}"""
+    function, per_database = JOBS[name]
+    if not per_database or current_app.config['TENANT']:
+        return {None: function()}
+    results = {}
+    for tenant_id in databases():
+        with tenant_context(tenant_id):
+            results[tenant_id] = function()
+    return results
+
+
+def run_scheduler(stop=None, jobs=None):
+    """Run jobs (default: all with an interval) on their intervals until stop is set
+
+    Every job is due at start. A failing job is logged and tried again at its
+    next run; the others carry on.
+    """
+    stop = stop or threading.Event()
+    intervals = {
+        name: seconds for name, seconds in current_app.config['SCHEDULER_INTERVALS'].items()
+        if seconds and name in JOBS and (jobs is None or name in jobs)
+    }
+    next_run = dict.fromkeys(intervals, 0.0)
+    while intervals and not stop.is_set():
+        for name in sorted(intervals, key=next_run.get):
+            if stop.is_set() or next_run[name] > time.monotonic():
+                continue
+            started = time.monotonic()
+            try:
+                results = run_job(name)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Job %s failed', name, extra={'job': name})
+            else:
+                logger.info('Job %s: %s', name, results, extra={
+                    'job': name, 'duration_ms': round((time.monotonic() - started) * 1000, 1)
+                })
+            finally:
+                db.session.remove()
+            next_run[name] = time.monotonic() + intervals[name]
+        stop.wait(max(min(next_run.values()) - time.monotonic(), 0))
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,57 @@
+from flask import Blueprint, Response, request, session, current_app, stream_with_context
+from src.models.user import db, User
+from src.routes.auth import login_required
+from src.routes.health import is_draining
+from src.notifications import (
+    latest_event_id, fetch_events, format_event, stream_preamble,
+    parse_last_event_id, HEARTBEAT, MAX_REPLAY
+)
+from src.policy import Principal
+import time
+
+stream_bp = Blueprint('stream', __name__)
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+@stream_bp.route('/api/notifications/stream', methods=['GET'])
+@login_required
+def notification_stream():
+    """Server-Sent Events for ticket changes the user cares about
+    
+    Under WSGI each open stream holds a worker thread, so streams end after
+    NOTIFY_STREAM_SECONDS and clients reconnect with Last-Event-ID. The ASGI
+    server (src/asgi.py) answers this path on its event loop instead.
+    """
+    user = User.query.get(session['user_id'])
+    principal = Principal(user.id, user.role)
+    last_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    if last_id is None:
+        last_id = latest_event_id()
+    db.session.rollback()
+    
+    poll = current_app.config['NOTIFY_POLL_SECONDS']
+    deadline = time.monotonic() + current_app.config['NOTIFY_STREAM_SECONDS']
+    heartbeat = current_app.config['NOTIFY_HEARTBEAT_SECONDS']
+    
+    def generate():
+        nonlocal last_id
+        yield stream_preamble()
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline and not is_draining():
+            # Only this user's events are fetched; skip past the rest so they aren't scanned again
+            ceiling = latest_event_id()
+            events = fetch_events(last_id, user=principal)
+            # End the read transaction so the connection doesn't pin a snapshot between polls
+            db.session.rollback()
+            for event in events:
+                last_id = event['id']
+                quiet_since = time.monotonic()
+                yield format_event(event)
+            if len(events) < MAX_REPLAY:
+                last_id = max(last_id, ceiling)
+            if time.monotonic() - quiet_since >= heartbeat:
+                quiet_since = time.monotonic()
+                yield HEARTBEAT
+            time.sleep(poll)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=STREAM_HEADERS)
@@ -0,0 +1,223 @@
+"""Structured JSON logs written off the request path.
+
+Request threads only put records on a bounded in-memory queue (QueueHandler);
+a background QueueListener thread encodes them as one JSON object per line and
+does the actual I/O. When the queue is full, records are dropped and counted
+instead of blocking the request, and the count is reported with the next
+record that gets through. There is one queue and writer thread per process,
+however many apps are created, and it is flushed and stopped at exit.
+
+Every record logged during a request carries its request id (taken from an
+incoming X-Request-ID header or generated, and echoed back on the response),
+method, route, tenant and user id. Each request also gets one access record
+with status and latency. Successful fast requests are sampled at
+LOG_SUCCESS_SAMPLE_RATE (the rate is included so counts can be scaled back
+up); errors, slow requests and anything at WARNING or above are always kept.
+"""
+from flask import g, has_request_context, request, session
+from flask.logging import default_handler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+access_logger = logging.getLogger('quickdesk.access')
+
+DEFAULT_CONFIG = {
+    'STRUCTURED_LOGGING': True,
+    'LOG_LEVEL': 'INFO',
+    'LOG_FILE': None,  # Defaults to stderr
+    # Records held for the writer thread; beyond this they are dropped, never waited on
+    'LOG_QUEUE_SIZE': 10000,
+    # Fraction of fast 2xx/3xx access records that are written
+    'LOG_SUCCESS_SAMPLE_RATE': 0.1,
+    # Requests slower than this are always logged
+    'LOG_SLOW_REQUEST_MS': 1000,
+}
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request while still on the request thread"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.route = request.url_rule.rule if request.url_rule else None
+            record.tenant_id = g.get('tenant_id')
+            record.user_id = session.get('user_id')
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records rather than wait on a full queue"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Render the message and traceback now: args and exc_info may not survive the thread hop
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info))
+        record.msg, record.args, record.exc_info = record.message, None, None
+        with self._lock:
+            if self.dropped:
+                record.dropped_records, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        elif record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str)
+
+
+def _before_request():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming[:64] if incoming else uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+    return response
+
+
+def _make_access_logger(app):
+    sample_rate = app.config['LOG_SUCCESS_SAMPLE_RATE']
+    slow_ms = app.config['LOG_SLOW_REQUEST_MS']
+
+    def log_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        status = response.status_code
+        if status >= 500:
+            level = logging.ERROR
+        elif latency_ms >= slow_ms:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        # Only fast successes are sampled; errors and slow requests are always kept
+        rate = sample_rate if status < 400 and latency_ms < slow_ms else 1.0
+        if rate < 1.0 and random.random() >= rate:
+            return response
+        access_logger.log(level, '%s %s %s', request.method, request.path, status, extra={
+            'status': status,
+            'latency_ms': latency_ms,
+            'path': request.path,
+            'sample_rate': rate,
+        })
+        return response
+    return log_request
+
+
+# One queue and writer thread per process, however many apps are created
+_writer_lock = threading.Lock()
+_handler = None
+_listener = None
+_output = None  # (LOG_FILE, handler) while the writer thread runs
+
+
+def _stop_locked():
+    global _output
+    if _output is not None:
+        _listener.stop()
+        _output[1].close()
+        _output = None
+
+
+def _stop_writer():
+    """Flush whatever is queued and close the output (run at exit)"""
+    with _writer_lock:
+        _stop_locked()
+
+
+def _start_writer(log_file, queue_size):
+    """The process-wide queue handler, with its writer thread running
+
+    An app that logs to a different LOG_FILE than the one before it moves the
+    writer there; the queue, and so its size, is the first app's.
+    """
+    global _handler, _listener, _output
+    with _writer_lock:
+        if _handler is None:
+            _handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+            _handler.addFilter(RequestContextFilter())
+            _listener = QueueListener(_handler.queue, respect_handler_level=True)
+            atexit.register(_stop_writer)
+        if _output is None or _output[0] != log_file:
+            _stop_locked()
+            output = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stderr)
+            output.setFormatter(JsonFormatter())
+            _listener.handlers = (output,)
+            _listener.start()
+            _output = (log_file, output)
+        return _handler
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not app.config['STRUCTURED_LOGGING']:
+        return
+    # Runs last among after_request hooks, so latency covers the other hooks too
+    app.after_request_funcs.setdefault(None, []).insert(0, _make_access_logger(app))
+
+    handler = _start_writer(app.config['LOG_FILE'], app.config['LOG_QUEUE_SIZE'])
+
+    # Route the app logger and everything else through the root logger's queue
+    root = logging.getLogger()
+    if handler not in root.handlers:
+        root.addHandler(handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+    app.logger.removeHandler(default_handler)
@@ -0,0 +1,23 @@
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.user import User
+from src.routes.auth import login_required
+from src.tenancy import current_tenant_id
+from src.delta_sync import sync
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/api/sync', methods=['GET'])
+@login_required
+def get_changes():
+    """Tickets, comments and categories changed since ?token= (a full snapshot without one)
+    
+    Call again with the returned token while has_more is set. When reset is set
+    the answer is a snapshot and the client should replace its local store.
+    """
+    try:
+        user = User.query.get(session['user_id'])
+        return jsonify(sync(user, current_tenant_id(), request.args.get('token'))), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to sync changes')
+        return jsonify({'error': 'Failed to sync changes'}), 500
@@ -0,0 +1,23 @@
+from src.models.user import db
+from src.tenancy import TenantScoped
+from datetime import datetime
+
+class SyncTombstone(TenantScoped, db.Model):
+    """A hard-deleted row that sync clients must drop from their local store
+    
+    Only rows that disappear without trace need one (categories); comments keep
+    their own tombstone in deleted_at. Purged after SYNC_TOMBSTONE_DAYS, so older
+    sync tokens get a full resync (see src/delta_sync.py).
+    """
+    __tablename__ = 'sync_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)  # e.g. 'categories'
+    resource_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (db.Index('ix_sync_tombstones_tenant_deleted', 'tenant_id', 'deleted_at', 'id'),)
+    
+    def __repr__(self):
+        return f'<SyncTombstone {self.resource} {self.resource_id}>'
+
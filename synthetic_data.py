@@ -0,0 +1,229 @@
+"""Synthetic data generator for reproducing production-scale volumes locally.
+
+Rows are written with batched Core inserts (one executemany per batch) instead of
+ORM objects. Used by `flask seed-synthetic` and the API benchmark harness.
+"""
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket, TicketStatus, TicketPriority
+from src.models.category import Category
+from src.models.comment import Comment
+from src.models.vote import Vote
+from src.urgency import backfill_unscored
+from sqlalchemy import bindparam
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import random
+import time
+
+BENCH_PASSWORD = 'password'
+BENCH_ADMIN = 'bench_admin'
+BENCH_AGENT = 'bench_agent'
+BENCH_END_USER = 'bench_user'
+
+WORDS = (
+    'login error password reset account locked invoice billing refund payment card '
+    'printer network vpn wifi slow crash update install license email outlook calendar '
+    'report export dashboard permission access denied timeout server database backup '
+    'laptop monitor keyboard mouse phone mobile app feature request bug screen blank'
+).split()
+
+STATUS_WEIGHTS = {
+    TicketStatus.OPEN: 20,
+    TicketStatus.IN_PROGRESS: 15,
+    TicketStatus.RESOLVED: 25,
+    TicketStatus.CLOSED: 40,
+}
+PRIORITY_WEIGHTS = {
+    TicketPriority.LOW: 30,
+    TicketPriority.MEDIUM: 45,
+    TicketPriority.HIGH: 20,
+    TicketPriority.URGENT: 5,
+}
+
+
+def _sentence(rng, min_words, max_words):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(min_words, max_words))).capitalize()
+
+
+def _insert_batches(table, rows, batch_size, label):
+    """Insert rows from an iterator in executemany batches, committing each one"""
+    started = time.perf_counter()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+    print(f'{label}: {total} rows in {time.perf_counter() - started:.1f}s')
+    return total
+
+
+def _spread(total, buckets, rng, cap=None):
+    """Split total into a skewed count per bucket (a few hot tickets get most rows)"""
+    weights = [rng.paretovariate(1.5) for _ in range(buckets)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    if cap is not None:
+        counts = [min(count, cap) for count in counts]
+    # Hand out what rounding and capping left over, one row at a time
+    shortfall = total - sum(counts)
+    index = 0
+    while shortfall > 0 and index < buckets * 4:
+        bucket = index % buckets
+        if cap is None or counts[bucket] < cap:
+            counts[bucket] += 1
+            shortfall -= 1
+        index += 1
+    return counts
+
+
+def generate(users=10000, tickets=1000000, comments=5000000, votes=10000000,
+             categories=12, agent_ratio=0.05, days=730, batch_size=10000, seed=42):
+    """Bulk-create a realistic dataset; expects an empty schema created by init-db"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    start = now - timedelta(days=days)
+    span = int((now - start).total_seconds())
+
+    def random_time(after=start):
+        offset = rng.randint(0, max(int((now - after).total_seconds()), 1))
+        return after + timedelta(seconds=offset)
+
+    # One hash for everyone; hashing millions of passwords would dominate the run
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    # Refuse to mix with an existing dataset, ids below are assigned positionally
+    if User.query.count() or Ticket.query.count():
+        raise RuntimeError('seed-synthetic needs an empty database (run init-db --no-seed on a new file)')
+
+    sqlite = db.engine.dialect.name == 'sqlite'
+    if sqlite:
+        db.session.execute(db.text('PRAGMA synchronous = OFF'))
+        db.session.execute(db.text('PRAGMA journal_mode = WAL'))
+
+    _insert_batches(Category.__table__, (
+        {
+            'id': i,
+            'name': f'{_sentence(rng, 1, 2)} {i}',
+            'description': _sentence(rng, 4, 10),
+            'color': f'#{rng.randint(0, 0xFFFFFF):06X}',
+            'is_active': True,
+            'created_at': start,
+        }
+        for i in range(1, categories + 1)
+    ), batch_size, 'categories')
+
+    agents = max(int(users * agent_ratio), 2)
+    # Ids 1..agents are agents and the rest requesters; each bench account sits in its
+    # role's range, so the agent gets assigned tickets and the end user owns some
+    fixed = {
+        1: (BENCH_ADMIN, UserRole.ADMIN),
+        2: (BENCH_AGENT, UserRole.SUPPORT_AGENT),
+        agents + 1: (BENCH_END_USER, UserRole.END_USER),
+    }
+
+    def user_rows():
+        for i in range(1, users + 1):
+            if i in fixed:
+                username, role = fixed[i]
+            else:
+                username = f'user{i}'
+                role = UserRole.SUPPORT_AGENT if i <= agents else UserRole.END_USER
+            yield {
+                'id': i,
+                'username': username,
+                'email': f'{username}@example.com',
+                'password_hash': password_hash,
+                'role': role,
+                'created_at': start + timedelta(seconds=rng.randint(0, span)),
+                'is_active': rng.random() > 0.02 or i in fixed,
+            }
+
+    _insert_batches(User.__table__, user_rows(), batch_size, 'users')
+
+    ticket_created = []
+    status_choices, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+    priority_choices, priority_weights = list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values())
+
+    def ticket_rows():
+        for i in range(1, tickets + 1):
+            created_at = random_time()
+            ticket_created.append(created_at)
+            status = rng.choices(status_choices, status_weights)[0]
+            updated_at = random_time(created_at)
+            yield {
+                'id': i,
+                'subject': _sentence(rng, 3, 8),
+                'description': _sentence(rng, 15, 80),
+                'status': status,
+                'priority': rng.choices(priority_choices, priority_weights)[0],
+                'created_at': created_at,
+                'updated_at': updated_at,
+                'resolved_at': updated_at if status in (TicketStatus.RESOLVED, TicketStatus.CLOSED) else None,
+                'attachment_path': None,
+                'user_id': rng.randint(agents + 1, users) if users > agents else 1,
+                'assigned_to': None if status == TicketStatus.OPEN and rng.random() < 0.6 else rng.randint(1, agents),
+                'category_id': rng.randint(1, categories),
+            }
+
+    _insert_batches(Ticket.__table__, ticket_rows(), batch_size, 'tickets')
+
+    comment_counts = _spread(comments, tickets, rng)
+
+    def comment_rows():
+        for index, count in enumerate(comment_counts):
+            ticket_id = index + 1
+            created_at = ticket_created[index]
+            for _ in range(count):
+                created_at = random_time(created_at)
+                is_agent = rng.random() < 0.5
+                yield {
+                    'content': _sentence(rng, 5, 40),
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                    'is_internal': is_agent and rng.random() < 0.1,
+                    'ticket_id': ticket_id,
+                    'user_id': rng.randint(1, agents) if is_agent else rng.randint(1, users),
+                }
+
+    _insert_batches(Comment.__table__, comment_rows(), batch_size, 'comments')
+
+    # Tickets were written before their comments, so fill in the stored counter now
+    # (keeping the generated updated_at)
+    table = Ticket.__table__
+    count_update = table.update().where(table.c.id == bindparam('ticket_id')).values(
+        comment_count=bindparam('count'), updated_at=table.c.updated_at
+    )
+    counted = [{'ticket_id': index + 1, 'count': count} for index, count in enumerate(comment_counts) if count]
+    for start in range(0, len(counted), batch_size):
+        db.session.execute(count_update, counted[start:start + batch_size])
+        db.session.commit()
+
+    # One vote per (ticket, user), so a ticket can't have more votes than users
+    vote_counts = _spread(votes, tickets, rng, cap=users)
+
+    def vote_rows():
+        for index, count in enumerate(vote_counts):
+            for user_id in rng.sample(range(1, users + 1), count):
+                yield {
+                    'is_upvote': rng.random() < 0.8,
+                    'created_at': random_time(ticket_created[index]),
+                    'ticket_id': index + 1,
+                    'user_id': user_id,
+                }
+
+    _insert_batches(Vote.__table__, vote_rows(), batch_size, 'votes')
+
+    # Score closed tickets now, queue active ones for `flask recompute-urgency`
+    backfill_unscored()
+
+    if sqlite:
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
@@ -0,0 +1,262 @@
+"""Tenant isolation.
+
+Every request runs as one tenant. The logged-in user's tenant comes from the
+session; anonymous requests such as login and register name one in an
+X-Tenant header or as the first label of the host name (hr.quickdesk.example),
+and otherwise use the default tenant.
+
+Isolation is enforced centrally rather than per handler:
+
+- Models carrying the TenantScoped mixin get `tenant_id = <current tenant>`
+  added to every ORM SELECT, UPDATE and DELETE through a do_orm_execute hook
+  (with_loader_criteria), joins and subqueries included. New rows take the
+  current tenant as their default.
+- A tenant whose directory row has a database_url is routed to that database
+  by TenantSession.get_bind, so a heavy tenant's load and locks stay out of
+  the shared database. The tenants directory itself always stays in the main
+  database.
+
+Outside a request (CLI jobs, worker threads) nothing is scoped unless a tenant
+is entered with tenant_context(), or TENANT is configured for CLI jobs.
+
+Kept free of model imports so src/models/user.py can build the session from it.
+"""
+from flask import g, current_app, has_app_context, has_request_context, request, session, jsonify
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import Column, Integer, create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, with_loader_criteria
+from contextlib import contextmanager
+from collections import namedtuple
+import threading
+import time
+
+DEFAULT_TENANT_ID = 1
+
+# Tables that live in the main database whatever the current tenant
+DIRECTORY_TABLES = {'tenants'}
+
+TenantInfo = namedtuple('TenantInfo', 'id slug name database_url is_active')
+
+DEFAULT_CONFIG = {
+    # Tenant for CLI jobs run outside a request (e.g. TENANT=hr flask archive-tickets)
+    'TENANT': None,
+    # How long the in-memory copy of the tenants table is trusted
+    'TENANT_DIRECTORY_TTL_SECONDS': 60,
+}
+
+
+class TenantScoped:
+    """Mixin for models whose rows belong to one tenant"""
+    tenant_id = Column(
+        Integer, nullable=False, server_default=str(DEFAULT_TENANT_ID),
+        default=lambda: current_tenant_id() or DEFAULT_TENANT_ID
+    )
+
+
+class TenantSession(FlaskSession):
+    """Routes statements to the current tenant's own database, when it has one"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            engine = g.get('tenant_engine')
+            if engine is not None and not (mapper is not None and mapper.persist_selectable.name in DIRECTORY_TABLES):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class TenantDirectory:
+    """Cached copy of the tenants table plus one engine per dedicated database"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = None
+        self._by_slug = {}
+        self._loaded_at = 0.0
+        self._engines = {}
+        self._engine_callbacks = []
+
+    def invalidate(self):
+        with self._lock:
+            self._by_id = None
+
+    def _load(self):
+        from src.models.user import db
+        ttl = current_app.config['TENANT_DIRECTORY_TTL_SECONDS']
+        with self._lock:
+            if self._by_id is not None and time.monotonic() - self._loaded_at < ttl:
+                return self._by_id, self._by_slug
+        # Read through the main engine directly: no session, so no tenant routing or scoping
+        try:
+            with db.engine.connect() as connection:
+                rows = connection.execute(text(
+                    'SELECT id, slug, name, database_url, is_active FROM tenants'
+                )).all()
+        except DBAPIError:
+            current_app.logger.warning('Tenant directory unavailable, serving the default tenant only')
+            rows = []
+        by_id = {row.id: TenantInfo(*row) for row in rows}
+        with self._lock:
+            self._by_id = by_id
+            self._by_slug = {tenant.slug: tenant for tenant in by_id.values()}
+            self._loaded_at = time.monotonic()
+            return self._by_id, self._by_slug
+
+    def get(self, tenant_id):
+        return self._load()[0].get(tenant_id)
+
+    def find(self, slug):
+        return self._load()[1].get(slug)
+
+    def engine_for(self, tenant):
+        """Engine of a tenant's dedicated database, or None if it uses the main one"""
+        if tenant is None or not tenant.database_url:
+            return None
+        with self._lock:
+            engine = self._engines.get(tenant.database_url)
+            if engine is None:
+                options = current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+                engine = self._engines[tenant.database_url] = create_engine(tenant.database_url, **options)
+                for callback in self._engine_callbacks:
+                    callback(engine)
+            return engine
+
+    def on_engine(self, callback):
+        """Call callback(engine) for every dedicated engine, those already created and each new one"""
+        with self._lock:
+            self._engine_callbacks.append(callback)
+            for engine in self._engines.values():
+                callback(engine)
+
+    def dedicated_engines(self):
+        """(tenant, engine) for every tenant with its own database"""
+        return [
+            (tenant, self.engine_for(tenant))
+            for tenant in self._load()[0].values() if tenant.database_url
+        ]
+
+
+tenant_directory = TenantDirectory()
+
+
+def current_tenant_id():
+    """Id of the tenant the current code runs as; None when unscoped"""
+    if not has_app_context():
+        return None
+    if 'tenant_id' not in g and not has_request_context() and current_app.config.get('TENANT'):
+        slug = current_app.config['TENANT']
+        tenant = tenant_directory.find(slug)
+        if tenant is None:
+            raise LookupError(f'Unknown tenant {slug}')
+        g.tenant_id = tenant.id
+        g.tenant_engine = tenant_directory.engine_for(tenant)
+    return g.get('tenant_id')
+
+
+@contextmanager
+def tenant_context(tenant_id):
+    """Run a block as the given tenant (None for unscoped), restoring the previous one after"""
+    saved = {key: g.pop(key) for key in ('tenant_id', 'tenant_engine') if key in g}
+    g.tenant_id = tenant_id
+    g.tenant_engine = tenant_directory.engine_for(tenant_directory.get(tenant_id)) if tenant_id else None
+    try:
+        yield
+    finally:
+        g.pop('tenant_id', None)
+        g.pop('tenant_engine', None)
+        for key, value in saved.items():
+            setattr(g, key, value)
+
+
+@contextmanager
+def all_tenants():
+    """Lift tenant filtering for a block, e.g. maintenance that folds in every tenant's rows
+
+    Statements still go to the current tenant's database.
+    """
+    previous = g.get('tenant_unscoped', False)
+    g.tenant_unscoped = True
+    try:
+        yield
+    finally:
+        g.tenant_unscoped = previous
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _scope_to_tenant(state):
+    if not (state.is_select or state.is_update or state.is_delete):
+        return
+    # Lazy loads of columns and relationships hang off rows that were already scoped
+    if state.is_column_load or state.is_relationship_load:
+        return
+    if not has_app_context() or g.get('tenant_unscoped'):
+        return
+    tenant_id = current_tenant_id()
+    if tenant_id is None:
+        return
+    state.statement = state.statement.options(with_loader_criteria(
+        TenantScoped, lambda cls: cls.tenant_id == tenant_id, include_aliases=True
+    ))
+
+
+def request_host_slug():
+    """First label of a host name with a subdomain (hr.quickdesk.example -> hr)"""
+    host = request.host.split(':', 1)[0]
+    labels = host.split('.')
+    return labels[0] if len(labels) > 2 else None
+
+
+def resolve_request_tenant():
+    """before_request: pick the tenant for this request and its database"""
+    if 'user_id' in session:
+        # Sessions from before tenants existed belong to the default tenant
+        tenant_id = session.get('tenant_id', DEFAULT_TENANT_ID)
+        tenant = tenant_directory.get(tenant_id)
+    else:
+        slug = request.headers.get('X-Tenant')
+        if slug:
+            tenant = tenant_directory.find(slug)
+            if tenant is None:
+                return jsonify({'error': 'Unknown tenant'}), 404
+        else:
+            host_slug = request_host_slug()
+            tenant = tenant_directory.find(host_slug) if host_slug else None
+            if tenant is None:
+                tenant = tenant_directory.get(DEFAULT_TENANT_ID)
+        tenant_id = tenant.id if tenant else DEFAULT_TENANT_ID
+
+    if tenant is not None and not tenant.is_active:
+        session.clear()
+        return jsonify({'error': 'Tenant is deactivated'}), 403
+
+    g.tenant_id = tenant_id
+    g.tenant_engine = tenant_directory.engine_for(tenant)
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.before_request(resolve_request_tenant)
+
+
+class PerTenant:
+    """One instance of an in-process service per tenant, chosen by the tenant the caller runs as"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._factory().init_app(app)
+
+    def current(self):
+        tenant_id = current_tenant_id() or DEFAULT_TENANT_ID
+        with self._lock:
+            instance = self._instances.get(tenant_id)
+            if instance is None:
+                instance = self._instances[tenant_id] = self._factory()
+            return instance
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
@@ -0,0 +1,27 @@
+from src.models.user import db
+from datetime import datetime
+
+class Tenant(db.Model):
+    """A department with its own users, categories and tickets, see src/tenancy.py"""
+    __tablename__ = 'tenants'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, nullable=False)  # X-Tenant header value / subdomain
+    name = db.Column(db.String(100), nullable=False)
+    database_url = db.Column(db.String(500), nullable=True)  # Dedicated database; None shares the main one
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert tenant to dictionary"""
+        return {
+            'id': self.id,
+            'slug': self.slug,
+            'name': self.name,
+            'dedicated_database': self.database_url is not None,
+            'is_active': self.is_active,
+            'created_at': self.created_at
+        }
+    
+    def __repr__(self):
+        return f'<Tenant {self.slug}>'
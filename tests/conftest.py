@@ -0,0 +1,79 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from datetime import datetime, timedelta
+from src.main import create_app
+from src.cli import init_db
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket, TicketStatus, TicketPriority
+from src.models.category import Category
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'Secret123!'
+# Hashed once; hashing per user would dominate the suite
+PASSWORD_HASH = generate_password_hash(PASSWORD)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App on a fresh SQLite file with the schema and default categories, inside an app context"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'STRUCTURED_LOGGING': False,
+        'AUTO_ASSIGN_TICKETS': False,
+        'ATTACHMENT_SCAN_IN_PROCESS': False,
+        'ATTACHMENT_QUARANTINE_DIR': str(tmp_path / 'quarantine'),
+        'SCHEDULER_BATCH_PAUSE_SECONDS': 0,
+    })
+    app.static_folder = str(tmp_path / 'static')
+    os.makedirs(os.path.join(app.static_folder, 'uploads'))
+    with app.app_context():
+        init_db()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(username, role=UserRole.END_USER):
+        user = User(username=username, email=f'{username}@example.com', role=role, password_hash=PASSWORD_HASH)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_ticket(app, make_user):
+    """Ticket created by a fresh end user; age sets created_at and updated_at that far back"""
+    counter = iter(range(1, 1000000))
+
+    def make_ticket(status=TicketStatus.OPEN, age=timedelta(0), **fields):
+        if 'user_id' not in fields:
+            fields['user_id'] = make_user(f'requester{next(counter)}').id
+        fields.setdefault('category_id', db.session.scalar(db.select(Category.id).order_by(Category.id)))
+        at = datetime.utcnow() - age
+        ticket = Ticket(
+            subject='Printer offline', description='The printer on floor 2 is offline',
+            status=status, priority=TicketPriority.MEDIUM, created_at=at, updated_at=at, **fields
+        )
+        db.session.add(ticket)
+        db.session.commit()
+        return ticket
+    return make_ticket
+
+
+@pytest.fixture
+def login(app):
+    """Test client with user's session"""
+    def login(user):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user.id
+            session['user_role'] = user.role.value
+            session['tenant_id'] = user.tenant_id
+        return client
+    return login
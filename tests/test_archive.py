@@ -0,0 +1,51 @@
+from datetime import timedelta
+from src.models.user import db, UserRole
+from src.models.ticket import TicketStatus
+from src.models.comment import Comment
+from src.models.comment_revision import CommentRevision
+from src.models.archived_ticket import ArchivedCommentRevision
+from src.archive import archive_closed_tickets
+from src.comments import edit_comment
+
+
+def test_comment_history_is_archived_with_its_comments(make_ticket, make_user, login):
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    ticket = make_ticket(TicketStatus.CLOSED, age=timedelta(days=90))
+    comment = Comment(content='Rebooted it', ticket_id=ticket.id, user_id=agent.id)
+    db.session.add(comment)
+    db.session.commit()
+    edit_comment(comment, 'Rebooted it, works now', agent.id)
+    db.session.commit()
+    # The newest ticket and comment always stay live
+    newest = make_ticket()
+    db.session.add(Comment(content='Looking into it', ticket_id=newest.id, user_id=agent.id))
+    db.session.commit()
+    ticket_id, comment_id = ticket.id, comment.id
+
+    assert archive_closed_tickets(30) == 1
+    assert CommentRevision.query.count() == 0
+
+    response = login(agent).get(f'/api/tickets/{ticket_id}/comments/{comment_id}/revisions')
+    assert response.status_code == 200
+    assert [version['content'] for version in response.get_json()['revisions']] == ['Rebooted it']
+
+
+def test_history_left_behind_by_earlier_runs_is_moved(make_ticket, make_user):
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    ticket = make_ticket(TicketStatus.CLOSED, age=timedelta(days=90))
+    comment = Comment(content='Rebooted it', ticket_id=ticket.id, user_id=agent.id)
+    db.session.add(comment)
+    newest = make_ticket()
+    db.session.add(Comment(content='Looking into it', ticket_id=newest.id, user_id=agent.id))
+    db.session.commit()
+    comment_id = comment.id
+    assert archive_closed_tickets(30) == 1
+
+    stranded = CommentRevision(comment_id=comment_id, revision=1, edited_by=agent.id)
+    stranded.operations = []
+    db.session.add(stranded)
+    db.session.commit()
+
+    assert archive_closed_tickets(30) == 0
+    assert CommentRevision.query.count() == 0
+    assert ArchivedCommentRevision.query.filter_by(comment_id=comment_id).count() == 1
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from src.models.user import db, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.tenancy import DEFAULT_TENANT_ID
+from src.urgency import recompute_due
+from src.delta_sync import sync, decode_token
+
+
+def test_tickets_stream_follows_writes_that_keep_updated_at(app, make_ticket, make_user, login):
+    app.config['SYNC_OVERLAP_SECONDS'] = 0
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    active = make_ticket(
+        TicketStatus.IN_PROGRESS, age=timedelta(days=2),
+        urgency_recompute_at=datetime.utcnow() - timedelta(minutes=1)
+    )
+    closed = make_ticket(TicketStatus.CLOSED, age=timedelta(days=2))
+    updated_at = {ticket.id: ticket.updated_at for ticket in (active, closed)}
+
+    snapshot = sync(agent, DEFAULT_TENANT_ID)
+    assert {ticket['id'] for ticket in snapshot['tickets']} == {active.id, closed.id}
+    caught_up = sync(agent, DEFAULT_TENANT_ID, snapshot['token'])
+    assert caught_up['tickets'] == [] and not caught_up['reset']
+
+    # A rescore and a vote on a closed ticket both change what the client holds
+    recompute_due()
+    voter = login(make_user('voter'))
+    assert voter.post(f'/api/tickets/{closed.id}/vote', json={'is_upvote': True}).status_code in (200, 201)
+
+    changes = sync(agent, DEFAULT_TENANT_ID, caught_up['token'])
+    tickets = {ticket['id']: ticket for ticket in changes['tickets']}
+    assert set(tickets) == {active.id, closed.id}
+    assert tickets[active.id]['urgency_score'] is not None
+    assert tickets[closed.id]['upvotes'] == 1
+
+    db.session.expire_all()
+    for ticket_id, at in updated_at.items():
+        assert db.session.get(Ticket, ticket_id).updated_at == at
+
+
+def test_paging_never_moves_past_the_overlap_horizon(app, make_ticket, make_user):
+    app.config.update(SYNC_PAGE_SIZE=2, SYNC_OVERLAP_SECONDS=30)
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    recent = [make_ticket() for _ in range(3)]
+    now = datetime.utcnow()
+
+    first = sync(agent, DEFAULT_TENANT_ID, now=now)
+    assert len(first['tickets']) == 2 and first['has_more']
+    position = decode_token(first['token'], agent, DEFAULT_TENANT_ID, now)['tickets']
+    assert position <= (now - timedelta(seconds=30), 0)
+
+    # A slow transaction commits a change older than the page the client just got
+    late = make_ticket(changed_at=now - timedelta(seconds=10))
+    second = sync(agent, DEFAULT_TENANT_ID, first['token'], now=now)
+    assert late.id in {ticket['id'] for ticket in second['tickets']}
+    # The page started at the horizon and couldn't move it: no point calling straight back
+    assert not second['has_more']
+
+    # Once the burst is older than the horizon, paging goes through the rest
+    later = now + timedelta(seconds=31)
+    seen, token, has_more = set(), second['token'], True
+    while has_more:
+        result = sync(agent, DEFAULT_TENANT_ID, token, now=later)
+        seen.update(ticket['id'] for ticket in result['tickets'])
+        token, has_more = result['token'], result['has_more']
+    assert seen == {ticket.id for ticket in recent} | {late.id}
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from src.models.user import db, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.models.comment import Comment
+from src.models.category import Category
+from src.models.tenant import Tenant
+from src.models.ticket_metric import TicketMetric
+from src.history import rebuild_metrics, record_resolution
+from src.tenancy import DEFAULT_TENANT_ID, tenant_directory, tenant_context, all_tenants
+
+
+def test_rebuild_metrics_backfills_first_response_and_keeps_updated_at(make_ticket, make_user):
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    ticket = make_ticket(TicketStatus.IN_PROGRESS, age=timedelta(days=4), assigned_to=agent.id)
+    updated_at = ticket.updated_at
+    replied_at = updated_at + timedelta(hours=1)
+    # Inserted directly, like a reply from before first responses were recorded
+    db.session.execute(db.insert(Comment).values(
+        content='Looking into it', ticket_id=ticket.id, user_id=agent.id, is_internal=False,
+        created_at=replied_at, updated_at=replied_at
+    ))
+    db.session.commit()
+
+    rebuild_metrics()
+
+    db.session.expire_all()
+    ticket = db.session.get(Ticket, ticket.id)
+    assert ticket.first_response_at == replied_at
+    assert ticket.updated_at == updated_at
+
+
+def test_metrics_are_kept_per_tenant(make_ticket, make_user, login):
+    other = Tenant(slug='hr', name='HR')
+    db.session.add(other)
+    db.session.commit()
+    tenant_directory.invalidate()
+
+    agents = {}
+    for tenant_id in (DEFAULT_TENANT_ID, other.id):
+        with tenant_context(tenant_id):
+            category = Category(name='Payroll')
+            db.session.add(category)
+            db.session.commit()
+            agents[tenant_id] = agent = make_user(f'agent{tenant_id}', UserRole.SUPPORT_AGENT)
+            ticket = make_ticket(
+                TicketStatus.RESOLVED, age=timedelta(days=2), assigned_to=agent.id, category_id=category.id
+            )
+            ticket.resolved_at = ticket.created_at + timedelta(hours=3)
+            record_resolution(ticket)
+            db.session.commit()
+
+    # Rebuilding one tenant's totals leaves the other tenant's rows alone
+    with tenant_context(DEFAULT_TENANT_ID):
+        assert rebuild_metrics() == 2
+    with all_tenants():
+        rows = TicketMetric.query.all()
+    assert sorted((row.tenant_id, row.scope, row.resolved_count) for row in rows) == [
+        (DEFAULT_TENANT_ID, 'agent', 1), (DEFAULT_TENANT_ID, 'category', 1),
+        (other.id, 'agent', 1), (other.id, 'category', 1),
+    ]
+
+    response = login(agents[other.id]).get('/api/tickets/performance')
+    assert response.status_code == 200
+    assert [agent['name'] for agent in response.get_json()['agents']] == [f'agent{other.id}']
+    assert [category['name'] for category in response.get_json()['categories']] == ['Payroll']
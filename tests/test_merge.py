@@ -0,0 +1,39 @@
+from datetime import timedelta
+from src.models.user import db, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.models.category import Category
+from src.models.ticket_event import TicketEvent, TicketEventType
+
+
+def test_merge_guards(make_ticket, make_user, login):
+    agent = login(make_user('agent', UserRole.SUPPORT_AGENT))
+    canonical = make_ticket()
+    ticket = make_ticket()
+    closed = make_ticket(TicketStatus.CLOSED)
+    other_category = db.session.scalars(db.select(Category.id).order_by(Category.id.desc())).first()
+    elsewhere = make_ticket(category_id=other_category)
+
+    def merge(ticket_id, into):
+        return agent.post(f'/api/tickets/{ticket_id}/merge', json={'into': into}).status_code
+
+    assert merge(ticket.id, closed.id) == 400
+    assert merge(ticket.id, elsewhere.id) == 400
+    assert merge(ticket.id, canonical.id) == 200
+    # Already merged: merging again would move votes twice and overwrite duplicate_of
+    assert merge(ticket.id, make_ticket().id) == 400
+    assert merge(make_ticket().id, ticket.id) == 400
+
+
+def test_merging_a_canonical_repoints_its_duplicates(make_ticket, make_user, login):
+    agent = login(make_user('agent', UserRole.SUPPORT_AGENT))
+    first, second, target = make_ticket(), make_ticket(), make_ticket()
+    assert agent.post(f'/api/tickets/{first.id}/merge', json={'into': second.id}).status_code == 200
+    assert agent.post(f'/api/tickets/{second.id}/merge', json={'into': target.id}).status_code == 200
+
+    db.session.expire_all()
+    assert db.session.get(Ticket, first.id).duplicate_of == target.id
+    assert db.session.get(Ticket, second.id).duplicate_of == target.id
+    event = TicketEvent.query.filter_by(ticket_id=first.id, event_type=TicketEventType.MERGED).order_by(
+        TicketEvent.id.desc()
+    ).first()
+    assert (event.old_value, event.new_value) == (str(second.id), str(target.id))
@@ -0,0 +1,135 @@
+"""The compiled policy against the permission checks the handlers made before it.
+
+Every expectation is a role check as the handlers in tickets.py and users.py
+wrote it in the baseline tree; rules added since carry the request that
+introduced them. Each (action, actor) pair is checked over every row of the
+kind the action applies to, both with policy.allows on the row and with
+policy.condition pushed into a SELECT.
+"""
+import pytest
+from sqlalchemy import select
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket
+from src.models.comment import Comment
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.history import record_event
+from src.notifications import NOTIFY_COLUMNS
+from src import policy
+
+AGENTS = (UserRole.SUPPORT_AGENT, UserRole.ADMIN)
+
+ACTORS = {
+    'requester': UserRole.END_USER,
+    'other_user': UserRole.END_USER,
+    'agent': UserRole.SUPPORT_AGENT,
+    'other_agent': UserRole.SUPPORT_AGENT,
+    'admin': UserRole.ADMIN,
+}
+
+# Baseline handler checks, per action
+BASELINE = {
+    # get_tickets: end users filter to their own tickets only while my_tickets=true
+    'ticket.list': lambda user, ticket: True,
+    # get_ticket, update_ticket, add_comment
+    'ticket.view': lambda user, ticket: not (user.role == UserRole.END_USER and ticket['user_id'] != user.id),
+    'ticket.update': lambda user, ticket: not (user.role == UserRole.END_USER and ticket['user_id'] != user.id),
+    'ticket.comment': lambda user, ticket: not (user.role == UserRole.END_USER and ticket['user_id'] != user.id),
+    # update_ticket: 'priority' in data and (ticket.user_id == user.id or user.role in [...])
+    'ticket.prioritize': lambda user, ticket: ticket['user_id'] == user.id or user.role in AGENTS,
+    # update_ticket's status/assignment block and add_comment's is_internal
+    'ticket.triage': lambda user, ticket: user.role in AGENTS,
+    # get_user, update_user
+    'user.view': lambda user, target: not (user.role == UserRole.END_USER and target['id'] != user.id),
+    'user.update': lambda user, target: not (user.role == UserRole.END_USER and target['id'] != user.id),
+    # update_user's role/is_active block, deactivate_user, activate_user
+    'user.manage': lambda user, target: user.role == UserRole.ADMIN,
+}
+
+# Checks introduced after the baseline: action -> (request that added it, check as first written)
+ADDED = {
+    # notifications.is_visible, less its own-changes rule (applied outside the policy)
+    'ticket.notify': ('user-039', lambda user, event: (
+        user.role == UserRole.ADMIN
+        or user.id in (event['user_id'], event['assigned_to'])
+        or (user.role == UserRole.SUPPORT_AGENT and event['assigned_to'] is None
+            and event['event_type'] == TicketEventType.CREATED)
+    )),
+    # get_comment_revisions: internal notes stay hidden from end users
+    'comment.view': ('user-047', lambda user, comment: not (comment['is_internal'] and user.role == UserRole.END_USER)),
+    # _editable_comment: authors manage their own comments; admins can manage any
+    'comment.edit': ('user-047', lambda user, comment: comment['user_id'] == user.id or user.role == UserRole.ADMIN),
+    'comment.delete': ('user-047', lambda user, comment: comment['user_id'] == user.id or user.role == UserRole.ADMIN),
+}
+
+# (key column, {rule column name: expression}, joins) per kind of row an action applies to
+SOURCES = {
+    'ticket': (Ticket.id, {'user_id': Ticket.user_id, 'assigned_to': Ticket.assigned_to}, ()),
+    'user': (User.id, {'id': User.id}, ()),
+    'comment': (Comment.id, {'user_id': Comment.user_id, 'is_internal': Comment.is_internal}, ()),
+    'event': (TicketEvent.id, NOTIFY_COLUMNS, ((Ticket, Ticket.id == TicketEvent.ticket_id),)),
+}
+
+
+@pytest.fixture
+def actors(make_user, make_ticket):
+    """One user per actor and a few rows owned by or assigned to them"""
+    users = {name: make_user(name, role) for name, role in ACTORS.items()}
+    requester_ticket = make_ticket(user_id=users['requester'].id, assigned_to=users['agent'].id)
+    other_ticket = make_ticket(user_id=users['other_user'].id)
+    agent_ticket = make_ticket(user_id=users['agent'].id, assigned_to=users['other_agent'].id)
+    for ticket, author, is_internal in (
+        (requester_ticket, 'requester', False), (requester_ticket, 'agent', False),
+        (requester_ticket, 'agent', True), (requester_ticket, 'admin', False),
+        (other_ticket, 'other_user', False), (agent_ticket, 'other_agent', True),
+    ):
+        db.session.add(Comment(
+            content='Any update?', ticket_id=ticket.id, user_id=users[author].id, is_internal=is_internal
+        ))
+    for ticket in (requester_ticket, other_ticket, agent_ticket):
+        record_event(ticket.id, TicketEventType.CREATED, ticket.user_id)
+        record_event(ticket.id, TicketEventType.COMMENTED, users['admin'].id)
+    db.session.commit()
+    return users
+
+
+def source_of(action):
+    return 'event' if action == 'ticket.notify' else action.split('.')[0]
+
+
+def assert_matches(action, user, expected):
+    """allows and condition both agree with expected(user, row) on every row of the action's kind"""
+    key, columns, joins = SOURCES[source_of(action)]
+    rows_query = select(key.label('_key'), *[column.label(name) for name, column in columns.items()])
+    allowed_query = select(key).where(policy.condition(user, action, columns))
+    for target, on in joins:
+        rows_query, allowed_query = rows_query.join(target, on), allowed_query.join(target, on)
+    rows = [row._asdict() for row in db.session.execute(rows_query)]
+    in_sql = set(db.session.scalars(allowed_query))
+    assert rows
+
+    for row in rows:
+        answers = (policy.allows(user, action, row), row['_key'] in in_sql)
+        assert answers == (expected(user, row),) * 2, f'{action} for {user.username} on row {row["_key"]}'
+    # Without a target: whether the role may act on any row (every actor owns or is some row)
+    assert policy.allows(user, action) == any(expected(user, row) for row in rows)
+
+
+@pytest.mark.parametrize('actor', ACTORS)
+@pytest.mark.parametrize('action', sorted(BASELINE))
+def test_rules_match_baseline_checks(actors, action, actor):
+    assert_matches(action, actors[actor], BASELINE[action])
+
+
+def test_unknown_action(actors):
+    with pytest.raises(ValueError):
+        policy.allows(actors['admin'], 'ticket.explode')
+
+
+@pytest.mark.parametrize('actor', ACTORS)
+@pytest.mark.parametrize('action', sorted(ADDED), ids=lambda action: f'{action}-{ADDED[action][0]}')
+def test_rules_match_added_checks(actors, action, actor):
+    assert_matches(action, actors[actor], ADDED[action][1])
+
+
+def test_every_rule_is_checked():
+    assert set(policy.RULES) == set(BASELINE) | set(ADDED)
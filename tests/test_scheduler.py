@@ -0,0 +1,110 @@
+import os
+import time
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus, TicketPriority
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.models.attachment import Attachment, AttachmentStatus
+from src.scheduler import close_resolved, flag_stale, purge_orphan_uploads
+from src.urgency import mark_for_recompute, recompute_due
+
+
+def reload(ticket):
+    db.session.expire_all()
+    return db.session.get(Ticket, ticket.id)
+
+
+def test_close_resolved_closes_quiet_tickets_without_an_actor(make_ticket):
+    quiet = make_ticket(TicketStatus.RESOLVED, age=timedelta(days=10))
+    recent = make_ticket(TicketStatus.RESOLVED, age=timedelta(days=2))
+    open_ticket = make_ticket(TicketStatus.OPEN, age=timedelta(days=10))
+
+    assert close_resolved() == 1
+
+    assert reload(quiet).status == TicketStatus.CLOSED
+    assert reload(recent).status == TicketStatus.RESOLVED
+    assert reload(open_ticket).status == TicketStatus.OPEN
+    event = TicketEvent.query.filter_by(ticket_id=quiet.id).one()
+    assert event.event_type == TicketEventType.STATUS_CHANGED
+    assert event.actor_id is None
+    assert (event.old_value, event.new_value) == ('resolved', 'closed')
+
+
+def test_sweeps_pause_between_full_batches(app, make_ticket, monkeypatch):
+    app.config.update(SCHEDULER_BATCH_SIZE=2, SCHEDULER_BATCH_PAUSE_SECONDS=0.5)
+    pauses = []
+    monkeypatch.setattr(time, 'sleep', pauses.append)
+    for _ in range(5):
+        make_ticket(TicketStatus.RESOLVED, age=timedelta(days=10))
+
+    assert close_resolved() == 5
+    # Batches of 2, 2 and 1: a short batch means the sweep is done
+    assert pauses == [0.5, 0.5]
+    assert TicketEvent.query.count() == 5
+
+
+def test_stale_flag_survives_rescoring(make_ticket):
+    ticket = make_ticket(
+        TicketStatus.IN_PROGRESS, age=timedelta(days=5),
+        urgency_recompute_at=datetime.utcnow() - timedelta(minutes=1)
+    )
+    updated_at = ticket.updated_at
+
+    # The hourly rescore must not make a quiet ticket look recently changed
+    recompute_due()
+    assert flag_stale() == {'flagged': 1, 'cleared': 0}
+    mark_for_recompute(Ticket.id == ticket.id)
+    db.session.commit()
+    recompute_due(now=datetime.utcnow() + timedelta(seconds=1))
+    assert flag_stale() == {'flagged': 0, 'cleared': 0}
+
+    ticket = reload(ticket)
+    assert ticket.stale
+    assert ticket.updated_at == updated_at
+
+
+def test_flag_stale_clears_lapsed_flags(make_ticket):
+    changed = make_ticket(TicketStatus.IN_PROGRESS, age=timedelta(days=5))
+    resolved = make_ticket(TicketStatus.IN_PROGRESS, age=timedelta(days=5))
+    still_quiet = make_ticket(TicketStatus.IN_PROGRESS, age=timedelta(days=5))
+    assert flag_stale()['flagged'] == 3
+
+    changed.priority = TicketPriority.HIGH
+    resolved.status = TicketStatus.RESOLVED
+    db.session.commit()
+    assert not reload(changed).stale
+
+    assert flag_stale() == {'flagged': 0, 'cleared': 2}
+    assert reload(changed).stale_since is None
+    assert reload(resolved).stale_since is None
+    assert reload(still_quiet).stale
+
+
+def test_purge_orphan_uploads_respects_age_and_references(app, make_ticket):
+    app.config['ORPHAN_UPLOAD_HOURS'] = 24
+    quarantine = app.config['ATTACHMENT_QUARANTINE_DIR']
+    uploads = os.path.join(app.static_folder, 'uploads')
+    os.makedirs(quarantine, exist_ok=True)
+
+    def upload(directory, name, hours_old):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(b'data')
+        at = time.time() - hours_old * 3600
+        os.utime(path, (at, at))
+        return path
+
+    old_orphan = upload(uploads, 'old-orphan.png', 48)
+    old_staged = upload(quarantine, 'old-orphan.bin', 48)
+    fresh_orphan = upload(uploads, 'fresh.png', 1)
+    on_ticket = upload(uploads, 'on-ticket.png', 48)
+    pending = upload(quarantine, 'pending.bin', 48)
+    make_ticket(attachment_path='/static/uploads/on-ticket.png')
+    db.session.add(Attachment(
+        original_name='log.txt', staged_name='pending.bin', size=4, status=AttachmentStatus.PENDING
+    ))
+    db.session.commit()
+
+    assert purge_orphan_uploads() == 2
+    assert not os.path.exists(old_orphan) and not os.path.exists(old_staged)
+    assert all(os.path.exists(path) for path in (fresh_orphan, on_ticket, pending))
@@ -0,0 +1,24 @@
+import logging
+import threading
+from src.main import create_app
+from src import structured_logging
+from src.structured_logging import NonBlockingQueueHandler
+
+
+def queue_handlers():
+    return [handler for handler in logging.getLogger().handlers if isinstance(handler, NonBlockingQueueHandler)]
+
+
+def test_init_app_shares_one_writer_per_process(tmp_path):
+    threads = threading.active_count()
+    for _ in range(3):
+        create_app({'STRUCTURED_LOGGING': True, 'LOG_FILE': None})
+    assert len(queue_handlers()) == 1
+    assert threading.active_count() <= threads
+
+    log_file = tmp_path / 'app.log'
+    create_app({'STRUCTURED_LOGGING': True, 'LOG_FILE': str(log_file)})
+    assert len(queue_handlers()) == 1
+    logging.getLogger('quickdesk.test').warning('moved')
+    structured_logging._stop_writer()
+    assert '"message":"moved"' in log_file.read_text().replace(' ', '')
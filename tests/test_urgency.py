@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from src.models.user import db, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.urgency import mark_for_recompute, recompute_due, INACTIVE_SCORE
+
+
+def reload(ticket):
+    db.session.expire_all()
+    return db.session.get(Ticket, ticket.id)
+
+
+def test_recompute_keeps_updated_at(make_ticket):
+    ticket = make_ticket(
+        TicketStatus.IN_PROGRESS, age=timedelta(days=5),
+        urgency_recompute_at=datetime.utcnow() - timedelta(minutes=1)
+    )
+    updated_at = ticket.updated_at
+
+    assert recompute_due() == 1
+    ticket = reload(ticket)
+    assert ticket.urgency_score is not None and ticket.urgency_score != INACTIVE_SCORE
+    assert ticket.urgency_recompute_at > datetime.utcnow()
+    assert ticket.updated_at == updated_at
+
+
+def test_mark_for_recompute_keeps_updated_at(make_ticket):
+    active = make_ticket(TicketStatus.OPEN, age=timedelta(days=2))
+    closed = make_ticket(TicketStatus.CLOSED, age=timedelta(days=2))
+    updated_at = active.updated_at
+
+    mark_for_recompute(Ticket.id.in_([active.id, closed.id]))
+    db.session.commit()
+
+    active, closed = reload(active), reload(closed)
+    assert active.urgency_recompute_at is not None
+    assert closed.urgency_recompute_at is None
+    assert active.updated_at == updated_at
+
+
+def test_votes_keep_updated_at(make_ticket, make_user, login):
+    ticket = make_ticket(TicketStatus.OPEN, age=timedelta(days=2))
+    updated_at = ticket.updated_at
+    client = login(make_user('voter', UserRole.END_USER))
+
+    response = client.post(f'/api/tickets/{ticket.id}/vote', json={'is_upvote': True})
+    assert response.status_code in (200, 201)
+    assert reload(ticket).updated_at == updated_at
+
+    assert client.delete(f'/api/tickets/{ticket.id}/vote').status_code == 200
+    ticket = reload(ticket)
+    assert ticket.updated_at == updated_at
+    assert ticket.urgency_recompute_at is not None
@@ -0,0 +1,16 @@
+from datetime import timedelta
+from src.models.user import UserRole
+from src.models.ticket import TicketStatus
+from src.workload import agent_workload
+
+
+def test_oldest_open_age_counts_in_progress_tickets(make_ticket, make_user):
+    agent = make_user('agent', UserRole.SUPPORT_AGENT)
+    oldest = make_ticket(TicketStatus.IN_PROGRESS, age=timedelta(days=10), assigned_to=agent.id)
+    make_ticket(TicketStatus.OPEN, age=timedelta(days=2), assigned_to=agent.id)
+    make_ticket(TicketStatus.RESOLVED, age=timedelta(days=30), assigned_to=agent.id)
+
+    workload = next(entry['workload'] for entry in agent_workload.agents() if entry['id'] == agent.id)
+    assert workload['open'] == 1 and workload['in_progress'] == 1
+    assert workload['oldest_open_at'] == oldest.created_at
+    assert workload['oldest_open_age_seconds'] >= 10 * 86400 - 1
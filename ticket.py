@@ -1,4 +1,7 @@
 from src.models.user import db
+from src.models.attachment import AttachmentStatus
+from src.tenancy import TenantScoped
+from sqlalchemy.orm import load_only, joinedload, query_expression, with_expression
 from datetime import datetime
 from enum import Enum
 
@@ -14,27 +17,77 @@ class TicketPriority(Enum):
     HIGH = "high"
     URGENT = "urgent"
 
-class Ticket(db.Model):
-    __tablename__ = 'tickets'
+# Fraction of the SLA window after which an active ticket is flagged as at risk
+SLA_WARNING_FRACTION = 0.75
+
+# Fields that map directly to columns on the tickets table
+TICKET_COLUMNS = (
+    'id', 'subject', 'description', 'status', 'priority', 'created_at', 'updated_at',
+    'resolved_at', 'attachment_path', 'attachment_status', 'user_id', 'assigned_to', 'category_id',
+    'urgency_score', 'sla_due_at', 'duplicate_of', 'first_response_at', 'comment_count'
+)
+# Fields computed with an extra COUNT query per ticket
+TICKET_COUNTS = ('upvotes', 'downvotes')
+# Fields derived in Python from other columns
+TICKET_DERIVED = {
+    'sla_status': ('status', 'created_at', 'sla_due_at'),
+    'stale': ('status', 'updated_at', 'stale_since'),
+}
+TICKET_FIELDS = TICKET_COLUMNS + TICKET_COUNTS + tuple(TICKET_DERIVED)
+
+# Embeddable relationships and the foreign key each one needs
+TICKET_EXPANSIONS = {
+    'creator': 'user_id',
+    'assignee': 'assigned_to',
+    'category': 'category_id',
+}
+
+def sla_status(status, created_at, sla_due_at, now=None):
+    """SLA state of an active ticket: ok, warning or breached (None when not tracked)"""
+    if sla_due_at is None or status not in (TicketStatus.OPEN, TicketStatus.IN_PROGRESS):
+        return None
     
-    id = db.Column(db.Integer, primary_key=True)
-    subject = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    status = db.Column(db.Enum(TicketStatus), nullable=False, default=TicketStatus.OPEN)
-    priority = db.Column(db.Enum(TicketPriority), nullable=False, default=TicketPriority.MEDIUM)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    resolved_at = db.Column(db.DateTime, nullable=True)
-    attachment_path = db.Column(db.String(500), nullable=True)
+    now = now or datetime.utcnow()
+    if now >= sla_due_at:
+        return 'breached'
     
-    # Foreign Keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    window = (sla_due_at - created_at).total_seconds()
+    if window > 0 and (now - created_at).total_seconds() / window >= SLA_WARNING_FRACTION:
+        return 'warning'
+    return 'ok'
+
+def is_stale(status, updated_at, stale_since):
+    """Whether an in-progress ticket was flagged by the stale sweep and hasn't changed since"""
+    return status == TicketStatus.IN_PROGRESS and stale_since is not None and updated_at <= stale_since
+
+class TicketMixin:
+    """Loading and serialization shared by live and archived tickets"""
     
-    # Relationships
-    comments = db.relationship('Comment', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
-    votes = db.relationship('Vote', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
+    @classmethod
+    def load_options(cls, fields=None, expand=None, description_length=None):
+        """Build loader options that fetch only the requested columns and relationships"""
+        fields = TICKET_FIELDS if fields is None else fields
+        expand = TICKET_EXPANSIONS if expand is None else expand
+        
+        # id and user_id are always needed for identity and permission checks
+        columns = {'id', 'user_id'}
+        columns.update(field for field in fields if field in TICKET_COLUMNS)
+        for field in fields:
+            columns.update(TICKET_DERIVED.get(field, ()))
+        columns.update(TICKET_EXPANSIONS[name] for name in expand)
+        
+        options = []
+        if description_length is not None and 'description' in columns:
+            # Load one extra character so to_dict can tell whether it was cut
+            columns.discard('description')
+            options.append(with_expression(
+                cls.description_preview,
+                db.func.substr(cls.description, 1, description_length + 1)
+            ))
+        
+        options.append(load_only(*[getattr(cls, column) for column in sorted(columns)]))
+        options.extend(joinedload(getattr(cls, name)) for name in expand)
+        return options
     
     @property
     def upvotes(self):
@@ -47,37 +100,107 @@ class Ticket(db.Model):
         return self.votes.filter_by(is_upvote=False).count()
     
     @property
-    def comment_count(self):
-        """Get number of comments"""
-        return self.comments.count()
+    def sla_status(self):
+        """SLA state of an active ticket: ok, warning or breached"""
+        return sla_status(self.status, self.created_at, self.sla_due_at)
     
-    def to_dict(self, include_comments=False):
-        """Convert ticket to dictionary"""
-        result = {
-            'id': self.id,
-            'subject': self.subject,
-            'description': self.description,
-            'status': self.status.value,
-            'priority': self.priority.value,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
-            'attachment_path': self.attachment_path,
-            'user_id': self.user_id,
-            'assigned_to': self.assigned_to,
-            'category_id': self.category_id,
-            'upvotes': self.upvotes,
-            'downvotes': self.downvotes,
-            'comment_count': self.comment_count,
-            'creator': self.creator.to_dict() if self.creator else None,
-            'assignee': self.assignee.to_dict() if self.assignee else None,
-            'category': self.category.to_dict() if self.category else None
-        }
+    @property
+    def stale(self):
+        """In progress with no change since the stale sweep flagged it"""
+        return is_stale(self.status, self.updated_at, self.stale_since)
+    
+    def to_dict(self, include_comments=False, fields=None, expand=None, description_length=None):
+        """Convert ticket to dictionary
+        
+        fields and expand restrict the output to the given attributes and embedded
+        relationships; when either is given the embedded category omits its ticket
+        count. description_length truncates the description for list views.
+        """
+        sparse = fields is not None or expand is not None
+        fields = TICKET_FIELDS if fields is None else fields
+        expand = TICKET_EXPANSIONS if expand is None else expand
+        
+        result = {field: getattr(self, field) for field in fields if field != 'description'}
+        
+        if 'description' in fields:
+            if description_length is None:
+                result['description'] = self.description
+            else:
+                preview = self.description_preview
+                if preview is None:
+                    preview = self.description[:description_length + 1]
+                result['description'] = preview[:description_length]
+                result['description_truncated'] = len(preview) > description_length
+        
+        if 'creator' in expand:
+            result['creator'] = self.creator.to_dict() if self.creator else None
+        if 'assignee' in expand:
+            result['assignee'] = self.assignee.to_dict() if self.assignee else None
+        if 'category' in expand:
+            result['category'] = self.category.to_dict(include_ticket_count=not sparse) if self.category else None
         
         if include_comments:
-            result['comments'] = [comment.to_dict() for comment in self.comments.order_by('created_at')]
+            # Tombstoned comments stay out of threads (deleted_at IS NULL, see Comment.live)
+            live = self.comments.filter_by(deleted_at=None)
+            result['comments'] = [comment.to_dict() for comment in live.order_by('created_at')]
         
         return result
+
+class Ticket(TicketMixin, TenantScoped, db.Model):
+    __tablename__ = 'tickets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    status = db.Column(db.Enum(TicketStatus), nullable=False, default=TicketStatus.OPEN)
+    priority = db.Column(db.Enum(TicketPriority), nullable=False, default=TicketPriority.MEDIUM)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Bumped by every write to the row, including those that keep updated_at (rescoring, counters,
+    # stale flags) and votes; delta sync and saved filter snapshots key on it
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    attachment_path = db.Column(db.String(500), nullable=True)  # Set once the upload has passed scanning
+    attachment_status = db.Column(db.Enum(AttachmentStatus), nullable=True)
+    first_response_at = db.Column(db.DateTime, nullable=True)  # First public agent reply
+    # Live (not deleted) comments, kept in step by src/comments.py instead of recounting
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Precomputed queue ordering, maintained by src/urgency.py
+    urgency_score = db.Column(db.Integer, nullable=True)
+    sla_due_at = db.Column(db.DateTime, nullable=True)
+    urgency_recompute_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Set by the stale sweep (src/scheduler.py) without touching updated_at; any later change clears it
+    stale_since = db.Column(db.DateTime, nullable=True)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=True)
+    
+    # Relationships
+    comments = db.relationship('Comment', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
+    votes = db.relationship('Vote', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_tickets_urgency', 'urgency_score', 'id'),
+        # Tenant-leading indexes for the scoped list, queue and change-tracking queries
+        db.Index('ix_tickets_tenant_status', 'tenant_id', 'status', 'created_at'),
+        db.Index('ix_tickets_tenant_urgency', 'tenant_id', 'urgency_score', 'id'),
+        db.Index('ix_tickets_tenant_updated', 'tenant_id', 'updated_at'),
+        db.Index('ix_tickets_tenant_changed', 'tenant_id', 'changed_at', 'id'),
+        db.Index('ix_tickets_tenant_assignee', 'tenant_id', 'assigned_to', 'status'),
+        # Scheduled sweeps: resolved tickets to close and in-progress tickets gone quiet, in any tenant
+        db.Index('ix_tickets_status_updated', 'status', 'updated_at'),
+        db.Index(
+            'ix_tickets_stale', 'stale_since',
+            sqlite_where=db.text('stale_since IS NOT NULL'), postgresql_where=db.text('stale_since IS NOT NULL')
+        ),
+    )
+    
+    # Truncated description, only populated by load_options(description_length=...)
+    description_preview = query_expression()
     
     def __repr__(self):
         return f'<Ticket {self.id}: {self.subject}>'
@@ -0,0 +1,48 @@
+from src.models.user import db
+from datetime import datetime
+from enum import Enum
+
+class TicketEventType(Enum):
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    ASSIGNED = "assigned"
+    PRIORITY_CHANGED = "priority_changed"
+    COMMENTED = "commented"
+    MERGED = "merged"
+    COMMENT_EDITED = "comment_edited"
+    COMMENT_DELETED = "comment_deleted"
+
+class TicketEvent(db.Model):
+    """Append-only history of ticket changes, written in the same transaction as the change"""
+    __tablename__ = 'ticket_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.Enum(TicketEventType), nullable=False)
+    old_value = db.Column(db.String(50), nullable=True)
+    new_value = db.Column(db.String(50), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # No foreign key on ticket_id: events outlive the move to the archive tables
+    ticket_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    actor = db.relationship('User')
+    
+    # Timeline reads are a range scan in id order within one ticket
+    __table_args__ = (db.Index('ix_ticket_events_ticket', 'ticket_id', 'id'),)
+    
+    def to_dict(self):
+        """Convert event to dictionary"""
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'old_value': self.old_value,
+            'new_value': self.new_value,
+            'created_at': self.created_at,
+            'ticket_id': self.ticket_id,
+            'actor_id': self.actor_id,
+            'actor': self.actor.to_dict() if self.actor else None
+        }
+    
+    def __repr__(self):
+        return f'<TicketEvent {self.id}: {self.event_type.value} on Ticket {self.ticket_id}>'
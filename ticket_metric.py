@@ -0,0 +1,42 @@
+from src.models.user import db
+from src.tenancy import TenantScoped, current_tenant_id, DEFAULT_TENANT_ID
+from datetime import datetime
+
+class TicketMetric(TenantScoped, db.Model):
+    """Running totals behind response and resolution time reports
+
+    One row per (tenant, scope, scope_id), where scope is 'category' or 'agent'.
+    Means are total / count, so recording a ticket is a single UPDATE of two
+    counters.
+    """
+    __tablename__ = 'ticket_metrics'
+    
+    # Part of the key: category and agent ids are only unique within a tenant's rows
+    tenant_id = db.Column(
+        db.Integer, primary_key=True, server_default=str(DEFAULT_TENANT_ID),
+        default=lambda: current_tenant_id() or DEFAULT_TENANT_ID
+    )
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    first_response_count = db.Column(db.Integer, nullable=False, default=0)
+    first_response_seconds = db.Column(db.Float, nullable=False, default=0)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+    resolve_seconds = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert metric to dictionary with derived means"""
+        return {
+            'scope': self.scope,
+            'scope_id': self.scope_id,
+            'first_response_count': self.first_response_count,
+            'mean_first_response_seconds': (
+                self.first_response_seconds / self.first_response_count if self.first_response_count else None
+            ),
+            'resolved_count': self.resolved_count,
+            'mean_resolve_seconds': self.resolve_seconds / self.resolved_count if self.resolved_count else None,
+            'updated_at': self.updated_at
+        }
+    
+    def __repr__(self):
+        return f'<TicketMetric {self.scope} {self.scope_id}>'
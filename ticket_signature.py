@@ -0,0 +1,21 @@
+from src.models.user import db
+
+class TicketSignature(db.Model):
+    """MinHash signature of a ticket's subject and description"""
+    __tablename__ = 'ticket_signatures'
+    
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id', ondelete='CASCADE'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # Packed unsigned 32-bit minhashes
+    
+    def __repr__(self):
+        return f'<TicketSignature {self.ticket_id}>'
+
+class TicketLSHBucket(db.Model):
+    """LSH band bucket membership; tickets sharing a bucket are duplicate candidates"""
+    __tablename__ = 'ticket_lsh_buckets'
+    
+    bucket = db.Column(db.BigInteger, primary_key=True)  # Hash of category, band index and band values
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id', ondelete='CASCADE'), primary_key=True)
+    
+    def __repr__(self):
+        return f'<TicketLSHBucket {self.bucket} -> {self.ticket_id}>'
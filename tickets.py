@@ -1,24 +1,149 @@
 from flask import Blueprint, request, jsonify, session, current_app
-from werkzeug.utils import secure_filename
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
 from src.models.user import db, User, UserRole
-from src.models.ticket import Ticket, TicketStatus, TicketPriority
+from src.models.ticket import Ticket, TicketStatus, TicketPriority, TICKET_FIELDS, TICKET_EXPANSIONS
 from src.models.category import Category
 from src.models.comment import Comment
 from src.models.vote import Vote
+from src.models.archived_ticket import ArchivedTicket, ArchivedComment
 from src.routes.auth import login_required, role_required
+from src.assignment import assignment_engine, is_active_status
+from src.urgency import refresh_ticket_urgency, mark_for_recompute
+from src.duplicates import find_duplicates, index_ticket, merge_votes
+from src.history import record_event, record_changes, record_first_response, record_resolution, time_in_status, AGENT_ROLES
+from src.models.ticket_event import TicketEvent, TicketEventType
+from src.models.ticket_metric import TicketMetric
+from src.attachments import attachment_scanner, ALLOWED_EXTENSIONS
+from src.read_models import ticket_columns, ticket_dicts
+from src.workload import agent_workload
+from src.idempotency import idempotent
+from src import policy
+from src.comments import EditConflict, adjust_comment_count, edit_comment, delete_comment, comment_history
+from src.delta_sync import record_change
 from datetime import datetime
-import os
-import uuid
 
 tickets_bp = Blueprint('tickets', __name__)
 
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx'}
-
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def parse_list_param(name, allowed):
+    """Parse a comma separated query parameter, returning None when it is absent"""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    values = [value.strip() for value in raw.split(',') if value.strip()]
+    for value in values:
+        if value not in allowed:
+            raise ValueError(f'Invalid {name} value: {value}')
+    return values
+
+def parse_sparse_params(expansions=TICKET_EXPANSIONS):
+    """Parse fields=, expand= and description_length= for ticket payloads"""
+    fields = parse_list_param('fields', TICKET_FIELDS)
+    expand = parse_list_param('expand', expansions)
+    description_length = request.args.get('description_length', type=int)
+    if description_length is not None and description_length < 1:
+        raise ValueError('description_length must be a positive integer')
+    return fields, expand, description_length
+
+def build_ticket_query(user, args):
+    """Filtered and sorted ticket query for a user from list parameters
+    
+    args is any mapping with a werkzeug-style get(key, default, type); returns
+    (query, model) where model is Ticket or ArchivedTicket. Raises ValueError
+    for invalid filter values.
+    """
+    # Closed tickets past the retention window only live in the archive tables
+    archived = args.get('archived', 'false').lower() == 'true'
+    model = ArchivedTicket if archived else Ticket
+    
+    query = model.query.filter(policy.condition(user, 'ticket.list', model))
+    
+    # Role-based views within what the user may list
+    if user.role == UserRole.END_USER:
+        # End users see their own tickets unless they ask for everything
+        my_tickets_only = args.get('my_tickets', 'true').lower() == 'true'
+        if my_tickets_only:
+            query = query.filter(model.user_id == user.id)
+    elif user.role == UserRole.SUPPORT_AGENT:
+        # Support agents can see all tickets or filter by assignment
+        ticket_queue = args.get('queue', 'all')
+        if ticket_queue == 'my_tickets':
+            query = query.filter(model.assigned_to == user.id)
+        elif ticket_queue == 'unassigned':
+            query = query.filter(model.assigned_to.is_(None))
+        elif ticket_queue == 'stale':
+            # Flagged by the stale sweep and untouched since (see is_stale)
+            query = query.filter(
+                model.stale_since.isnot(None),
+                model.status == TicketStatus.IN_PROGRESS,
+                model.updated_at <= model.stale_since
+            )
+    
+    # Status filtering
+    status = args.get('status')
+    if status:
+        try:
+            status_enum = TicketStatus(status)
+            query = query.filter(model.status == status_enum)
+        except ValueError:
+            raise ValueError('Invalid status')
+    
+    # Category filtering
+    category_id = args.get('category_id', type=int)
+    if category_id:
+        query = query.filter(model.category_id == category_id)
+    
+    # Priority filtering
+    priority = args.get('priority')
+    if priority:
+        try:
+            priority_enum = TicketPriority(priority)
+            query = query.filter(model.priority == priority_enum)
+        except ValueError:
+            raise ValueError('Invalid priority')
+    
+    # Search functionality
+    search = args.get('search', '').strip()
+    if search:
+        query = query.filter(
+            (model.subject.contains(search)) |
+            (model.description.contains(search))
+        )
+    
+    # Sorting
+    sort_by = args.get('sort_by', 'created_at')
+    sort_order = args.get('sort_order', 'desc')
+    
+    if sort_by == 'most_replied':
+        # Sort by the stored live comment count, no join or GROUP BY
+        if sort_order == 'desc':
+            query = query.order_by(model.comment_count.desc(), model.id.desc())
+        else:
+            query = query.order_by(model.comment_count.asc(), model.id.asc())
+    elif sort_by == 'urgency':
+        # Precomputed score, served by ix_tickets_urgency
+        if sort_order == 'desc':
+            query = query.order_by(model.urgency_score.desc(), model.id.desc())
+        else:
+            query = query.order_by(model.urgency_score.asc(), model.id.asc())
+    elif sort_by == 'updated_at':
+        if sort_order == 'desc':
+            query = query.order_by(model.updated_at.desc())
+        else:
+            query = query.order_by(model.updated_at.asc())
+    else:  # Default to created_at
+        if sort_order == 'desc':
+            query = query.order_by(model.created_at.desc())
+        else:
+            query = query.order_by(model.created_at.asc())
+    
+    return query, model
+
 @tickets_bp.route('/', methods=['GET'])
 @login_required
 def get_tickets():
@@ -28,82 +153,21 @@ def get_tickets():
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 10, type=int), 100)
         
-        # Build query based on user role and filters
-        query = Ticket.query
-        
-        # Role-based filtering
-        if user.role == UserRole.END_USER:
-            # End users can only see their own tickets
-            my_tickets_only = request.args.get('my_tickets', 'true').lower() == 'true'
-            if my_tickets_only:
-                query = query.filter(Ticket.user_id == user.id)
-        elif user.role == UserRole.SUPPORT_AGENT:
-            # Support agents can see all tickets or filter by assignment
-            ticket_queue = request.args.get('queue', 'all')
-            if ticket_queue == 'my_tickets':
-                query = query.filter(Ticket.assigned_to == user.id)
-            elif ticket_queue == 'unassigned':
-                query = query.filter(Ticket.assigned_to.is_(None))
-        
-        # Status filtering
-        status = request.args.get('status')
-        if status:
-            try:
-                status_enum = TicketStatus(status)
-                query = query.filter(Ticket.status == status_enum)
-            except ValueError:
-                return jsonify({'error': 'Invalid status'}), 400
-        
-        # Category filtering
-        category_id = request.args.get('category_id', type=int)
-        if category_id:
-            query = query.filter(Ticket.category_id == category_id)
-        
-        # Priority filtering
-        priority = request.args.get('priority')
-        if priority:
-            try:
-                priority_enum = TicketPriority(priority)
-                query = query.filter(Ticket.priority == priority_enum)
-            except ValueError:
-                return jsonify({'error': 'Invalid priority'}), 400
-        
-        # Search functionality
-        search = request.args.get('search', '').strip()
-        if search:
-            query = query.filter(
-                (Ticket.subject.contains(search)) |
-                (Ticket.description.contains(search))
-            )
+        try:
+            fields, expand, description_length = parse_sparse_params()
+            query, model = build_ticket_query(user, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Sorting
-        sort_by = request.args.get('sort_by', 'created_at')
-        sort_order = request.args.get('sort_order', 'desc')
-        
-        if sort_by == 'most_replied':
-            # Sort by comment count
-            query = query.outerjoin(Comment).group_by(Ticket.id)
-            if sort_order == 'desc':
-                query = query.order_by(db.func.count(Comment.id).desc())
-            else:
-                query = query.order_by(db.func.count(Comment.id).asc())
-        elif sort_by == 'updated_at':
-            if sort_order == 'desc':
-                query = query.order_by(Ticket.updated_at.desc())
-            else:
-                query = query.order_by(Ticket.updated_at.asc())
-        else:  # Default to created_at
-            if sort_order == 'desc':
-                query = query.order_by(Ticket.created_at.desc())
-            else:
-                query = query.order_by(Ticket.created_at.asc())
+        # Select only the columns the payload needs, as plain rows rather than ORM objects
+        query = query.with_entities(*ticket_columns(model, fields, expand, description_length))
         
         # Pagination
         pagination = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        tickets = [ticket.to_dict() for ticket in pagination.items]
+        tickets = ticket_dicts(model, pagination.items, fields, expand, description_length)
         
         return jsonify({
             'tickets': tickets,
@@ -118,25 +182,16 @@ def get_tickets():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch tickets')
         return jsonify({'error': 'Failed to fetch tickets'}), 500
 
 @tickets_bp.route('/', methods=['POST'])
 @login_required
+@idempotent
 def create_ticket():
     """Create a new ticket"""
+    attachment = None
     try:
-        # Handle file upload
-        attachment_path = None
-        if 'attachment' in request.files:
-            file = request.files['attachment']
-            if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Add UUID to prevent filename conflicts
-                filename = f"{uuid.uuid4()}_{filename}"
-                upload_path = os.path.join(current_app.static_folder, 'uploads', filename)
-                file.save(upload_path)
-                attachment_path = f"uploads/{filename}"
-        
         # Get form data
         subject = request.form.get('subject', '').strip()
         description = request.form.get('description', '').strip()
@@ -164,26 +219,67 @@ def create_ticket():
         except ValueError:
             return jsonify({'error': 'Invalid priority'}), 400
         
+        # Uploads go to quarantine and are only served once the scan workers pass them
+        if 'attachment' in request.files:
+            file = request.files['attachment']
+            if file and file.filename and allowed_file(file.filename):
+                attachment = attachment_scanner.stage(file)
+        
+        # Look up likely duplicates before the new ticket is in the index
+        possible_duplicates = find_duplicates(subject, description, category_id)
+        
+        # Auto-assign to the least loaded agent, favouring agents who know the category
+        assigned_to = None
+        if current_app.config['AUTO_ASSIGN_TICKETS']:
+            assigned_to = assignment_engine.reserve(category_id)
+        
         # Create ticket
         ticket = Ticket(
             subject=subject,
             description=description,
             category_id=category_id,
             priority=priority_enum,
+            status=TicketStatus.OPEN,
             user_id=session['user_id'],
-            attachment_path=attachment_path
+            assigned_to=assigned_to,
+            attachment_status=attachment.status if attachment else None
         )
         
+        refresh_ticket_urgency(ticket, category=category, net_votes=0)
+        
         db.session.add(ticket)
-        db.session.commit()
+        try:
+            db.session.flush()
+            index_ticket(ticket.id, category_id, subject, description)
+            record_event(ticket.id, TicketEventType.CREATED, session['user_id'], new_value=ticket.status, at=ticket.created_at)
+            if assigned_to is not None:
+                record_event(ticket.id, TicketEventType.ASSIGNED, None, new_value=assigned_to, at=ticket.created_at)
+            if attachment is not None:
+                attachment.ticket_id = ticket.id
+                db.session.add(attachment)
+            db.session.commit()
+        except Exception:
+            if assigned_to is not None:
+                assignment_engine.release(assigned_to, category_id)
+            raise
+        
+        if assigned_to is not None:
+            agent_workload.invalidate()
+        if attachment is not None:
+            attachment_scanner.submit([attachment.id])
         
         return jsonify({
             'message': 'Ticket created successfully',
-            'ticket': ticket.to_dict()
+            'ticket': ticket.to_dict(),
+            'attachment': attachment.to_dict() if attachment else None,
+            'possible_duplicates': possible_duplicates
         }), 201
         
     except Exception as e:
+        current_app.logger.exception('Failed to create ticket')
         db.session.rollback()
+        if attachment is not None and attachment.id is None:
+            attachment_scanner.discard(attachment)
         return jsonify({'error': 'Failed to create ticket'}), 500
 
 @tickets_bp.route('/<int:ticket_id>', methods=['GET'])
@@ -192,18 +288,48 @@ def get_ticket(ticket_id):
     """Get a specific ticket with comments"""
     try:
         user = User.query.get(session['user_id'])
-        ticket = Ticket.query.get(ticket_id)
+        
+        try:
+            fields, expand, description_length = parse_sparse_params(
+                tuple(TICKET_EXPANSIONS) + ('comments',)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        include_comments = expand is None or 'comments' in expand
+        if expand is not None:
+            expand = [name for name in expand if name != 'comments']
+        
+        ticket = Ticket.query.options(
+            *Ticket.load_options(fields, expand, description_length)
+        ).filter(Ticket.id == ticket_id).first()
+        
+        if not ticket:
+            # Archived tickets stay readable under their original id
+            ticket = ArchivedTicket.query.options(
+                *ArchivedTicket.load_options(fields, expand, description_length)
+            ).filter(ArchivedTicket.id == ticket_id).first()
         
         if not ticket:
             return jsonify({'error': 'Ticket not found'}), 404
         
         # Check permissions
-        if user.role == UserRole.END_USER and ticket.user_id != user.id:
+        if not policy.allows(user, 'ticket.view', ticket):
             return jsonify({'error': 'Access denied'}), 403
         
-        return jsonify({'ticket': ticket.to_dict(include_comments=True)}), 200
+        result = ticket.to_dict(fields=fields, expand=expand, description_length=description_length)
+        if include_comments:
+            # Live comments the user may see (end users don't get internal notes)
+            comment_model = ArchivedComment if isinstance(ticket, ArchivedTicket) else Comment
+            thread = ticket.comments.filter(
+                comment_model.live(), policy.condition(user, 'comment.view', comment_model)
+            ).order_by(comment_model.created_at)
+            result['comments'] = [comment.to_dict() for comment in thread]
+        
+        return jsonify({'ticket': result}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch ticket')
         return jsonify({'error': 'Failed to fetch ticket'}), 500
 
 @tickets_bp.route('/<int:ticket_id>', methods=['PUT'])
@@ -218,13 +344,20 @@ def update_ticket(ticket_id):
             return jsonify({'error': 'Ticket not found'}), 404
         
         # Check permissions
-        if user.role == UserRole.END_USER and ticket.user_id != user.id:
+        if not policy.allows(user, 'ticket.update', ticket):
             return jsonify({'error': 'Access denied'}), 403
         
         data = request.get_json()
         
+        # Remember the previous state for the event log and the assignment engine
+        old_status = ticket.status
+        old_assignee = ticket.assigned_to
+        old_priority = ticket.priority
+        old_resolved_at = ticket.resolved_at
+        old_active = is_active_status(old_status)
+        
         # Update allowed fields based on user role
-        if user.role in [UserRole.SUPPORT_AGENT, UserRole.ADMIN]:
+        if policy.allows(user, 'ticket.triage', ticket):
             # Agents and admins can update status and assignment
             if 'status' in data:
                 try:
@@ -242,26 +375,40 @@ def update_ticket(ticket_id):
                 ticket.assigned_to = data['assigned_to']
         
         # All users can update priority if they own the ticket or are agents/admins
-        if 'priority' in data and (ticket.user_id == user.id or user.role in [UserRole.SUPPORT_AGENT, UserRole.ADMIN]):
+        if 'priority' in data and policy.allows(user, 'ticket.prioritize', ticket):
             try:
                 ticket.priority = TicketPriority(data['priority'])
             except ValueError:
                 return jsonify({'error': 'Invalid priority'}), 400
         
         ticket.updated_at = datetime.utcnow()
+        refresh_ticket_urgency(ticket)
+        record_changes(ticket, user.id, old_status, old_assignee, old_priority)
+        if old_resolved_at is None and ticket.resolved_at is not None:
+            record_resolution(ticket)
         db.session.commit()
         
+        assignment_engine.ticket_changed(
+            old_assignee, old_active,
+            ticket.assigned_to, is_active_status(ticket.status),
+            ticket.category_id
+        )
+        if ticket.assigned_to != old_assignee or ticket.status != old_status or ticket.resolved_at != old_resolved_at:
+            agent_workload.invalidate()
+        
         return jsonify({
             'message': 'Ticket updated successfully',
             'ticket': ticket.to_dict()
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to update ticket')
         db.session.rollback()
         return jsonify({'error': 'Failed to update ticket'}), 500
 
 @tickets_bp.route('/<int:ticket_id>/comments', methods=['POST'])
 @login_required
+@idempotent
 def add_comment(ticket_id):
     """Add a comment to a ticket"""
     try:
@@ -272,7 +419,7 @@ def add_comment(ticket_id):
             return jsonify({'error': 'Ticket not found'}), 404
         
         # Check permissions - users can only comment on their own tickets
-        if user.role == UserRole.END_USER and ticket.user_id != user.id:
+        if not policy.allows(user, 'ticket.comment', ticket):
             return jsonify({'error': 'Access denied'}), 403
         
         data = request.get_json()
@@ -283,7 +430,7 @@ def add_comment(ticket_id):
         
         # Support agents can mark comments as internal
         is_internal = False
-        if user.role in [UserRole.SUPPORT_AGENT, UserRole.ADMIN]:
+        if policy.allows(user, 'ticket.triage', ticket):
             is_internal = data.get('is_internal', False)
         
         comment = Comment(
@@ -294,10 +441,16 @@ def add_comment(ticket_id):
         )
         
         db.session.add(comment)
+        adjust_comment_count(ticket.id, 1)
         
         # Update ticket's updated_at timestamp
         ticket.updated_at = datetime.utcnow()
         
+        db.session.flush()
+        record_event(ticket.id, TicketEventType.COMMENTED, user.id, new_value=comment.id, at=comment.created_at)
+        if user.role in AGENT_ROLES and not is_internal and ticket.user_id != user.id:
+            record_first_response(ticket, user.id, comment.created_at)
+        
         db.session.commit()
         
         return jsonify({
@@ -306,9 +459,131 @@ def add_comment(ticket_id):
         }), 201
         
     except Exception as e:
+        current_app.logger.exception('Failed to add comment')
         db.session.rollback()
         return jsonify({'error': 'Failed to add comment'}), 500
 
+def _find_comment(ticket_id, comment_id, user, action):
+    """(ticket, comment, error response) for a live comment on a live ticket the user may act on"""
+    ticket = Ticket.query.get(ticket_id)
+    if not ticket:
+        return None, None, (jsonify({'error': 'Ticket not found'}), 404)
+    
+    comment = Comment.query.filter(
+        Comment.id == comment_id, Comment.ticket_id == ticket_id, Comment.live()
+    ).first()
+    if not comment:
+        return None, None, (jsonify({'error': 'Comment not found'}), 404)
+    
+    # Authors manage their own comments; admins can manage any
+    if not policy.allows(user, action, comment):
+        return None, None, (jsonify({'error': 'Access denied'}), 403)
+    
+    return ticket, comment, None
+
+@tickets_bp.route('/<int:ticket_id>/comments/<int:comment_id>', methods=['PUT'])
+@login_required
+def edit_ticket_comment(ticket_id, comment_id):
+    """Edit a comment (author or admin), keeping the old text as a revision"""
+    try:
+        user = User.query.get(session['user_id'])
+        ticket, comment, error = _find_comment(ticket_id, comment_id, user, 'comment.edit')
+        if error:
+            return error
+        
+        data = request.get_json(silent=True) or {}
+        content = (data.get('content') or '').strip()
+        
+        if not content:
+            return jsonify({'error': 'Comment content is required'}), 400
+        
+        now = datetime.utcnow()
+        try:
+            changed = edit_comment(comment, content, user.id, now)
+        except EditConflict:
+            db.session.rollback()
+            return jsonify({'error': 'Comment was changed by another request, reload and try again'}), 409
+        
+        if changed:
+            ticket.updated_at = now
+            record_event(ticket.id, TicketEventType.COMMENT_EDITED, user.id, new_value=comment.id, at=now)
+            db.session.commit()
+        
+        return jsonify({
+            'message': 'Comment updated successfully',
+            'comment': comment.to_dict()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to update comment')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update comment'}), 500
+
+@tickets_bp.route('/<int:ticket_id>/comments/<int:comment_id>', methods=['DELETE'])
+@login_required
+def delete_ticket_comment(ticket_id, comment_id):
+    """Delete a comment (author or admin); it is hidden from the thread and its history dropped"""
+    try:
+        user = User.query.get(session['user_id'])
+        ticket, comment, error = _find_comment(ticket_id, comment_id, user, 'comment.delete')
+        if error:
+            return error
+        
+        now = datetime.utcnow()
+        if not delete_comment(comment, user.id, now):
+            # Deleted by a concurrent request since we read it
+            db.session.rollback()
+            return jsonify({'error': 'Comment not found'}), 404
+        
+        ticket.updated_at = now
+        record_event(ticket.id, TicketEventType.COMMENT_DELETED, user.id, new_value=comment_id, at=now)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Comment deleted successfully',
+            'comment_count': ticket.comment_count
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to delete comment')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete comment'}), 500
+
+@tickets_bp.route('/<int:ticket_id>/comments/<int:comment_id>/revisions', methods=['GET'])
+@login_required
+def get_comment_revisions(ticket_id, comment_id):
+    """Get a comment's earlier versions, newest first"""
+    try:
+        user = User.query.get(session['user_id'])
+        ticket = Ticket.query.get(ticket_id)
+        
+        if not ticket:
+            # History moves to the archive with its comments
+            ticket = ArchivedTicket.query.filter(ArchivedTicket.id == ticket_id).first()
+        
+        if not ticket:
+            return jsonify({'error': 'Ticket not found'}), 404
+        
+        # Same visibility as the thread itself
+        if not policy.allows(user, 'ticket.view', ticket):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        comment_model = ArchivedComment if isinstance(ticket, ArchivedTicket) else Comment
+        comment = comment_model.query.filter(
+            comment_model.id == comment_id, comment_model.ticket_id == ticket_id, comment_model.live()
+        ).first()
+        if not comment or not policy.allows(user, 'comment.view', comment):
+            return jsonify({'error': 'Comment not found'}), 404
+        
+        return jsonify({
+            'comment': comment.to_dict(),
+            'revisions': comment_history(comment)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch comment revisions')
+        return jsonify({'error': 'Failed to fetch comment revisions'}), 500
+
 @tickets_bp.route('/<int:ticket_id>/vote', methods=['POST'])
 @login_required
 def vote_ticket(ticket_id):
@@ -341,6 +616,10 @@ def vote_ticket(ticket_id):
             )
             db.session.add(vote)
         
+        # Votes feed the urgency score and the counts sync clients hold
+        mark_for_recompute(Ticket.id == ticket_id)
+        record_change(Ticket.id == ticket_id)
+        
         db.session.commit()
         
         return jsonify({
@@ -350,6 +629,7 @@ def vote_ticket(ticket_id):
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to record vote')
         db.session.rollback()
         return jsonify({'error': 'Failed to record vote'}), 500
 
@@ -369,9 +649,12 @@ def remove_vote(ticket_id):
             return jsonify({'error': 'Vote not found'}), 404
         
         db.session.delete(vote)
-        db.session.commit()
         
         ticket = Ticket.query.get(ticket_id)
+        mark_for_recompute(Ticket.id == ticket_id)
+        record_change(Ticket.id == ticket_id)
+        
+        db.session.commit()
         
         return jsonify({
             'message': 'Vote removed successfully',
@@ -380,6 +663,199 @@ def remove_vote(ticket_id):
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to remove vote')
         db.session.rollback()
         return jsonify({'error': 'Failed to remove vote'}), 500
 
+@tickets_bp.route('/rebalance', methods=['POST'])
+@role_required([UserRole.ADMIN])
+def rebalance_tickets():
+    """Assign the unassigned backlog across agents (Admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = assignment_engine.rebalance(
+            include_overloaded=bool(data.get('include_overloaded', False))
+        )
+        agent_workload.invalidate()
+        
+        return jsonify({
+            'message': 'Tickets rebalanced successfully',
+            'assigned': result['assigned'],
+            'moved': result['moved'],
+            'loads': assignment_engine.loads()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to rebalance tickets')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to rebalance tickets'}), 500
+
+@tickets_bp.route('/duplicates', methods=['POST'])
+@login_required
+def check_duplicates():
+    """Find open tickets that look like the one being written"""
+    try:
+        data = request.get_json(silent=True) or {}
+        subject = (data.get('subject') or '').strip()
+        description = (data.get('description') or '').strip()
+        category_id = data.get('category_id')
+        
+        if not subject and not description:
+            return jsonify({'error': 'Subject or description is required'}), 400
+        
+        if not isinstance(category_id, int):
+            return jsonify({'error': 'Category is required'}), 400
+        
+        return jsonify({
+            'duplicates': find_duplicates(subject, description, category_id)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to check for duplicates')
+        return jsonify({'error': 'Failed to check for duplicates'}), 500
+
+@tickets_bp.route('/<int:ticket_id>/merge', methods=['POST'])
+@role_required([UserRole.SUPPORT_AGENT, UserRole.ADMIN])
+def merge_ticket(ticket_id):
+    """Close a ticket as a duplicate of another, moving its votes (Agent/Admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        canonical_id = data.get('into')
+        
+        if not isinstance(canonical_id, int):
+            return jsonify({'error': 'Target ticket is required'}), 400
+        
+        if canonical_id == ticket_id:
+            return jsonify({'error': 'Cannot merge a ticket into itself'}), 400
+        
+        ticket = Ticket.query.get(ticket_id)
+        canonical = Ticket.query.get(canonical_id)
+        
+        if not ticket or not canonical:
+            return jsonify({'error': 'Ticket not found'}), 404
+        
+        if ticket.duplicate_of is not None:
+            return jsonify({'error': 'Ticket is already merged into another ticket'}), 400
+        
+        if canonical.duplicate_of is not None:
+            return jsonify({'error': 'Target ticket is itself a duplicate'}), 400
+        
+        if not is_active_status(canonical.status):
+            return jsonify({'error': 'Target ticket must be open or in progress'}), 400
+        
+        # Duplicate detection only compares tickets within a category
+        if canonical.category_id != ticket.category_id:
+            return jsonify({'error': 'Target ticket is in another category'}), 400
+        
+        old_status = ticket.status
+        old_active = is_active_status(old_status)
+        
+        merged_votes = merge_votes(ticket.id, canonical.id)
+        ticket.duplicate_of = canonical.id
+        
+        # Earlier duplicates of this ticket follow it, so no chain of duplicates forms
+        repointed = db.session.scalars(
+            update(Ticket).where(Ticket.duplicate_of == ticket.id)
+            .values(duplicate_of=canonical.id).returning(Ticket.id)
+        ).all()
+        for duplicate_id in repointed:
+            record_event(duplicate_id, TicketEventType.MERGED, session['user_id'], ticket.id, canonical.id)
+        db.session.execute(
+            update(ArchivedTicket).where(ArchivedTicket.duplicate_of == ticket.id)
+            .values(duplicate_of=canonical.id)
+        )
+        ticket.status = TicketStatus.CLOSED
+        ticket.updated_at = datetime.utcnow()
+        refresh_ticket_urgency(ticket, net_votes=0)
+        mark_for_recompute(Ticket.id == canonical.id)
+        record_event(ticket.id, TicketEventType.MERGED, session['user_id'], new_value=canonical.id)
+        if old_status != ticket.status:
+            record_event(ticket.id, TicketEventType.STATUS_CHANGED, session['user_id'], old_status, ticket.status)
+        db.session.commit()
+        
+        assignment_engine.ticket_changed(ticket.assigned_to, old_active, ticket.assigned_to, False)
+        if ticket.assigned_to is not None:
+            agent_workload.invalidate()
+        
+        return jsonify({
+            'message': 'Ticket merged successfully',
+            'ticket': ticket.to_dict(),
+            'merged_votes': merged_votes
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to merge ticket')
+        db.session.rollback()
+        return jsonify({'error': 'Failed to merge ticket'}), 500
+
+@tickets_bp.route('/<int:ticket_id>/events', methods=['GET'])
+@login_required
+def get_ticket_events(ticket_id):
+    """Get a ticket's change history, oldest first"""
+    try:
+        user = User.query.get(session['user_id'])
+        after = request.args.get('after', 0, type=int)
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        
+        owner = db.session.query(Ticket.user_id).filter(Ticket.id == ticket_id).scalar()
+        if owner is None:
+            owner = db.session.query(ArchivedTicket.user_id).filter(ArchivedTicket.id == ticket_id).scalar()
+        
+        if owner is None:
+            return jsonify({'error': 'Ticket not found'}), 404
+        
+        # Check permissions
+        if not policy.allows(user, 'ticket.view', {'user_id': owner}):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        # Keyset pagination over ix_ticket_events_ticket
+        events = TicketEvent.query.options(joinedload(TicketEvent.actor)).filter(
+            TicketEvent.ticket_id == ticket_id,
+            TicketEvent.id > after
+        ).order_by(TicketEvent.id).limit(limit + 1).all()
+        
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        result = {
+            'events': [event.to_dict() for event in events],
+            'has_more': has_more,
+            'next_after': events[-1].id if has_more else None
+        }
+        
+        # Durations need the whole timeline, so only the complete history gets them
+        if not after and not has_more:
+            result['time_in_status'] = time_in_status(events)
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch ticket events')
+        return jsonify({'error': 'Failed to fetch ticket events'}), 500
+
+@tickets_bp.route('/performance', methods=['GET'])
+@role_required([UserRole.SUPPORT_AGENT, UserRole.ADMIN])
+def get_performance():
+    """First response and resolution times per category and agent (Agent/Admin only)"""
+    try:
+        metrics = TicketMetric.query.all()
+        category_names = dict(db.session.query(Category.id, Category.name))
+        agent_ids = [metric.scope_id for metric in metrics if metric.scope == 'agent']
+        agent_names = dict(db.session.query(User.id, User.username).filter(User.id.in_(agent_ids)))
+        
+        categories = []
+        agents = []
+        for metric in metrics:
+            data = metric.to_dict()
+            if metric.scope == 'category':
+                data['name'] = category_names.get(metric.scope_id)
+                categories.append(data)
+            else:
+                data['name'] = agent_names.get(metric.scope_id)
+                agents.append(data)
+        
+        return jsonify({'categories': categories, 'agents': agents}), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch performance metrics')
+        return jsonify({'error': 'Failed to fetch performance metrics'}), 500
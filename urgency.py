@@ -0,0 +1,154 @@
+"""Urgency score for SLA-aware queue ordering.
+
+The score is a step function of priority, SLA stage, ticket age in whole days and
+net votes, so it only changes at known instants. Each active ticket stores the
+next such instant in urgency_recompute_at; the periodic job rescores only the
+tickets whose instant has passed, and sorting by urgency stays an index scan.
+"""
+from src.models.user import db
+from src.models.ticket import Ticket, TicketStatus, TicketPriority, SLA_WARNING_FRACTION
+from src.models.category import Category
+from src.models.vote import Vote
+from sqlalchemy import bindparam, update
+from datetime import datetime, timedelta
+
+DEFAULT_SLA_HOURS = 72
+
+# Score for closed/resolved tickets, below every active ticket
+INACTIVE_SCORE = -1
+
+PRIORITY_POINTS = {
+    TicketPriority.LOW: 0,
+    TicketPriority.MEDIUM: 100,
+    TicketPriority.HIGH: 200,
+    TicketPriority.URGENT: 400,
+}
+
+# Category SLA is the medium priority target; other priorities scale it
+PRIORITY_SLA_FACTOR = {
+    TicketPriority.LOW: 2.0,
+    TicketPriority.MEDIUM: 1.0,
+    TicketPriority.HIGH: 0.5,
+    TicketPriority.URGENT: 0.25,
+}
+
+# (fraction of SLA window elapsed, points) in ascending order
+SLA_STAGES = (
+    (0.5, 50),
+    (SLA_WARNING_FRACTION, 150),
+    (1.0, 300),
+)
+
+AGE_POINTS_PER_DAY = 1
+MAX_AGE_POINTS = 100
+VOTE_POINTS = 2
+MAX_VOTE_POINTS = 50
+
+ACTIVE_STATUSES = (TicketStatus.OPEN, TicketStatus.IN_PROGRESS)
+
+
+def compute_urgency(status, priority, created_at, sla_hours, net_votes, now=None):
+    """Return (score, sla_due_at, recompute_at) for a ticket's current state"""
+    if status not in ACTIVE_STATUSES:
+        return INACTIVE_SCORE, None, None
+
+    now = now or datetime.utcnow()
+    window = timedelta(hours=(sla_hours or DEFAULT_SLA_HOURS) * PRIORITY_SLA_FACTOR[priority])
+    sla_due_at = created_at + window
+
+    score = PRIORITY_POINTS[priority]
+    recompute_at = None
+
+    elapsed = now - created_at
+    stage_points = 0
+    for fraction, points in SLA_STAGES:
+        threshold = created_at + window * fraction
+        if now >= threshold:
+            stage_points = points
+        else:
+            recompute_at = threshold
+            break
+    score += stage_points
+
+    age_days = elapsed.days
+    if age_days * AGE_POINTS_PER_DAY < MAX_AGE_POINTS:
+        next_day = created_at + timedelta(days=age_days + 1)
+        recompute_at = min(recompute_at, next_day) if recompute_at else next_day
+    score += min(age_days * AGE_POINTS_PER_DAY, MAX_AGE_POINTS)
+
+    score += max(0, min(net_votes * VOTE_POINTS, MAX_VOTE_POINTS))
+    return score, sla_due_at, recompute_at
+
+
+def refresh_ticket_urgency(ticket, category=None, net_votes=None):
+    """Recompute the stored score on a ticket instance before it is committed"""
+    category = category or ticket.category or Category.query.get(ticket.category_id)
+    if net_votes is None:
+        net_votes = ticket.upvotes - ticket.downvotes if ticket.id else 0
+    ticket.urgency_score, ticket.sla_due_at, ticket.urgency_recompute_at = compute_urgency(
+        ticket.status, ticket.priority, ticket.created_at or datetime.utcnow(),
+        category.sla_hours if category else None, net_votes
+    )
+
+
+def mark_for_recompute(*criteria):
+    """Flag active tickets matching criteria so the next job run rescores them (updated_at is kept)"""
+    db.session.execute(
+        update(Ticket).where(Ticket.status.in_(ACTIVE_STATUSES), *criteria)
+        .values(urgency_recompute_at=datetime.utcnow(), updated_at=Ticket.updated_at)
+    )
+
+
+def backfill_unscored():
+    """Give tickets created before scoring existed a score (inactive) or a recompute slot (active)"""
+    db.session.execute(
+        update(Ticket).where(Ticket.urgency_score.is_(None), Ticket.status.notin_(ACTIVE_STATUSES))
+        .values(urgency_score=INACTIVE_SCORE, updated_at=Ticket.updated_at)
+    )
+    db.session.execute(
+        update(Ticket).where(Ticket.urgency_score.is_(None), Ticket.urgency_recompute_at.is_(None))
+        .values(urgency_recompute_at=datetime.utcnow(), updated_at=Ticket.updated_at)
+    )
+    db.session.commit()
+
+
+def recompute_due(batch_size=1000, now=None):
+    """Rescore every ticket whose score may have changed; returns the number updated"""
+    now = now or datetime.utcnow()
+    sla_hours = dict(db.session.query(Category.id, Category.sla_hours))
+    table = Ticket.__table__
+    statement = update(table).where(table.c.id == bindparam('ticket_id')).values(
+        urgency_score=bindparam('score'),
+        sla_due_at=bindparam('due'),
+        urgency_recompute_at=bindparam('recompute_at'),
+        # A rescore is not a change to the ticket; keep updated_at for lists, sweeps and archiving
+        updated_at=table.c.updated_at,
+    )
+
+    updated = 0
+    while True:
+        rows = db.session.query(
+            Ticket.id, Ticket.status, Ticket.priority, Ticket.created_at, Ticket.category_id
+        ).filter(Ticket.urgency_recompute_at <= now).order_by(Ticket.urgency_recompute_at).limit(batch_size).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        net_votes = dict(db.session.query(
+            Vote.ticket_id,
+            db.func.sum(db.case((Vote.is_upvote == True, 1), else_=-1))
+        ).filter(Vote.ticket_id.in_(ids)).group_by(Vote.ticket_id))
+
+        params = []
+        for row in rows:
+            score, due, recompute_at = compute_urgency(
+                row.status, row.priority, row.created_at,
+                sla_hours.get(row.category_id), net_votes.get(row.id, 0), now
+            )
+            params.append({'ticket_id': row.id, 'score': score, 'due': due, 'recompute_at': recompute_at})
+
+        db.session.execute(statement, params)
+        db.session.commit()
+        updated += len(params)
+
+    return updated
@@ -1,21 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.tenancy import TenantScoped, TenantSession
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from enum import Enum
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': TenantSession})
 
 class UserRole(Enum):
     END_USER = "end_user"
     SUPPORT_AGENT = "support_agent"
     ADMIN = "admin"
 
-class User(db.Model):
+class User(TenantScoped, db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.Enum(UserRole), nullable=False, default=UserRole.END_USER)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -27,6 +28,13 @@ class User(db.Model):
     comments = db.relationship('Comment', backref='author', lazy='dynamic')
     votes = db.relationship('Vote', backref='user', lazy='dynamic')
     
+    # Usernames and emails are unique within a tenant
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'username', name='uq_users_tenant_username'),
+        db.UniqueConstraint('tenant_id', 'email', name='uq_users_tenant_email'),
+        db.Index('ix_users_tenant_role', 'tenant_id', 'role'),
+    )
+    
     def set_password(self, password):
         """Set password hash"""
         self.password_hash = generate_password_hash(password)
@@ -41,8 +49,8 @@ class User(db.Model):
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'role': self.role.value,
-            'created_at': self.created_at.isoformat(),
+            'role': self.role,
+            'created_at': self.created_at,
             'is_active': self.is_active
         }
     
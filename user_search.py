@@ -0,0 +1,190 @@
+"""In-memory username/email index for user autocomplete.
+
+get_users filters with LIKE '%...%', which scans the users table and then runs
+a COUNT and an OFFSET page on every keystroke. Autocomplete instead walks a
+prefix trie over lowercased usernames and emails kept in process memory:
+
+- exact matches rank first, then prefix matches in alphabetical order;
+- with fuzzy=True, keys with a prefix one insert, delete or substitution away
+  from the query fill any remaining slots (queries of three or more
+  characters, shorter ones would match nearly everything);
+- only the first `limit` matches are visited, so cost tracks the result size
+  rather than the number of users.
+
+Each tenant has its own index. It is dropped when a commit in this process
+touches a User and rebuilt on the next lookup; other worker processes pick up
+changes within USER_INDEX_RESYNC_SECONDS.
+"""
+from flask import current_app, has_app_context
+from src.models.user import db, User
+from src.tenancy import PerTenant
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from itertools import chain
+import threading
+import time
+
+DEFAULT_CONFIG = {
+    # Rebuild from the database this often to pick up user changes made by other processes
+    'USER_INDEX_RESYNC_SECONDS': 300,
+    'USER_AUTOCOMPLETE_LIMIT': 10,
+}
+
+# Shortest query that also returns one-edit matches
+FUZZY_MIN_LENGTH = 3
+
+
+class _Node:
+    __slots__ = ('children', 'ids', 'ordered')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+        self.ordered = ()
+
+
+class UserIndex:
+    """Prefix trie over one tenant's usernames and emails"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = None
+        self._users = {}
+        self._loaded_at = 0.0
+        # Bumped by invalidate() so a rebuild that raced with a change isn't kept
+        self._generation = 0
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._root = None
+            self._generation += 1
+
+    def _build(self):
+        root = _Node()
+        users = {}
+        rows = db.session.query(User.id, User.username, User.email, User.role, User.is_active)
+        for row in rows:
+            users[row.id] = {
+                'id': row.id,
+                'username': row.username,
+                'email': row.email,
+                'role': row.role,
+                'is_active': row.is_active,
+            }
+            for key in {row.username.lower(), row.email.lower()}:
+                node = root
+                for char in key:
+                    node = node.children.setdefault(char, _Node())
+                node.ids.append(row.id)
+
+        # Freeze child order once so every walk yields keys alphabetically
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.ordered = tuple(sorted(node.children.items()))
+            node.ids.sort()
+            stack.extend(node.children.values())
+        return root, users
+
+    def _ensure_loaded(self):
+        resync = current_app.config['USER_INDEX_RESYNC_SECONDS']
+        with self._lock:
+            if self._root is not None and time.monotonic() - self._loaded_at < resync:
+                return self._root, self._users
+            generation = self._generation
+        root, users = self._build()
+        with self._lock:
+            if self._generation == generation:
+                self._root, self._users, self._loaded_at = root, users, time.monotonic()
+        return root, users
+
+    @staticmethod
+    def _walk(node):
+        """User ids under a node, in key order (the node's own ids first)"""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.ids
+            stack.extend(child for _, child in reversed(node.ordered))
+
+    @staticmethod
+    def _fuzzy(root, query):
+        """Subtrees whose key prefix is within one edit of the query"""
+        stack = [(root, range(len(query) + 1))]
+        while stack:
+            node, row = stack.pop()
+            if row is None:
+                # Already within one edit: everything below matches
+                yield node
+                continue
+            children = []
+            for char, child in node.ordered:
+                # One Levenshtein row per trie edge, pruned once every cell exceeds one edit
+                next_row = [row[0] + 1]
+                for i, query_char in enumerate(query, 1):
+                    next_row.append(min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (query_char != char)))
+                if next_row[-1] <= 1:
+                    children.append((child, None))
+                elif min(next_row) <= 1:
+                    children.append((child, next_row))
+            stack.extend(reversed(children))
+
+    def search(self, query, limit=None, roles=None, active_only=False, fuzzy=False):
+        """Users matching query, best first: [(user dict, 'exact' | 'prefix' | 'fuzzy')]"""
+        query = query.strip().lower()
+        if not query:
+            return []
+        limit = limit or current_app.config['USER_AUTOCOMPLETE_LIMIT']
+        root, users = self._ensure_loaded()
+
+        found = {}
+
+        def take(user_ids, match):
+            for user_id in user_ids:
+                if len(found) >= limit:
+                    return True
+                user = users[user_id]
+                if user_id in found or (roles and user['role'] not in roles) or (active_only and not user['is_active']):
+                    continue
+                found[user_id] = match
+            return len(found) >= limit
+
+        node = root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            if take(node.ids, 'exact') or take(self._walk(node), 'prefix'):
+                fuzzy = False
+
+        if fuzzy and len(query) >= FUZZY_MIN_LENGTH:
+            for subtree in self._fuzzy(root, query):
+                if take(self._walk(subtree), 'fuzzy'):
+                    break
+
+        return [(users[user_id], match) for user_id, match in found.items()]
+
+
+user_index = PerTenant(UserIndex)
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_user_changes(session, flush_context):
+    if any(isinstance(obj, User) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['users_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_index(session):
+    if session.info.pop('users_changed', False) and has_app_context():
+        user_index.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_user_changes(session):
+    session.info.pop('users_changed', None)
@@ -1,6 +1,11 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from src.models.user import db, User, UserRole
 from src.routes.auth import login_required, role_required
+from src.assignment import assignment_engine
+from src.read_models import user_columns, user_dict
+from src.workload import agent_workload
+from src.user_search import user_index
+from src import policy
 
 users_bp = Blueprint('users', __name__)
 
@@ -32,11 +37,11 @@ def get_users():
             )
         
         # Pagination
-        pagination = query.order_by(User.created_at.desc()).paginate(
+        pagination = query.with_entities(*user_columns()).order_by(User.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        users = [user.to_dict() for user in pagination.items]
+        users = [user_dict(row) for row in pagination.items]
         
         return jsonify({
             'users': users,
@@ -51,8 +56,36 @@ def get_users():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch users')
         return jsonify({'error': 'Failed to fetch users'}), 500
 
+@users_bp.route('/autocomplete', methods=['GET'])
+@role_required([UserRole.ADMIN, UserRole.SUPPORT_AGENT])
+def autocomplete_users():
+    """Suggest users by username or email prefix, optionally tolerating one typo"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(request.args.get('limit', current_app.config['USER_AUTOCOMPLETE_LIMIT'], type=int), 50)
+        fuzzy = request.args.get('fuzzy', 'false').lower() == 'true'
+        active_only = request.args.get('active', 'false').lower() == 'true'
+        
+        roles = None
+        if request.args.get('role'):
+            try:
+                roles = {UserRole(role) for role in request.args['role'].split(',')}
+            except ValueError:
+                return jsonify({'error': 'Invalid role'}), 400
+        
+        matches = user_index.search(query, limit=max(limit, 1), roles=roles, active_only=active_only, fuzzy=fuzzy)
+        
+        return jsonify({
+            'users': [{**user, 'match': match} for user, match in matches]
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to search users')
+        return jsonify({'error': 'Failed to search users'}), 500
+
 @users_bp.route('/agents', methods=['GET'])
 @role_required([UserRole.ADMIN, UserRole.SUPPORT_AGENT])
 def get_agents():
@@ -68,8 +101,22 @@ def get_agents():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch agents')
         return jsonify({'error': 'Failed to fetch agents'}), 500
 
+@users_bp.route('/agents/workload', methods=['GET'])
+@role_required([UserRole.ADMIN, UserRole.SUPPORT_AGENT])
+def get_agent_workload():
+    """Get support agents with their open, in-progress and recently resolved ticket counts"""
+    try:
+        return jsonify({
+            'agents': agent_workload.agents()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.exception('Failed to fetch agent workload')
+        return jsonify({'error': 'Failed to fetch agent workload'}), 500
+
 @users_bp.route('/<int:user_id>', methods=['GET'])
 @login_required
 def get_user(user_id):
@@ -78,8 +125,7 @@ def get_user(user_id):
         current_user = User.query.get(session['user_id'])
         
         # Users can only view their own profile unless they're admin/agent
-        if (current_user.role == UserRole.END_USER and 
-            current_user.id != user_id):
+        if not policy.allows(current_user, 'user.view', {'id': user_id}):
             return jsonify({'error': 'Access denied'}), 403
         
         user = User.query.get(user_id)
@@ -90,6 +136,7 @@ def get_user(user_id):
         return jsonify({'user': user.to_dict()}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch user')
         return jsonify({'error': 'Failed to fetch user'}), 500
 
 @users_bp.route('/<int:user_id>', methods=['PUT'])
@@ -104,8 +151,7 @@ def update_user(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         # Permission check
-        if (current_user.role == UserRole.END_USER and 
-            current_user.id != user_id):
+        if not policy.allows(current_user, 'user.update', user):
             return jsonify({'error': 'Access denied'}), 403
         
         data = request.get_json()
@@ -131,7 +177,8 @@ def update_user(user_id):
                 user.username = username
         
         # Only admins can update role and active status
-        if current_user.role == UserRole.ADMIN:
+        can_manage = policy.allows(current_user, 'user.manage', user)
+        if can_manage:
             if 'role' in data:
                 try:
                     user.role = UserRole(data['role'])
@@ -143,12 +190,18 @@ def update_user(user_id):
         
         db.session.commit()
         
+        # Role or active status changes alter the pool of assignable agents
+        if can_manage and ('role' in data or 'is_active' in data):
+            assignment_engine.invalidate()
+            agent_workload.invalidate()
+        
         return jsonify({
             'message': 'User updated successfully',
             'user': user.to_dict()
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to update user')
         db.session.rollback()
         return jsonify({'error': 'Failed to update user'}), 500
 
@@ -168,10 +221,13 @@ def deactivate_user(user_id):
         
         user.is_active = False
         db.session.commit()
+        assignment_engine.invalidate()
+        agent_workload.invalidate()
         
         return jsonify({'message': 'User deactivated successfully'}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to deactivate user')
         db.session.rollback()
         return jsonify({'error': 'Failed to deactivate user'}), 500
 
@@ -187,10 +243,13 @@ def activate_user(user_id):
         
         user.is_active = True
         db.session.commit()
+        assignment_engine.invalidate()
+        agent_workload.invalidate()
         
         return jsonify({'message': 'User activated successfully'}), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to activate user')
         db.session.rollback()
         return jsonify({'error': 'Failed to activate user'}), 500
 
@@ -199,11 +258,20 @@ def activate_user(user_id):
 def get_user_stats():
     """Get user statistics (Admin only)"""
     try:
-        total_users = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        end_users = User.query.filter_by(role=UserRole.END_USER).count()
-        support_agents = User.query.filter_by(role=UserRole.SUPPORT_AGENT).count()
-        admins = User.query.filter_by(role=UserRole.ADMIN).count()
+        # One scan grouped by role and active flag instead of a COUNT per figure
+        by_role = dict.fromkeys(UserRole, 0)
+        total_users = 0
+        active_users = 0
+        for role, is_active, count in db.session.query(
+            User.role, User.is_active, db.func.count(User.id)
+        ).group_by(User.role, User.is_active):
+            by_role[role] += count
+            total_users += count
+            if is_active:
+                active_users += count
+        end_users = by_role[UserRole.END_USER]
+        support_agents = by_role[UserRole.SUPPORT_AGENT]
+        admins = by_role[UserRole.ADMIN]
         
         return jsonify({
             'stats': {
@@ -217,5 +285,6 @@ def get_user_stats():
         }), 200
         
     except Exception as e:
+        current_app.logger.exception('Failed to fetch user statistics')
         return jsonify({'error': 'Failed to fetch user statistics'}), 500
 
@@ -20,7 +20,7 @@ class Vote(db.Model):
         return {
             'id': self.id,
             'is_upvote': self.is_upvote,
-            'created_at': self.created_at.isoformat(),
+            'created_at': self.created_at,
             'ticket_id': self.ticket_id,
             'user_id': self.user_id
         }
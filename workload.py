@@ -0,0 +1,103 @@
+"""Per-agent workload for assignment pickers and the admin user list.
+
+One aggregated query counts, for every active agent and admin, the open and
+in-progress tickets assigned to them, the tickets they resolved this week and
+when the oldest of those open or in-progress tickets was created
+(oldest_open_at). The result is cached briefly per tenant and dropped whenever
+a ticket's assignee or status changes in this process; other worker processes
+catch up within AGENT_WORKLOAD_CACHE_SECONDS.
+"""
+from flask import current_app
+from src.models.user import db, User, UserRole
+from src.models.ticket import Ticket, TicketStatus
+from src.read_models import user_columns, user_dict
+from src.tenancy import PerTenant
+from src.assignment import ACTIVE_STATUSES
+from sqlalchemy import case, func
+from datetime import datetime, timedelta
+import threading
+import time
+
+DEFAULT_CONFIG = {
+    # How long a computed workload snapshot is served before it is rebuilt
+    'AGENT_WORKLOAD_CACHE_SECONDS': 30,
+}
+
+AGENT_ROLES = (UserRole.SUPPORT_AGENT, UserRole.ADMIN)
+
+
+def week_start(now):
+    """Midnight (UTC) of the Monday starting the week that contains now"""
+    return datetime(now.year, now.month, now.day) - timedelta(days=now.weekday())
+
+
+class AgentWorkload:
+    """Cached workload snapshot for one tenant's agents"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = None
+        self._loaded_at = 0.0
+        self._week = None
+        # Ticket and agent changes bump this; a snapshot loaded across a bump is returned but not cached
+        self._generation = 0
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._agents = None
+            self._generation += 1
+
+    def _load(self, week):
+        count_status = lambda status: func.coalesce(func.sum(case((Ticket.status == status, 1), else_=0)), 0)
+        rows = db.session.query(
+            *user_columns(),
+            count_status(TicketStatus.OPEN).label('open'),
+            count_status(TicketStatus.IN_PROGRESS).label('in_progress'),
+            func.coalesce(func.sum(case((Ticket.resolved_at >= week, 1), else_=0)), 0).label('resolved_this_week'),
+            # Picking a ticket up doesn't make it any younger, so in-progress ones count too
+            func.min(case((Ticket.status.in_(ACTIVE_STATUSES), Ticket.created_at))).label('oldest_open_at'),
+        ).outerjoin(Ticket, Ticket.assigned_to == User.id).filter(
+            User.role.in_(AGENT_ROLES),
+            User.is_active == True
+        ).group_by(User.id).order_by(User.username)
+
+        return [
+            (user_dict(row), {
+                'open': row.open,
+                'in_progress': row.in_progress,
+                'resolved_this_week': row.resolved_this_week,
+                'oldest_open_at': row.oldest_open_at,
+            })
+            for row in rows
+        ]
+
+    def agents(self):
+        """Active agents and admins with their workload, ordered by username"""
+        now = datetime.utcnow()
+        week = week_start(now)
+        ttl = current_app.config['AGENT_WORKLOAD_CACHE_SECONDS']
+        with self._lock:
+            agents, generation = self._agents, self._generation
+            fresh = agents is not None and self._week == week and time.monotonic() - self._loaded_at < ttl
+        if not fresh:
+            agents = self._load(week)
+            with self._lock:
+                if self._generation == generation:
+                    self._agents, self._loaded_at, self._week = agents, time.monotonic(), week
+
+        # Ages are computed per call so a cached snapshot never reports a stale age
+        result = []
+        for agent, workload in agents:
+            oldest = workload['oldest_open_at']
+            result.append({**agent, 'workload': {
+                **workload,
+                'oldest_open_age_seconds': int((now - oldest).total_seconds()) if oldest else None,
+            }})
+        return result
+
+
+agent_workload = PerTenant(AgentWorkload)
@@ -0,0 +1,111 @@
+"""Production entry point.
+
+Runs the app under gunicorn (preforked workers, each with a thread pool) when it
+is installed, otherwise under a threaded werkzeug server in a single process.
+
+Usage: python -m src.wsgi [--bind 0.0.0.0:5000] [--workers 2] [--threads 8]
+
+On SIGTERM a worker fails its readiness probe for --drain-delay seconds so load
+balancers stop routing to it, then stops accepting connections and finishes
+in-flight requests within --graceful-timeout seconds.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.routes.health import mark_draining
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn is optional, fall back to werkzeug
+    BaseApplication = None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run QuickDesk in production mode')
+    parser.add_argument('--bind', default=os.environ.get('BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--drain-delay', type=float, default=float(os.environ.get('DRAIN_DELAY', 5)))
+    return parser.parse_args(argv)
+
+
+def install_drain_handler(stop, drain_delay):
+    """On SIGTERM, mark the process as draining and call stop() after drain_delay"""
+    def handle_sigterm(signum, frame):
+        mark_draining()
+        timer = threading.Timer(drain_delay, stop)
+        timer.daemon = True
+        timer.start()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+if BaseApplication is not None:
+    class GunicornApplication(BaseApplication):
+        """Embedded gunicorn server using threaded workers"""
+
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def post_worker_init(worker, drain_delay):
+    """Chain a draining delay in front of gunicorn's own SIGTERM handling"""
+    install_drain_handler(lambda: worker.handle_exit(signal.SIGTERM, None), drain_delay)
+
+
+def run_gunicorn(app, args):
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'graceful_timeout': args.graceful_timeout,
+        'post_worker_init': lambda worker: post_worker_init(worker, args.drain_delay),
+    }
+    GunicornApplication(app, options).run()
+
+
+def run_werkzeug(app, args):
+    from werkzeug.serving import make_server
+
+    if args.workers > 1:
+        print('gunicorn is not installed; serving from a single threaded process')
+
+    host, _, port = args.bind.rpartition(':')
+    server = make_server(host or '0.0.0.0', int(port), app, threaded=True)
+    # Let in-flight requests finish on shutdown instead of killing their threads
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    install_drain_handler(lambda: threading.Thread(target=server.shutdown).start(), args.drain_delay)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if BaseApplication is not None:
+        run_gunicorn(app, args)
+    else:
+        run_werkzeug(app, args)
+
+
+if __name__ == '__main__':
+    main()